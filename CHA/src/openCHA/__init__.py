@@ -1,16 +1,34 @@
 from .openCHA import openCHA
 from openCHA.CustomDebugFormatter import CustomDebugFormatter
+from openCHA.journal import get_journal
+from openCHA.journal import Journal
+from openCHA.journal import set_journal
+from openCHA.tracing import get_tracer
+from openCHA.tracing import set_tracer
+from openCHA.tracing import SpanExporter
+from openCHA.tracing import Tracer
 from openCHA.utils import (
     get_from_dict_or_env,
     get_from_env,
+    iterate_sync,
     parse_addresses,
+    run_sync,
 )
 
 
 __all__ = [
     "openCHA",
     "CustomDebugFormatter",
+    "Journal",
+    "get_journal",
+    "set_journal",
+    "Tracer",
+    "SpanExporter",
+    "get_tracer",
+    "set_tracer",
     "get_from_dict_or_env",
     "get_from_env",
+    "iterate_sync",
     "parse_addresses",
+    "run_sync",
 ]
@@ -1,6 +1,7 @@
 from abc import abstractmethod
 from typing import Any
 
+from openCHA.tracing import trace_methods
 from pydantic import BaseModel
 
 
@@ -13,6 +14,7 @@ class DataPipe(BaseModel):
         the data is stored. For example, changing the type of the data or the format of the data. If your Data Pipe requires specific format or
         type, make sure you the conversion inside the Data Pipe ensuring consistency in the way tasks interact with Data Pipes. Look at
         :ref:`memory` for sample implementation.
+        The **store** and **retrieve** methods of the subclasses are traced as `datapipe.store` and `datapipe.retrieve` spans.
     """
 
     class Config:
@@ -20,6 +22,18 @@ class DataPipe(BaseModel):
 
         arbitrary_types_allowed = True
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any):
+        super().__pydantic_init_subclass__(**kwargs)
+        trace_methods(
+            cls,
+            "datapipe",
+            ("store", "retrieve"),
+            lambda datapipe, *args, **kwargs: {
+                "datapipe": type(datapipe).__name__
+            },
+        )
+
     @abstractmethod
     def store(self, data) -> str:
         """
@@ -1,3 +1,4 @@
+import inspect
 import os
 from typing import Any
 from typing import Dict
@@ -46,6 +47,54 @@ class Interface(BaseModel):
         extra = Extra.forbid
         arbitrary_types_allowed = True
 
+    def _with_session(self, function):
+        """
+        Wrap a handler that takes a `session_id` so Gradio passes the session of the user to it.
+        Other handlers are returned as they are.
+        """
+        signature = inspect.signature(function)
+        if "session_id" not in signature.parameters:
+            return function
+
+        # Gradio passes the request after the inputs to the parameters annotated with gr.Request
+        def split(args):
+            return args[:-1], args[-1].session_hash
+
+        if inspect.isasyncgenfunction(function):
+
+            async def handler(*args):
+                args, session_id = split(args)
+                async for update in function(*args, session_id=session_id):
+                    yield update
+
+        elif inspect.iscoroutinefunction(function):
+
+            async def handler(*args):
+                args, session_id = split(args)
+                return await function(*args, session_id=session_id)
+
+        else:
+
+            def handler(*args):
+                args, session_id = split(args)
+                return function(*args, session_id=session_id)
+
+        request = inspect.Parameter(
+            "request",
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            annotation=self.gr.Request,
+        )
+        handler.__signature__ = signature.replace(
+            parameters=[
+                parameter
+                for name, parameter in signature.parameters.items()
+                if name != "session_id"
+            ]
+            + [request]
+        )
+        handler.__annotations__ = {"request": self.gr.Request}
+        return handler
+
     def prepare_interface(
         self,
         respond,
@@ -66,6 +115,8 @@ class Interface(BaseModel):
             self (object): The instance of the class.
             respond (function): The function to handle user input and generate responses.
             reset (function): The function to reset the chatbot state.
+                If `respond` and `reset` take a `session_id`, they get the Gradio session of the user, so every user
+                has its own conversation state.
             upload_meta (Any): meta data.
             available_tasks (list, optional): A list of available tasks. Defaults to an empty list.
             share (bool, optional): Flag indicating whether to enable sharing the interface. Defaults to False.
@@ -82,6 +133,10 @@ class Interface(BaseModel):
             print("keys submitted")
             print(openai_api_key)
 
+        respond, reset = self._with_session(respond), self._with_session(
+            reset
+        )
+
         with self.gr.Blocks() as demo:
             chatbot = self.gr.Chatbot(bubble_full_width=False)
             with self.gr.Row():
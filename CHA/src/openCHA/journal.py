@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+_session_id: ContextVar[Optional[str]] = ContextVar(
+    "journal_session_id", default=None
+)
+_run_id: ContextVar[Optional[str]] = ContextVar(
+    "journal_run_id", default=None
+)
+
+
+class Journal(BaseModel):
+    """
+    **Description:**
+
+        A structured run journal. Events are JSON lines tagged with the session and run ids of the current context
+        (see **journal_context**). **record** only puts the event in a bounded queue; a background thread writes the
+        events in batches and rotates the file when it grows larger than `max_bytes`. If the queue is full, the event
+        is dropped instead of blocking the caller.
+
+    Attributes:
+        path:           Path of the JSON lines file.
+        level:          Events with a lower level (python logging levels) are ignored.
+        sample_rate:    Fraction of the events below `logging.WARNING` that are written.
+        max_queue_size: Maximum number of events waiting to be written.
+        max_bytes:      The file is rotated when it grows larger than this size.
+        backup_count:   Number of rotated files to keep (`path.1` ... `path.N`).
+        dropped:        Number of events dropped because the queue was full.
+    """
+
+    path: str = "./log/journal.jsonl"
+    level: int = logging.DEBUG
+    sample_rate: float = 1.0
+    max_queue_size: int = 10000
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 5
+    dropped: int = 0
+    _queue: Any = PrivateAttr(default=None)
+    _thread: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._thread = threading.Thread(
+                target=self._worker,
+                name="openCHA-journal",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def enabled_for(self, level: int) -> bool:
+        """
+            Check if an event with the given level would be written. Use it to avoid building large payloads.
+
+        Args:
+            level (int): The python logging level of the event.
+        Return:
+            bool: True if the event is not filtered by `level` or `sample_rate`.
+
+        """
+        if level < self.level:
+            return False
+        if level < logging.WARNING and self.sample_rate < 1.0:
+            return random.random() < self.sample_rate
+        return True
+
+    def record(
+        self, event: str, level: int = logging.INFO, **fields: Any
+    ) -> bool:
+        """
+            Add an event to the journal without blocking.
+
+        Args:
+            event (str): The name of the event.
+            level (int): The python logging level of the event.
+            **fields (Any): The payload of the event. Values that are not JSON serializable are written as strings.
+        Return:
+            bool: True if the event was queued.
+
+        """
+        if not self.enabled_for(level):
+            return False
+        entry = {
+            "time": time.time(),
+            "level": logging.getLevelName(level),
+            "event": event,
+            "session_id": _session_id.get(),
+            "run_id": _run_id.get(),
+        }
+        entry.update(fields)
+        return self.write(entry)
+
+    def write(self, entry: Dict[str, Any]) -> bool:
+        """
+            Queue a raw JSON object to be written as a line, without the level filtering and the context ids
+            of **record**. Used by other exporters (e.g. tracing) that share the background writer.
+
+        Args:
+            entry (Dict[str, Any]): The JSON object.
+        Return:
+            bool: True if the entry was queued.
+
+        """
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, entries: List[Dict[str, Any]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if (
+            os.path.exists(self.path)
+            and os.path.getsize(self.path) >= self.max_bytes
+        ):
+            self._rotate()
+        with open(self.path, mode="a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(
+                    json.dumps(entry, default=str, ensure_ascii=False)
+                    + "\n"
+                )
+
+    def _worker(self):
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < 256:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(entries)
+            except Exception:
+                logging.exception("Failed to write the journal.")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def flush(self):
+        """
+        Wait until all the queued events are written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+
+_journal = Journal()
+
+
+def current_ids() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the session and run ids of the current context.
+    """
+    return _session_id.get(), _run_id.get()
+
+
+def get_journal() -> Journal:
+    """
+    Return the journal used by the orchestrator and the planners.
+    """
+    return _journal
+
+
+def set_journal(journal: Journal):
+    """
+        Replace the journal used by the orchestrator and the planners, e.g. to change the path or the level.
+
+    Args:
+        journal (Journal): The new journal.
+
+    """
+    global _journal
+    _journal.flush()
+    _journal = journal
+
+
+def record(
+    event: str, level: int = logging.INFO, **fields: Any
+) -> bool:
+    """
+    Add an event to the current journal. See **Journal.record**.
+    """
+    return _journal.record(event, level, **fields)
+
+
+@contextlib.contextmanager
+def journal_context(
+    session_id: Optional[str] = None, run_id: Optional[str] = None
+) -> Iterator[None]:
+    """
+        Tag the events recorded inside the context (including the ones recorded by worker threads started
+        with `asyncio.to_thread`) with the given session and run ids.
+
+    Args:
+        session_id (str): The id of the session.
+        run_id (str): The id of the run.
+
+    """
+    session_token = _session_id.set(session_id)
+    run_token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _run_id.reset(run_token)
+        _session_id.reset(session_token)
+
+
+atexit.register(lambda: _journal.flush())
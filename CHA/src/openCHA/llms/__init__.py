@@ -1,18 +1,80 @@
 from openCHA.llms.llm_types import LLMType
 from openCHA.llms.llm import BaseLLM
+from openCHA.llms.llm import cut_at_stop
+from openCHA.llms.llm import stop_sequences
+from openCHA.llms.tokens import get_token_counter
+from openCHA.llms.tokens import TokenCounter
+from openCHA.llms.http_client import AsyncRetryTransport
+from openCHA.llms.http_client import configure_http_clients
+from openCHA.llms.http_client import get_async_anthropic_client
+from openCHA.llms.http_client import get_async_openai_client
+from openCHA.llms.http_client import get_http_stats
+from openCHA.llms.http_client import get_openai_client
+from openCHA.llms.http_client import HTTPClientConfig
+from openCHA.llms.http_client import RetryTransport
+from openCHA.llms.rate_limit import configure_rate_limits
+from openCHA.llms.rate_limit import current_priority
+from openCHA.llms.rate_limit import get_rate_limiter
+from openCHA.llms.rate_limit import llm_priority
+from openCHA.llms.rate_limit import Priority
+from openCHA.llms.rate_limit import RateLimit
+from openCHA.llms.rate_limit import RateLimiter
 from openCHA.llms.anthropic import AntropicLLM
 from openCHA.llms.openai import OpenAILLM
+from openCHA.llms.llama_batch import LlamaBatchScheduler
+from openCHA.llms.prefix_cache import PrefixCache
 from openCHA.llms.llama import LlamaLLM
+from openCHA.llms.cached import CachedLLM
+from openCHA.llms.cached import LLMResponseCache
+from openCHA.llms.lazy import LazyLLM
+from openCHA.llms.router import RouterLLM
+from openCHA.llms.router import RoutingPolicy
 from openCHA.llms.types import LLM_TO_CLASS
+from openCHA.llms.initialize_llm import clear_llm_registry
 from openCHA.llms.initialize_llm import initialize_llm
+from openCHA.llms.initialize_llm import initialize_routed_llm
+from openCHA.llms.initialize_llm import prewarm_llms
+from openCHA.llms.profiles import GenerationProfile
+from openCHA.llms.profiles import GenerationProfiles
 
 
 __all__ = [
     "BaseLLM",
+    "cut_at_stop",
+    "stop_sequences",
     "AntropicLLM",
     "OpenAILLM",
     "LlamaLLM",
+    "LlamaBatchScheduler",
+    "PrefixCache",
+    "CachedLLM",
+    "LLMResponseCache",
     "LLMType",
     "LLM_TO_CLASS",
     "initialize_llm",
+    "LazyLLM",
+    "RouterLLM",
+    "RoutingPolicy",
+    "initialize_routed_llm",
+    "prewarm_llms",
+    "clear_llm_registry",
+    "GenerationProfile",
+    "GenerationProfiles",
+    "HTTPClientConfig",
+    "RetryTransport",
+    "AsyncRetryTransport",
+    "configure_http_clients",
+    "get_async_anthropic_client",
+    "get_async_openai_client",
+    "get_http_stats",
+    "get_openai_client",
+    "Priority",
+    "RateLimit",
+    "RateLimiter",
+    "configure_rate_limits",
+    "current_priority",
+    "get_rate_limiter",
+    "llm_priority",
+    "TokenCounter",
+    "get_token_counter",
 ]
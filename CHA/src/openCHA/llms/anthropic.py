@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from typing import Any
+from typing import AsyncIterator
 from typing import Dict
 from typing import List
 
 from openCHA.llms import BaseLLM
+from openCHA.llms.http_client import get_async_anthropic_client
+from openCHA.llms.llm import stop_sequences
+from openCHA.llms.rate_limit import get_rate_limiter
 from openCHA.utils import get_from_dict_or_env
+from openCHA.utils import run_sync
 from pydantic import model_validator
 
 
@@ -110,7 +115,7 @@ class AntropicLLM(BaseLLM):
 
         """
 
-        return response["completion"]
+        return response.completion
 
     def _prepare_prompt(self, prompt) -> Any:
         """
@@ -126,15 +131,15 @@ class AntropicLLM(BaseLLM):
 
         return f"{self.HUMAN_PROMPT} {prompt}{self.AI_PROMPT}"
 
-    def generate(self, query: str, **kwargs: Any) -> str:
+    def _prepare_request(self, query: str, **kwargs: Any) -> Dict:
         """
-            Generate a response based on the provided query. This calls anthropic API to generate the text.
+            Validate the generation kwargs and build the completions request shared by **generate** and **agenerate**.
 
         Args:
             query (str): The query to generate a response for.
             **kwargs (Any): Additional keyword arguments.
         Return:
-            str: The generated response.
+            Dict: The request arguments.
         Raise:
             ValueError: If the model name is not specified or is not supported.
 
@@ -151,12 +156,86 @@ class AntropicLLM(BaseLLM):
         max_token = (
             kwargs["max_token"] if "max_token" in kwargs else 32000
         )
-        query = self._prepare_prompt(query)
-        response = self.llm_model(
-            api_key=self.api_key
-        ).completions.create(
-            model=model_name,
-            max_tokens_to_sample=max_token,
-            prompt=query,
+        request = {
+            "model": model_name,
+            "max_tokens_to_sample": max_token,
+            "prompt": self._prepare_prompt(query),
+        }
+        stop = stop_sequences(kwargs.get("stop"))
+        if len(stop) > 0:
+            request["stop_sequences"] = stop
+        return request
+
+    def generate(self, query: str, **kwargs: Any) -> str:
+        """
+            Generate a response based on the provided query. This calls anthropic API to generate the text.
+            The Anthropic client is async, so this is a thin wrapper running **agenerate** on the openCHA event loop.
+
+        Args:
+            query (str): The query to generate a response for.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            str: The generated response.
+        Raise:
+            ValueError: If the model name is not specified or is not supported.
+
+        """
+
+        return run_sync(self.agenerate(query, **kwargs))
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
+        """
+            Async version of **generate** awaiting the shared `AsyncAnthropic` client of the running event loop.
+
+        Args:
+            query (str): The query to generate a response for.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            str: The generated response.
+        Raise:
+            ValueError: If the model name is not specified or is not supported.
+
+        """
+
+        request = self._prepare_request(query, **kwargs)
+        await get_rate_limiter().aacquire(
+            request["model"],
+            self.count_tokens(query) + request["max_tokens_to_sample"],
         )
+        response = await get_async_anthropic_client(
+            self.api_key
+        ).completions.create(**request)
         return self._parse_response(response)
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """
+            Stream the response of **agenerate** chunk by chunk.
+
+        Args:
+            query (str): The query to generate a response for.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            AsyncIterator[str]: The chunks of the generated response.
+        Raise:
+            ValueError: If the model name is not specified or is not supported.
+
+        """
+
+        request = self._prepare_request(query, **kwargs)
+        await get_rate_limiter().aacquire(
+            request["model"],
+            self.count_tokens(query) + request["max_tokens_to_sample"],
+        )
+        stream = await get_async_anthropic_client(
+            self.api_key
+        ).completions.create(**request, stream=True)
+        try:
+            async for completion in stream:
+                if completion.completion:
+                    yield completion.completion
+        finally:
+            # closing the response cancels the generation when the
+            # consumer stops early (e.g. at a stop sequence)
+            await stream.close()
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from openCHA.llms import BaseLLM
+from openCHA.tracing import current_span
+from pydantic import BaseModel
+from pydantic import field_validator
+from pydantic import PrivateAttr
+
+
+CACHE_MODES = ("read_write", "record", "replay")
+
+
+class LLMResponseCache(BaseModel):
+    """
+    **Description:**
+
+        A disk-backed cache of LLM responses stored in a SQLite file. It can be shared by several **CachedLLM**
+        (e.g. the planner and the response generator). The least recently used responses are evicted when the
+        total size of the stored responses exceeds `max_bytes`.
+
+        The `mode` controls how **CachedLLM** uses the cache:
+
+        - `read_write`: return the cached response if there is one, otherwise call the LLM and store the response.
+        - `record`: always call the LLM and store (overwrite) the response.
+        - `replay`: never call the LLM. A missing response raises a ValueError, so benchmarks run
+          deterministically and offline.
+
+    Attributes:
+        path:       Path of the SQLite file.
+        mode:       One of `read_write`, `record` or `replay`.
+        max_bytes:  Maximum total size of the stored responses in bytes.
+        hits:       Number of lookups that returned a cached response.
+        misses:     Number of lookups that did not find a cached response.
+    """
+
+    path: str = "./cache/llm_responses.sqlite"
+    mode: str = "read_write"
+    max_bytes: int = 256 * 1024 * 1024
+    hits: int = 0
+    misses: int = 0
+    _connection: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @field_validator("mode")
+    def validate_mode(cls, mode: str) -> str:
+        if mode not in CACHE_MODES:
+            raise ValueError(
+                f"Got unknown cache mode: {mode}. "
+                f"Valid modes are: {CACHE_MODES}."
+            )
+        return mode
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed "
+                "ON responses (accessed)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def make_key(
+        self,
+        backend: str,
+        model: Optional[str],
+        query: Any,
+        **kwargs: Any,
+    ) -> str:
+        """
+            Create the cache key of a LLM call.
+
+        Args:
+            backend (str): The name of the LLM class.
+            model (str): The name or path of the model.
+            query (Any): The prompt or the list of messages.
+            **kwargs (Any): The generation kwargs like `max_tokens`, `stop` or `temperature`.
+        Return:
+            str: The cache key.
+
+        """
+
+        def normalize(value: Any) -> Any:
+            if isinstance(value, str):
+                return "\n".join(
+                    line.rstrip()
+                    for line in value.replace("\r\n", "\n").split(
+                        "\n"
+                    )
+                ).strip()
+            if isinstance(value, (list, tuple)):
+                return [normalize(item) for item in value]
+            if isinstance(value, dict):
+                return {
+                    str(key): normalize(item)
+                    for key, item in value.items()
+                }
+            return value
+
+        payload = json.dumps(
+            [backend, model, normalize(query), normalize(kwargs)],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+            Look up a cached response.
+
+        Args:
+            key (str): The key created by **make_key**.
+        Return:
+            Optional[str]: The response, or None if it is not cached.
+
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+            Store a response and evict the least recently used responses if the cache is too large.
+
+        Args:
+            key (str): The key created by **make_key**.
+            response (str): The generated response.
+
+        """
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            while total > self.max_bytes:
+                evicted = connection.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+                ).fetchone()
+                connection.execute(
+                    "DELETE FROM responses WHERE key = ?",
+                    (evicted[0],),
+                )
+                total -= evicted[1]
+
+    def clear(self):
+        """
+        Remove all the cached responses.
+        """
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Return the counters and the current size of the cache.
+
+        Return:
+            Dict[str, int]: hits, misses, entries and bytes.
+
+        """
+        with self._lock:
+            entries, size = (
+                self._connect()
+                .execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                )
+                .fetchone()
+            )
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class CachedLLM(BaseLLM):
+    """
+    **Description:**
+
+        Wraps any **BaseLLM** with a **LLMResponseCache**, so byte-identical calls (same backend, model, normalized
+        prompt, and generation kwargs) are answered from the disk instead of the backend.
+
+    Example:
+        .. code-block:: python
+
+            from openCHA.llms import CachedLLM, LLMResponseCache, OpenAILLM
+            llm = CachedLLM(llm=OpenAILLM(), cache=LLMResponseCache(mode="replay"))
+
+    """
+
+    llm: BaseLLM
+    cache: LLMResponseCache
+
+    def _parse_response(self, response) -> str:
+        return self.llm._parse_response(response)
+
+    def _prepare_prompt(self, prompt) -> Any:
+        return self.llm._prepare_prompt(prompt)
+
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        return self.llm.count_tokens(text, **kwargs)
+
+    def supports_static_prefix(self) -> bool:
+        return self.llm.supports_static_prefix()
+
+    def _key(self, query: str, **kwargs: Any) -> str:
+        # the static prefix is already part of the query
+        kwargs.pop("static_prefix", None)
+        model = kwargs.pop("model_name", None) or getattr(
+            self.llm, "model_path", None
+        )
+        return self.cache.make_key(
+            type(self.llm).__name__, model, query, **kwargs
+        )
+
+    def _lookup(
+        self, query: str, **kwargs: Any
+    ) -> Tuple[str, Optional[str]]:
+        key = self._key(query, **kwargs)
+        response = None
+        if self.cache.mode != "record":
+            response = self.cache.get(key)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("cache_hit", response is not None)
+        if response is None and self.cache.mode == "replay":
+            raise ValueError(
+                f"The response of {type(self.llm).__name__} is not cached and the LLM cache is in replay mode."
+            )
+        return key, response
+
+    def generate(self, query: str, **kwargs: Any) -> str:
+        """
+            Return the cached response or call the wrapped LLM and cache its response.
+
+        Args:
+            query (str): The query for generating the response.
+            **kwargs (Any): The kwargs of the wrapped LLM.
+        Return:
+            str: The generated response.
+        Raise:
+            ValueError: If the response is not cached in replay mode.
+
+        """
+        key, response = self._lookup(query, **kwargs)
+        if response is None:
+            response = self.llm.generate(query, **kwargs)
+            self.cache.put(key, response)
+        return response
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
+        key, response = self._lookup(query, **kwargs)
+        if response is None:
+            response = await self.llm.agenerate(query, **kwargs)
+            self.cache.put(key, response)
+        return response
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        key, response = self._lookup(query, **kwargs)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        async for chunk in self.llm.agenerate_stream(query, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, "".join(chunks))
@@ -0,0 +1,432 @@
+"""
+Process-wide HTTP clients of the LLM backends.
+
+The SDK clients are created once per endpoint and credentials and share a keep-alive connection pool, so the calls
+do not pay a TLS handshake each time. Throttled (429) and failed (5xx) requests are retried by the transport with
+exponential backoff and full jitter, honoring the `Retry-After` header. The retries of the SDKs are disabled, so a
+request is never retried by both layers.
+"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Optional
+
+import httpx
+from openCHA.journal import record
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class HTTPClientConfig(BaseModel):
+    """
+    **Description:**
+
+        Configuration of the shared HTTP clients.
+
+    Attributes:
+        connect_timeout:        Timeout in seconds to establish a connection.
+        read_timeout:           Timeout in seconds between two chunks of a response.
+        max_connections:        Maximum number of open connections per client.
+        max_keepalive:          Maximum number of idle connections kept alive per client.
+        max_retries:            Maximum number of retries of a request.
+        base_delay:             Delay in seconds of the first retry. It doubles on each retry.
+        max_delay:              Maximum delay in seconds between two retries, also applied to `Retry-After`.
+        retry_statuses:         The response statuses that are retried.
+    """
+
+    connect_timeout: float = 10.0
+    read_timeout: float = 120.0
+    max_connections: int = 100
+    max_keepalive: int = 20
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: FrozenSet[int] = frozenset(
+        {429, 500, 502, 503, 504}
+    )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.read_timeout, connect=self.connect_timeout
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+        )
+
+    def retry_delay(
+        self, attempt: int, response: Optional[httpx.Response] = None
+    ) -> float:
+        """
+            Compute the delay before a retry.
+
+        Args:
+            attempt (int): The number of the retry, starting from 0.
+            response (httpx.Response): The failed response, if any.
+        Return:
+            float: The delay in seconds: the `Retry-After` of the response if there is one, otherwise a random
+            delay up to `base_delay * 2 ** attempt`.
+
+        """
+        if response is not None:
+            retry_after = _retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.max_delay)
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+
+
+class HTTPStats(BaseModel):
+    """
+    **Description:**
+
+        Counters of the requests sent by the shared HTTP clients.
+
+    Attributes:
+        requests:       Number of requests (retries not included).
+        retries:        Number of retries.
+        failures:       Number of requests that still failed after the last retry.
+        by_status:      Number of retries per response status (`error` for connection errors).
+    """
+
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    by_status: Dict[str, int] = {}
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def count(self, field: str, status: Optional[str] = None):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if status is not None:
+                self.by_status[status] = (
+                    self.by_status.get(status, 0) + 1
+                )
+
+
+_config = HTTPClientConfig()
+_stats = HTTPStats()
+_lock = threading.Lock()
+_clients: Dict[Any, Any] = {}
+# async clients are bound to the event loop they were used on
+_async_clients: "weakref.WeakKeyDictionary" = (
+    weakref.WeakKeyDictionary()
+)
+# async clients created outside of an event loop
+_unbound_clients: Dict[Any, Any] = {}
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+def _should_retry(attempt: int, response: Optional[httpx.Response]):
+    if attempt >= _config.max_retries:
+        return False
+    return (
+        response is None
+        or response.status_code in _config.retry_statuses
+    )
+
+
+def _count_retry(
+    request: httpx.Request,
+    attempt: int,
+    delay: float,
+    response: Optional[httpx.Response],
+):
+    status = (
+        "error" if response is None else str(response.status_code)
+    )
+    _stats.count("retries", status)
+    record(
+        "http_retry",
+        logging.WARNING,
+        host=request.url.host,
+        status=status,
+        attempt=attempt + 1,
+        delay=delay,
+    )
+
+
+class RetryTransport(httpx.BaseTransport):
+    """
+    **Description:**
+
+        Wraps a transport to retry the throttled and failed requests (see **HTTPClientConfig**).
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        _stats.count("requests")
+        attempt = 0
+        while True:
+            try:
+                response = self.transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if not _should_retry(attempt, None):
+                    _stats.count("failures")
+                    raise
+                response = None
+            else:
+                if response.status_code not in _config.retry_statuses:
+                    return response
+                if not _should_retry(attempt, response):
+                    _stats.count("failures")
+                    return response
+                response.close()
+            delay = _config.retry_delay(attempt, response)
+            _count_retry(request, attempt, delay, response)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """
+    **Description:**
+
+        Async version of **RetryTransport**.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        _stats.count("requests")
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.handle_async_request(
+                    request
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if not _should_retry(attempt, None):
+                    _stats.count("failures")
+                    raise
+                response = None
+            else:
+                if response.status_code not in _config.retry_statuses:
+                    return response
+                if not _should_retry(attempt, response):
+                    _stats.count("failures")
+                    return response
+                await response.aclose()
+            delay = _config.retry_delay(attempt, response)
+            _count_retry(request, attempt, delay, response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _loop_clients() -> Dict[Any, Any]:
+    # must be called with _lock held
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _unbound_clients
+    return _async_clients.setdefault(loop, {})
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Return the shared sync HTTP client.
+    """
+    with _lock:
+        if "http" not in _clients:
+            _clients["http"] = httpx.Client(
+                timeout=_config.timeout(),
+                transport=RetryTransport(
+                    httpx.HTTPTransport(limits=_config.limits())
+                ),
+            )
+        return _clients["http"]
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared async HTTP client of the running event loop.
+    """
+    with _lock:
+        clients = _loop_clients()
+        if "http" not in clients:
+            clients["http"] = httpx.AsyncClient(
+                timeout=_config.timeout(),
+                transport=AsyncRetryTransport(
+                    httpx.AsyncHTTPTransport(limits=_config.limits())
+                ),
+            )
+        return clients["http"]
+
+
+def _sdk_client(clients: Dict[Any, Any], key: Any, create):
+    with _lock:
+        if key not in clients:
+            clients[key] = create()
+        return clients[key]
+
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None):
+    """
+        Return the shared `OpenAI` client of an endpoint and API key.
+
+    Args:
+        api_key (str): The OpenAI API key.
+        base_url (str): The endpoint. The default OpenAI endpoint is used if it is None.
+    Return:
+        OpenAI: The client.
+    Raise:
+        ValueError: If the openai python package is not installed.
+
+    """
+    try:
+        from openai import OpenAI
+    except ImportError:
+        raise ValueError(
+            "Could not import openai python package. "
+            "Please install it with `pip install openai`."
+        )
+    http_client = get_http_client()
+    return _sdk_client(
+        _clients,
+        ("openai", base_url, api_key),
+        lambda: OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=http_client,
+        ),
+    )
+
+
+def get_async_openai_client(
+    api_key: str, base_url: Optional[str] = None
+):
+    """
+    Return the shared `AsyncOpenAI` client of an endpoint and API key for the running event loop.
+    See **get_openai_client**.
+    """
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        raise ValueError(
+            "Could not import openai python package. "
+            "Please install it with `pip install openai`."
+        )
+    http_client = get_async_http_client()
+    with _lock:
+        clients = _loop_clients()
+    return _sdk_client(
+        clients,
+        ("openai", base_url, api_key),
+        lambda: AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=http_client,
+        ),
+    )
+
+
+def get_async_anthropic_client(
+    api_key: str, base_url: Optional[str] = None
+):
+    """
+        Return the shared `AsyncAnthropic` client of an endpoint and API key for the running event loop.
+
+    Args:
+        api_key (str): The Anthropic API key.
+        base_url (str): The endpoint. The default Anthropic endpoint is used if it is None.
+    Return:
+        AsyncAnthropic: The client.
+    Raise:
+        ValueError: If the anthropic python package is not installed.
+
+    """
+    try:
+        from anthropic import AsyncAnthropic
+    except ImportError:
+        raise ValueError(
+            "Could not import anthropic python package. "
+            "Please install it with `pip install anthropic`."
+        )
+    http_client = get_async_http_client()
+    with _lock:
+        clients = _loop_clients()
+    return _sdk_client(
+        clients,
+        ("anthropic", base_url, api_key),
+        lambda: AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=http_client,
+        ),
+    )
+
+
+def configure_http_clients(config: HTTPClientConfig):
+    """
+        Replace the configuration of the shared HTTP clients. The clients created before are dropped, so the new
+        timeouts and limits apply to the next calls.
+
+    Args:
+        config (HTTPClientConfig): The new configuration.
+
+    """
+    global _config
+    with _lock:
+        _config = config
+        _clients.clear()
+        _async_clients.clear()
+        _unbound_clients.clear()
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """
+        Return the request and retry counters of the shared HTTP clients.
+
+    Return:
+        Dict[str, Any]: requests, retries, failures and the retries per status.
+
+    """
+    with _stats._lock:
+        return {
+            "requests": _stats.requests,
+            "retries": _stats.retries,
+            "failures": _stats.failures,
+            "by_status": dict(_stats.by_status),
+        }
@@ -1,18 +1,46 @@
+import json
+import threading
 from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
 
 from openCHA.llms import BaseLLM
+from openCHA.llms import LazyLLM
 from openCHA.llms import LLM_TO_CLASS
 from openCHA.llms import LLMType
+from openCHA.llms import RouterLLM
+from openCHA.llms import RoutingPolicy
+
+
+# shared LLM instances by backend and config
+_registry: Dict[Tuple[str, str], LazyLLM] = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(llm: str, kwargs: Dict[str, Any]) -> Tuple[str, str]:
+    return (
+        str(llm),
+        json.dumps(kwargs, sort_keys=True, default=repr),
+    )
 
 
 def initialize_llm(
-    llm: str = LLMType.OPENAI, **kwargs: Any
+    llm: str = LLMType.OPENAI,
+    lazy: bool = False,
+    shared: bool = True,
+    **kwargs: Any,
 ) -> BaseLLM:
     """
     This function initializes and returns an instance of the Language Model Manager (LLM) based on the specified LLM type.
+    The instances are shared: the same LLM type and kwargs return the same LLM, so the weights of a local model are
+    loaded once for the planner, the response generator, and the tasks.
 
     Args:
         llm (str, optional): The LLM type to initialize. Defaults to "openai".
+        lazy (bool, optional): If True, a **LazyLLM** is returned and the LLM is created on its first use.
+        shared (bool, optional): If False, a new instance is created instead of the shared one.
         **kwargs (Any, optional): Additional keyword arguments to pass to the LLM constructor.
     Return:
         BaseLLM: An instance of the initialized LLM.
@@ -36,5 +64,67 @@ def initialize_llm(
         )
 
     llm_cls = LLM_TO_CLASS[llm]
-    llm = llm_cls(**kwargs)
-    return llm
+    if shared:
+        key = _registry_key(llm, kwargs)
+        with _registry_lock:
+            if key not in _registry:
+                _registry[key] = LazyLLM(
+                    llm_class=llm_cls, llm_kwargs=kwargs
+                )
+            lazy_llm = _registry[key]
+    else:
+        lazy_llm = LazyLLM(llm_class=llm_cls, llm_kwargs=kwargs)
+    if lazy:
+        return lazy_llm
+    return lazy_llm.load()
+
+
+def initialize_routed_llm(
+    llm: str = LLMType.OPENAI, policy: Optional[RoutingPolicy] = None
+) -> BaseLLM:
+    """
+    Initialize the lazily loaded, shared LLM of a component. If a routing policy is given, a **RouterLLM** is returned
+    with `llm` as the primary backend and the policy's fallbacks after it.
+
+    Args:
+        llm (str): The primary LLM type.
+        policy (RoutingPolicy): The routing policy of the component, if any.
+    Return:
+        BaseLLM: The LLM of the component.
+    Raise:
+        ValueError: If one of the LLM types is unknown.
+
+    """
+    primary = initialize_llm(llm, lazy=True)
+    if policy is None or len(policy.fallbacks) == 0:
+        return primary
+    return RouterLLM(
+        backends=[primary]
+        + [
+            initialize_llm(fallback, lazy=True)
+            for fallback in policy.fallbacks
+        ],
+        policy=policy,
+    )
+
+
+def prewarm_llms() -> List[threading.Thread]:
+    """
+    Start loading the shared LLMs that are not loaded yet in background threads, so the first calls do not wait
+    for the weights.
+
+    Return:
+        List[threading.Thread]: The loading threads.
+
+    """
+    with _registry_lock:
+        llms = list(_registry.values())
+    return [llm.prewarm() for llm in llms if not llm.loaded]
+
+
+def clear_llm_registry():
+    """
+    Drop the shared LLM instances. The LLMs already handed out keep working.
+    """
+    with _registry_lock:
+        _registry.clear()
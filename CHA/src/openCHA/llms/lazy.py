@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+
+from openCHA.journal import record
+from openCHA.llms import BaseLLM
+from pydantic import PrivateAttr
+
+
+class LazyLLM(BaseLLM):
+    """
+    **Description:**
+
+        A proxy that creates the wrapped LLM on first use, so the weights of local models are not loaded at startup
+        by components that may never call them. **prewarm** loads the LLM in a background thread instead. The
+        attributes of the wrapped LLM (e.g. `model_path`) are available on the proxy and load it if needed.
+        Instances are usually created and shared by **initialize_llm**.
+
+    Attributes:
+        llm_class:      The class of the wrapped LLM.
+        llm_kwargs:     The kwargs passed to the constructor of the wrapped LLM.
+    """
+
+    llm_class: Any
+    llm_kwargs: Dict[str, Any] = {}
+    _llm: Optional[BaseLLM] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def loaded(self) -> bool:
+        return self._llm is not None
+
+    def load(self) -> BaseLLM:
+        """
+            Create the wrapped LLM if it is not created yet. Concurrent callers wait for the same load.
+
+        Return:
+            BaseLLM: The wrapped LLM.
+
+        """
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    started = time.monotonic()
+                    self._llm = self.llm_class(**self.llm_kwargs)
+                    record(
+                        "llm_loaded",
+                        llm=self.llm_class.__name__,
+                        seconds=time.monotonic() - started,
+                    )
+        return self._llm
+
+    def prewarm(self) -> threading.Thread:
+        """
+            Load the wrapped LLM in a background thread. A failed load is journaled and retried on first use.
+
+        Return:
+            threading.Thread: The loading thread.
+
+        """
+
+        def load():
+            try:
+                self.load()
+            except Exception as e:
+                record(
+                    "llm_prewarm_failed",
+                    logging.WARNING,
+                    llm=self.llm_class.__name__,
+                    error=repr(e),
+                )
+
+        thread = threading.Thread(
+            target=load, name="openCHA-llm-prewarm", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            if name.startswith("_"):
+                raise
+            return getattr(self.load(), name)
+
+    def _parse_response(self, response) -> str:
+        return self.load()._parse_response(response)
+
+    def _prepare_prompt(self, prompt) -> Any:
+        return self.load()._prepare_prompt(prompt)
+
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        return self.load().count_tokens(text, **kwargs)
+
+    def supports_static_prefix(self) -> bool:
+        return self.load().supports_static_prefix()
+
+    def generate(self, query: str, **kwargs: Any) -> str:
+        return self.load().generate(query, **kwargs)
+
+    async def _aload(self) -> BaseLLM:
+        if self._llm is not None:
+            return self._llm
+        return await asyncio.to_thread(self.load)
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
+        return await (await self._aload()).agenerate(query, **kwargs)
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        llm = await self._aload()
+        async for chunk in llm.agenerate_stream(query, **kwargs):
+            yield chunk
+
+    def generate_stream(
+        self, query: str, **kwargs: Any
+    ) -> Iterator[str]:
+        return self.load().generate_stream(query, **kwargs)
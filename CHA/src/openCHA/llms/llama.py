@@ -9,14 +9,26 @@ openCHA.llms.llama
 * **完全离线**：不依赖任何网络或 API Key。
 * **支持单轮对话**：仅实现最基本的 `generate`，方便后续扩展为多轮。
 * **与 openCHA.llms.openai 接口一致**：同样实现 _parse_response、_prepare_prompt、generate。
+* **GGUF / llama.cpp**：`.gguf` 量化模型通过 mmap 加载，仅用 CPU，线程数可配置。
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import copy
 import os
+import threading
 
 from openCHA.llms import BaseLLM
+from openCHA.llms.llama_batch import LlamaBatchScheduler
+from openCHA.llms.llm import cut_at_stop
+from openCHA.llms.llm import stop_sequences
+from openCHA.llms.prefix_cache import PrefixCache
+from openCHA.llms.tokens import get_token_counter
+from openCHA.tracing import current_span
 from openCHA.utils import get_from_dict_or_env
+from pydantic import Field
 from pydantic import model_validator
+from pydantic import PrivateAttr
 
 # 延迟导入，大文件模型加载可能较慢
 import importlib
@@ -27,7 +39,9 @@ class LlamaLLM(BaseLLM):
     **Description**
 
         An offline implementation for running local Llama-3 models
-        (e.g. *Meta-Llama-3-8B-Instruct*) via llama-cpp-python.
+        (e.g. *Meta-Llama-3-8B-Instruct*) via transformers, or quantized GGUF models via llama-cpp-python.
+        GGUF weights are memory-mapped, so they load almost instantly and the page cache is shared by the
+        worker processes on the same node.
     """
 
     # 这里维护常见官方上下文窗口大小，便于做超长输入检测
@@ -50,7 +64,20 @@ class LlamaLLM(BaseLLM):
     tokenizer: Any = None         # HF tokenizer (for transformers mode)
     device: str = "cpu"
     max_new_tokens: int = 1024     # 默认生成 token 数
-    use_llama_cpp: bool = True    # 是否使用 llama-cpp-python
+    use_llama_cpp: bool = False   # 是否使用 llama-cpp-python（.gguf 模型默认开启）
+    n_ctx: int = 8192             # llama.cpp 上下文窗口
+    n_threads: Optional[int] = None        # llama.cpp 生成线程数，None 表示物理核数
+    n_threads_batch: Optional[int] = None  # llama.cpp prefill 线程数，None 表示所有核
+    use_mmap: bool = True         # 通过 mmap 加载 GGUF 权重
+    use_mlock: bool = False       # 锁定权重页，避免被换出
+    batching: bool = False        # 是否把并发请求合并成一个批次生成
+    batch_window: float = 0.02    # 收集并发请求的时间窗口（秒）
+    max_batch_size: int = 8       # 每个批次的最大请求数
+    # 静态前缀的 past_key_values 缓存，None 表示关闭
+    prefix_cache: Optional[PrefixCache] = Field(default_factory=PrefixCache)
+    _scheduler: Optional[LlamaBatchScheduler] = PrivateAttr(default=None)
+    # llama.cpp 模型不是线程安全的
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
 
     #
     # ──────────────────────────────────────────────────────────────────────────
@@ -60,7 +87,7 @@ class LlamaLLM(BaseLLM):
     @model_validator(mode="before")
     def validate_environment(cls, values: Dict) -> Dict:
         """
-        检查 llama-cpp-python 是否可用，并在实例化时加载模型。
+        检查依赖是否可用，并在实例化时加载模型（transformers 或 llama-cpp-python）。
         """
         # 1. 解析模型路径：优先参数，其次环境变量
         model_path = get_from_dict_or_env(
@@ -75,8 +102,13 @@ class LlamaLLM(BaseLLM):
         if model_path.startswith("~/"):
             model_path = os.path.expanduser(model_path)
         
-        # 3. 暂时只使用 transformers 格式
-        values["use_llama_cpp"] = False
+        # 3. GGUF 模型使用 llama-cpp-python
+        use_llama_cpp = values.get(
+            "use_llama_cpp", model_path.lower().endswith(".gguf")
+        )
+        values["use_llama_cpp"] = use_llama_cpp
+        if use_llama_cpp:
+            return cls._load_llama_cpp(values, model_path)
 
         # 4. 导入依赖
         try:
@@ -109,6 +141,31 @@ class LlamaLLM(BaseLLM):
 
         return values
 
+    @classmethod
+    def _load_llama_cpp(cls, values: Dict, model_path: str) -> Dict:
+        """
+        通过 mmap 加载量化的 GGUF 模型，只使用 CPU。
+        """
+        if values.get("batching"):
+            raise ValueError("llama.cpp 后端不支持 batching。")
+        try:
+            llama_cpp = importlib.import_module("llama_cpp")
+        except ModuleNotFoundError:
+            raise ValueError("请先安装依赖：pip install llama-cpp-python")
+        fields = cls.model_fields
+        values["device"] = "cpu"
+        values["model"] = llama_cpp.Llama(
+            model_path=model_path,
+            n_ctx=values.get("n_ctx", fields["n_ctx"].default),
+            n_threads=values.get("n_threads"),
+            n_threads_batch=values.get("n_threads_batch"),
+            use_mmap=values.get("use_mmap", fields["use_mmap"].default),
+            use_mlock=values.get("use_mlock", fields["use_mlock"].default),
+            n_gpu_layers=0,
+            verbose=False,
+        )
+        return values
+
     #
     # ──────────────────────────────────────────────────────────────────────────
     # 公共辅助函数
@@ -122,20 +179,45 @@ class LlamaLLM(BaseLLM):
         """
         判断输入 prompt token 数是否超过模型上下文窗口。
         """
-        model_name = model_name or self.model_path
-        max_ctx = self.models.get(model_name, 8192)
-        
-        # 使用 transformers 的 tokenizer
-        n_tokens = len(self.tokenizer.encode(prompt))
-        
-        return n_tokens > max_ctx
+        return self._max_context(model_name) < self.count_tokens(prompt)
+
+    def _max_context(self, model_name: Optional[str] = None) -> int:
+        if self.use_llama_cpp:
+            return self.n_ctx
+        return self.models.get(model_name or self.model_path, 8192)
+
+    def supports_static_prefix(self) -> bool:
+        """
+        只有 transformers 后端在非 batching 模式下缓存静态前缀的 past_key_values。
+        """
+        return (
+            self.prefix_cache is not None
+            and not self.use_llama_cpp
+            and not self.batching
+        )
+
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        """
+        使用 tokenizer 计算文本的 token 数（不含特殊 token），结果由共享的 TokenCounter 缓存。
+        """
+        return get_token_counter().count(
+            text, self.model_path, encode=self._encode
+        )
+
+    def _encode(self, text: str) -> List[int]:
+        if self.use_llama_cpp:
+            return self.model.tokenize(text.encode("utf-8"), add_bos=False)
+        return self.tokenizer.encode(text, add_special_tokens=False)
 
     #
     # ──────────────────────────────────────────────────────────────────────────
     # BaseLLM 规定需要实现的 3 个抽象方法
     # ──────────────────────────────────────────────────────────────────────────
     #
-    def _prepare_prompt(self, prompt: str) -> str:
+    def _prepare_prompt(self, prompt: str) -> Any:
+        if self.use_llama_cpp:
+            # llama.cpp 使用 GGUF 元数据中的 chat 模板
+            return [{"role": "user", "content": prompt}]
         return self.tokenizer.apply_chat_template(
             [{"role": "user", "content": prompt}],
             tokenize=False,
@@ -155,56 +237,275 @@ class LlamaLLM(BaseLLM):
         prompt_text = self._prepare_prompt(self._current_prompt)
         return full_text[len(prompt_text) :].lstrip()
 
-    def generate(self, query: str, **kwargs: Any) -> str:
+    def _eos_token_ids(self) -> List[int]:
+        eos_ids = [self.tokenizer.convert_tokens_to_ids("<|eot_id|>")]
+        if self.tokenizer.eos_token_id is not None:
+            eos_ids.append(self.tokenizer.eos_token_id)
+        return [token for token in eos_ids if token is not None]
+
+    def _submit(self, query: str, **kwargs: Any):
+        """
+        把请求交给批处理调度器，返回 concurrent.futures.Future。
         """
-        调用本地 Llama-3 生成回复。
+        if self._scheduler is None:
+            self._scheduler = LlamaBatchScheduler(
+                model=self.model,
+                tokenizer=self.tokenizer,
+                device=self.device,
+                eos_token_id=self._eos_token_ids(),
+                batch_window=self.batch_window,
+                max_batch_size=self.max_batch_size,
+            )
+        prompt = self._prepare_prompt(query)
+        # 批处理时 prompt 在调度线程中才分词，这里用共享计数器做长度检查
+        if self.count_tokens(prompt) > self._max_context():
+            raise ValueError("输入过长，已超过模型最大上下文窗口。")
+        return self._scheduler.submit(
+            prompt,
+            max_new_tokens=kwargs.get("max_new_tokens", self.max_new_tokens),
+            temperature=kwargs.get("temperature", 0.7),
+            top_p=kwargs.get("top_p", 0.9),
+            stop=stop_sequences(kwargs.get("stop")),
+        )
 
-        可选参数
-        -----------
-        max_new_tokens : int    新生成 token 数
-        temperature     : float 采样温度
-        top_p           : float nucleus sampling
+    @staticmethod
+    def _cache_bytes(past_key_values) -> int:
+        """
+        估算 past_key_values 占用的内存（字节）。
+        """
+        layers = getattr(past_key_values, "layers", None)
+        if layers is not None:
+            tensors = [t for layer in layers for t in (layer.keys, layer.values)]
+        else:
+            tensors = list(past_key_values.key_cache) + list(
+                past_key_values.value_cache
+            )
+        return sum(
+            t.numel() * t.element_size() for t in tensors if t is not None
+        )
+
+    def _prefix_past_key_values(
+        self, prompt: str, static_prefix: str, input_ids: List[int]
+    ):
+        """
+        返回静态前缀的 past_key_values 副本；未命中时先对前缀做一次 prefill 并缓存。
+        前缀在 prompt 中的分词结果与单独分词不一致时返回 None。
+        """
+        # chat 模板的头部 + 静态前缀
+        position = prompt.find(static_prefix)
+        if position < 0:
+            return None
+        prefix = prompt[: position + len(static_prefix)]
+        key = PrefixCache.make_key(self.model_path, prefix)
+        past_key_values = self.prefix_cache.get(key, input_ids)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("prefix_cache_hit", past_key_values is not None)
+        if past_key_values is None:
+            prefix_ids = self.tokenizer(
+                prefix, add_special_tokens=True
+            )["input_ids"]
+            if (
+                len(prefix_ids) >= len(input_ids)
+                or input_ids[: len(prefix_ids)] != prefix_ids
+            ):
+                return None
+            transformers = importlib.import_module("transformers")
+            torch = importlib.import_module("torch")
+            past_key_values = transformers.DynamicCache()
+            with torch.inference_mode():
+                self.model(
+                    input_ids=torch.tensor([prefix_ids], device=self.device),
+                    past_key_values=past_key_values,
+                    use_cache=True,
+                )
+            self.prefix_cache.put(
+                key,
+                prefix_ids,
+                past_key_values,
+                self._cache_bytes(past_key_values),
+            )
+        # generate 会原地扩展 cache，必须复制
+        return copy.deepcopy(past_key_values)
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
         """
-        # 参数解析
-        max_new_tokens = kwargs.get("max_new_tokens", self.max_new_tokens)
-        temperature = kwargs.get("temperature", 0.7)
-        top_p = kwargs.get("top_p", 0.9)
-        stop = kwargs.get("stop")  # 停止词，列表或字符串
+        异步生成；开启 batching 时直接等待调度器的 future，不占用线程。
+        """
+        if not self.batching:
+            return await super().agenerate(query, **kwargs)
+        return await asyncio.wrap_future(self._submit(query, **kwargs))
 
+    def _llama_cpp_request(self, query: str, **kwargs: Any) -> Dict:
+        """
+        构造 llama.cpp create_chat_completion 的参数。
+        """
+        if self.count_tokens(query) > self._max_context():
+            raise ValueError("输入过长，已超过模型最大上下文窗口。")
+        return {
+            "messages": self._prepare_prompt(query),
+            "max_tokens": kwargs.get("max_new_tokens", self.max_new_tokens),
+            "temperature": kwargs.get("temperature", 0.7),
+            "top_p": kwargs.get("top_p", 0.9),
+            "stop": stop_sequences(kwargs.get("stop")),
+        }
+
+    def _llama_cpp_stream(self, query: str, **kwargs: Any) -> Iterator[str]:
+        request = self._llama_cpp_request(query, **kwargs)
+        with self._lock:
+            chunks = self.model.create_chat_completion(**request, stream=True)
+            try:
+                for chunk in chunks:
+                    content = chunk["choices"][0]["delta"].get("content")
+                    if content:
+                        yield content
+            finally:
+                # 关闭生成器即终止 llama.cpp 的生成
+                chunks.close()
+
+    def _generation_inputs(self, query: str, **kwargs: Any):
+        """
+        准备 model.generate 的输入（分词、长度检查、前缀缓存）与采样参数。
+        """
         # 准备 prompt
         prompt = self._prepare_prompt(query)
         self._current_prompt = prompt  # 供 _parse_response 使用
-        if self.is_max_token(prompt):
-            raise ValueError("输入过长，已超过模型最大上下文窗口。")
 
-        # 使用 transformers
+        # 使用 transformers，prompt 只分词一次，同时用于长度检查
         inputs = self.tokenizer(
             prompt,
             return_tensors="pt",
             add_special_tokens=True,
         ).to(self.device)
+        if inputs["input_ids"].shape[-1] > self._max_context():
+            raise ValueError("输入过长，已超过模型最大上下文窗口。")
 
-        with importlib.import_module("torch").inference_mode():
-            output_ids = self.model.generate(
-                **inputs,
-                max_new_tokens=max_new_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                eos_token_id=self.tokenizer.convert_tokens_to_ids("<|eot_id|>"),
-                pad_token_id=self.tokenizer.eos_token_id,
+        generate_kwargs = {
+            "max_new_tokens": kwargs.get("max_new_tokens", self.max_new_tokens),
+            "temperature": kwargs.get("temperature", 0.7),
+            "top_p": kwargs.get("top_p", 0.9),
+            "eos_token_id": self.tokenizer.convert_tokens_to_ids("<|eot_id|>"),
+            "pad_token_id": self.tokenizer.eos_token_id,
+        }
+        static_prefix = kwargs.get("static_prefix")
+        if (
+            static_prefix
+            and self.prefix_cache is not None
+            and query.startswith(static_prefix)
+        ):
+            past_key_values = self._prefix_past_key_values(
+                prompt, static_prefix, inputs["input_ids"][0].tolist()
             )
+            if past_key_values is not None:
+                generate_kwargs["past_key_values"] = past_key_values
+        return inputs, generate_kwargs
 
-        
-        gen_ids = output_ids[0][inputs["input_ids"].shape[-1]:]   # 把 prompt 长度切掉
-        result = self.tokenizer.decode(gen_ids, skip_special_tokens=True).strip()
-        # result = self._parse_response(output_ids)
+    def generate(self, query: str, **kwargs: Any) -> str:
+        """
+        调用本地 Llama-3 生成回复。开启 batching 时，并发请求会被合并成一个批次。
 
-        # # 简易 stop-word 截断
-        # if stop:
-        #     if isinstance(stop, str):
-        #         stop = [stop]
-        #     for s in stop:
-        #         if s in result:
-        #             result = result.split(s)[0]
+        可选参数
+        -----------
+        max_new_tokens : int    新生成 token 数
+        temperature     : float 采样温度
+        top_p           : float nucleus sampling
+        stop            : str | List[str] 停止词，出现后立即停止生成（见 generate_stream）
+        static_prefix   : str   query 开头的静态部分（如工具描述与固定指令），
+                                其 past_key_values 会被缓存，只需 prefill 后面的变化部分
+                                （batching 模式下不使用）
+        """
+        stop = stop_sequences(kwargs.get("stop"))
+        if self.use_llama_cpp:
+            with self._lock:
+                response = self.model.create_chat_completion(
+                    **self._llama_cpp_request(query, **kwargs)
+                )
+            return response["choices"][0]["message"]["content"].strip()
+        if self.batching:
+            # 调度器逐行检查停止词，停止的序列不再占用批次
+            return self._submit(query, **kwargs).result()
+        if len(stop) > 0:
+            return "".join(self.generate_stream(query, **kwargs)).strip()
+
+        inputs, generate_kwargs = self._generation_inputs(query, **kwargs)
+        with importlib.import_module("torch").inference_mode():
+            output_ids = self.model.generate(**inputs, **generate_kwargs)
 
+        gen_ids = output_ids[0][inputs["input_ids"].shape[-1]:]   # 把 prompt 长度切掉
+        result = self.tokenizer.decode(gen_ids, skip_special_tokens=True)
         return result.strip()
+
+    def generate_stream(self, query: str, **kwargs: Any) -> Iterator[str]:
+        """
+        流式生成：model.generate 在后台线程运行，通过 TextIteratorStreamer 逐段返回文本。
+        出现 stop 中的停止词时，StoppingCriteria 会在下一步终止生成，不再浪费 token。
+        参数与 generate 相同（batching 模式下同样逐 token 生成，不合并批次）。
+        llama.cpp 后端直接使用其流式接口，停止词由 llama.cpp 处理。
+        """
+        if self.use_llama_cpp:
+            yield from cut_at_stop(
+                self._llama_cpp_stream(query, **kwargs),
+                stop_sequences(kwargs.get("stop")),
+            )
+            return
+        transformers = importlib.import_module("transformers")
+        torch = importlib.import_module("torch")
+        inputs, generate_kwargs = self._generation_inputs(query, **kwargs)
+        streamer = transformers.TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        cancelled = threading.Event()
+        errors = []
+
+        class Cancelled(transformers.StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full(
+                    (input_ids.shape[0],),
+                    cancelled.is_set(),
+                    dtype=torch.bool,
+                    device=input_ids.device,
+                )
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    self.model.generate(
+                        **inputs,
+                        **generate_kwargs,
+                        streamer=streamer,
+                        stopping_criteria=transformers.StoppingCriteriaList(
+                            [Cancelled()]
+                        ),
+                    )
+            except Exception as e:
+                errors.append(e)
+                # 结束 streamer，避免调用方一直等待
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            yield from cut_at_stop(
+                streamer, stop_sequences(kwargs.get("stop"))
+            )
+        finally:
+            cancelled.set()
+        if len(errors) > 0:
+            raise errors[0]
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """
+        异步流式生成；在工作线程中迭代 generate_stream，不阻塞事件循环。
+        """
+        chunks = self.generate_stream(query, **kwargs)
+        end = object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, end)
+                if chunk is end:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any
+from typing import Deque
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.journal import record
+from openCHA.llms.llm import cut_at_stop
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class BatchRequest(BaseModel):
+    """
+    **Description:**
+
+        A generation request waiting in the **LlamaBatchScheduler**.
+    """
+
+    prompt: str
+    max_new_tokens: int
+    temperature: float
+    top_p: float
+    stop: List[str] = []
+    future: Future
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+    def sampling(self) -> Tuple[float, float]:
+        return self.temperature, self.top_p
+
+
+class LlamaBatchScheduler(BaseModel):
+    """
+    **Description:**
+
+        Batches the concurrent generation requests of a local transformers model. A worker thread collects the
+        requests arriving within `batch_window` seconds of the first one (up to `max_batch_size`), left-pads them,
+        and runs a single batched `generate`. Every sequence stops at its own `max_new_tokens`, at EOS, or at one
+        of its own stop sequences (checked on the newly decoded tokens of each step), and the batch ends when all
+        the sequences are done. Only requests with the same sampling parameters are batched together. Callers get
+        their results through futures.
+
+    Attributes:
+        model:          The transformers model.
+        tokenizer:      The tokenizer of the model.
+        device:         The device of the model.
+        eos_token_id:   The token ids ending a sequence.
+        batch_window:   Seconds to wait for more requests after the first one.
+        max_batch_size: Maximum number of sequences in a batch.
+    """
+
+    model: Any
+    tokenizer: Any
+    device: str = "cpu"
+    eos_token_id: List[int] = []
+    batch_window: float = 0.02
+    max_batch_size: int = 8
+    _queue: Any = PrivateAttr(default_factory=queue.Queue)
+    _pending: Deque[BatchRequest] = PrivateAttr(default_factory=deque)
+    _thread: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        stop: Optional[List[str]] = None,
+    ) -> Future:
+        """
+            Queue a prompt to be generated in the next batch.
+
+        Args:
+            prompt (str): The prompt, with the chat template already applied.
+            max_new_tokens (int): Maximum number of generated tokens of this request.
+            temperature (float): Sampling temperature.
+            top_p (float): Nucleus sampling.
+            stop (List[str]): The stop sequences of this request. The text is cut before the first one.
+        Return:
+            Future: Resolves to the generated text.
+
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._worker,
+                    name="openCHA-llama-batch",
+                    daemon=True,
+                )
+                self._thread.start()
+        future: Future = Future()
+        self._queue.put(
+            BatchRequest(
+                prompt=prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                stop=stop or [],
+                future=future,
+            )
+        )
+        return future
+
+    def _next_request(
+        self, timeout: Optional[float]
+    ) -> Optional[BatchRequest]:
+        if len(self._pending) > 0:
+            return self._pending.popleft()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self) -> List[BatchRequest]:
+        first = self._next_request(None)
+        batch = [first]
+        # requests with other sampling parameters wait for the next batch
+        skipped = []
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and len(self._pending) == 0:
+                break
+            request = self._next_request(max(remaining, 0))
+            if request is None:
+                break
+            if request.sampling() == first.sampling():
+                batch.append(request)
+            else:
+                skipped.append(request)
+        self._pending.extendleft(reversed(skipped))
+        return batch
+
+    def _finished(
+        self,
+        batch: List[BatchRequest],
+        generated: int,
+        tails: List[List[int]],
+    ) -> List[bool]:
+        """
+            Check which sequences of a batch are done after a decoding step.
+
+        Args:
+            batch (List[BatchRequest]): The requests of the batch.
+            generated (int): Number of tokens generated so far.
+            tails (List[List[int]]): The last generated tokens of each sequence, enough to hold its longest stop sequence.
+        Return:
+            List[bool]: If each sequence is done.
+
+        """
+        finished = []
+        for request, tail in zip(batch, tails):
+            if generated >= request.max_new_tokens:
+                finished.append(True)
+            elif len(request.stop) == 0 or generated == 0:
+                finished.append(False)
+            else:
+                # a stop sequence is found on the step that generates its last character
+                text = self.tokenizer.decode(
+                    tail, skip_special_tokens=True
+                )
+                finished.append(
+                    any(stop in text for stop in request.stop)
+                )
+        return finished
+
+    def _stopping_criteria(
+        self, batch: List[BatchRequest], prompt_length: int
+    ):
+        transformers = importlib.import_module("transformers")
+        torch = importlib.import_module("torch")
+        # a token has at least one character, and the first one may start before the stop sequence
+        sizes = [
+            max((len(stop) for stop in request.stop), default=0) + 1
+            for request in batch
+        ]
+        finished = self._finished
+
+        class PerSequenceStop(transformers.StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                generated = input_ids.shape[-1] - prompt_length
+                tails = [
+                    row[-min(size, generated) :].tolist()
+                    if generated > 0
+                    else []
+                    for row, size in zip(input_ids, sizes)
+                ]
+                return torch.tensor(
+                    finished(batch, generated, tails),
+                    dtype=torch.bool,
+                    device=input_ids.device,
+                )
+
+        return transformers.StoppingCriteriaList([PerSequenceStop()])
+
+    def _generate(
+        self, batch: List[BatchRequest]
+    ) -> Tuple[List[str], int]:
+        torch = importlib.import_module("torch")
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        inputs = self.tokenizer(
+            [request.prompt for request in batch],
+            return_tensors="pt",
+            padding=True,
+            add_special_tokens=True,
+        ).to(self.device)
+        prompt_length = inputs["input_ids"].shape[-1]
+        lengths = [request.max_new_tokens for request in batch]
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=max(lengths),
+                temperature=batch[0].temperature,
+                top_p=batch[0].top_p,
+                eos_token_id=self.eos_token_id,
+                pad_token_id=self.tokenizer.pad_token_id,
+                stopping_criteria=self._stopping_criteria(
+                    batch, prompt_length
+                ),
+            )
+        results = []
+        tokens = 0
+        for row, request in zip(output_ids, batch):
+            generated = row[prompt_length:].tolist()[
+                : request.max_new_tokens
+            ]
+            for index, token in enumerate(generated):
+                if token in self.eos_token_id:
+                    generated = generated[:index]
+                    break
+            tokens += len(generated)
+            text = self.tokenizer.decode(
+                generated, skip_special_tokens=True
+            )
+            results.append(
+                "".join(cut_at_stop([text], request.stop)).strip()
+            )
+        return results, tokens
+
+    def _worker(self):
+        while True:
+            batch = [
+                request
+                for request in self._collect()
+                if request.future.set_running_or_notify_cancel()
+            ]
+            if len(batch) == 0:
+                continue
+            started = time.monotonic()
+            try:
+                results, tokens = self._generate(batch)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            seconds = time.monotonic() - started
+            record(
+                "llama_batch",
+                logging.DEBUG,
+                size=len(batch),
+                tokens=tokens,
+                seconds=seconds,
+                tokens_per_second=tokens / seconds
+                if seconds > 0
+                else 0.0,
+            )
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
@@ -1,19 +1,90 @@
+import asyncio
+import math
 from abc import abstractmethod
 from typing import Any
-
+from typing import AsyncIterator
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from openCHA.tracing import trace_methods
+from openCHA.utils import iterate_sync
 from pydantic import BaseModel
 
 
+def stop_sequences(stop: Optional[Union[str, List[str]]]) -> List[str]:
+    """
+        Normalize the `stop` kwarg of the LLMs to a list of non-empty stop sequences.
+    """
+    if stop is None:
+        return []
+    if isinstance(stop, str):
+        stop = [stop]
+    return [text for text in stop if text]
+
+
+def cut_at_stop(chunks: Iterable[str], stop: List[str]) -> Iterator[str]:
+    """
+        Forward the chunks of a streamed response until one of the stop sequences appears. The text from the stop
+        sequence on is dropped and the source iterator is closed, so the generation is cancelled. The end of the
+        text is held back while it may still be the beginning of a stop sequence split across chunks.
+
+    Args:
+        chunks (Iterable[str]): The chunks of the response.
+        stop (List[str]): The stop sequences.
+    Return:
+        Iterator[str]: The chunks before the first stop sequence.
+
+    """
+    if len(stop) == 0:
+        yield from chunks
+        return
+    hold = max(len(text) for text in stop) - 1
+    buffer = ""
+    try:
+        for chunk in chunks:
+            buffer += chunk
+            indexes = [buffer.find(text) for text in stop]
+            index = min(
+                [index for index in indexes if index >= 0], default=-1
+            )
+            if index >= 0:
+                if index > 0:
+                    yield buffer[:index]
+                return
+            if len(buffer) > hold:
+                yield buffer[: len(buffer) - hold]
+                buffer = buffer[len(buffer) - hold :]
+        if buffer:
+            yield buffer
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _span_attributes(llm: "BaseLLM", query: str, **kwargs: Any):
+    return {
+        "llm": type(llm).__name__,
+        "model": kwargs.get("model_name", ""),
+        "prompt_tokens": llm.count_tokens(query, **kwargs),
+    }
+
+
 class BaseLLM(BaseModel):
     """
     **Description:**
 
         This class serves as a base class for developing new LLM interfaces connecting to online or local LLMs.
         Each new LLM should implement the **generate**, **parse_response**, and **prepare_prompt** method.
+        LLMs with a native async client should also override **agenerate**, otherwise **generate** is run in a worker thread.
         The generate method is what is called in high level and the implementation should get the input `query`
         and send it to the desired LLM and return the result. It is important to note that these LLM classes should not
         implement any extra logic rather than just sending the query over and return the generated response by the LLM.
         Look at :ref:`openai` for sample implementation.
+        The **generate** and **agenerate** methods of the subclasses are traced as `llm.generate` and `llm.agenerate` spans.
     """
 
     class Config:
@@ -21,6 +92,13 @@ class BaseLLM(BaseModel):
 
         arbitrary_types_allowed = True
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any):
+        super().__pydantic_init_subclass__(**kwargs)
+        trace_methods(
+            cls, "llm", ("generate", "agenerate"), _span_attributes
+        )
+
     @abstractmethod
     def _parse_response(self, response) -> str:
         """
@@ -68,3 +146,87 @@ class BaseLLM(BaseModel):
 
 
         """
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
+        """
+            The async version of **generate**. By default it runs **generate** in a worker thread so the event loop is not blocked.
+            Subclasses with an async client should override it and await the LLM directly.
+
+        Args:
+            self (object): The instance of the class.
+            query (str): The query for generating the response.
+            **kwargs (Any): Additional keyword arguments that may be required by subclasses.
+        Return:
+            str: The generated response.
+
+
+        """
+        return await asyncio.to_thread(self.generate, query, **kwargs)
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """
+            Stream the generated response as chunks of text as soon as the LLM produces them. It accepts the same
+            kwargs as **generate**. By default the whole response of **agenerate** is yielded as a single chunk.
+            LLMs that support streaming should override it.
+
+        Args:
+            self (object): The instance of the class.
+            query (str): The query for generating the response.
+            **kwargs (Any): Additional keyword arguments that may be required by subclasses.
+        Return:
+            AsyncIterator[str]: The chunks of the generated response.
+
+
+        """
+        yield await self.agenerate(query, **kwargs)
+
+    def generate_stream(self, query: str, **kwargs: Any) -> Iterator[str]:
+        """
+            Stream the generated response and stop as soon as one of the `stop` sequences appears. The stream of the
+            LLM is closed at that point, so the rest of the response is not generated. It accepts the same kwargs as
+            **generate**. By default **agenerate_stream** is iterated on the openCHA event loop.
+
+        Args:
+            self (object): The instance of the class.
+            query (str): The query for generating the response.
+            **kwargs (Any): Additional keyword arguments that may be required by subclasses.
+        Return:
+            Iterator[str]: The chunks of the generated response, without the stop sequence.
+
+
+        """
+        yield from cut_at_stop(
+            iterate_sync(self.agenerate_stream(query, **kwargs)),
+            stop_sequences(kwargs.get("stop")),
+        )
+
+    def supports_static_prefix(self) -> bool:
+        """
+            Whether the LLM reuses the work done for the `static_prefix` kwarg (the beginning of the query that is
+            the same across calls) instead of processing it again. Prompt builders only move the static parts of
+            their prompts to the beginning and pass `static_prefix` for these LLMs. By default it is False.
+
+        Return:
+            bool: True if `static_prefix` is used.
+
+        """
+        return False
+
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        """
+            Count the number of tokens of a text for this LLM. Used to fit the prompts into a token budget.
+            By default the common approximation of 4 characters per token is used. Subclasses with access to the
+            model's tokenizer should override it.
+
+        Args:
+            self (object): The instance of the class.
+            text (str): The text.
+            **kwargs (Any): Additional keyword arguments like model_name.
+        Return:
+            int: The number of tokens.
+
+
+        """
+        return math.ceil(len(text) / 4)
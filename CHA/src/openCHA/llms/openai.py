@@ -1,9 +1,13 @@
-from typing import Any, Dict, List, Optional, Union, Set, ClassVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Union, Set, ClassVar
 from pathlib import Path
 import base64
 import mimetypes
 
 from openCHA.llms import BaseLLM
+from openCHA.llms.http_client import get_async_openai_client
+from openCHA.llms.http_client import get_openai_client
+from openCHA.llms.rate_limit import get_rate_limiter
+from openCHA.llms.tokens import get_token_counter
 from openCHA.utils import get_from_dict_or_env
 from pydantic import model_validator
 
@@ -20,8 +24,8 @@ class OpenAILLM(BaseLLM):
     """
 
     models: ClassVar[Dict[str, int]] = {
-        "gpt-4o": 8192,
-        "gpt-4o-mini": 8192,
+        "gpt-4o": 128000,
+        "gpt-4o-mini": 128000,
         "gpt-4-0314": 8192,
         "gpt-4-0613": 8192,
         "gpt-4-32k": 32768,
@@ -53,6 +57,7 @@ class OpenAILLM(BaseLLM):
 
     api_key: str = ""
     llm_model: Any = None
+    async_llm_model: Any = None
     max_tokens: int = 150
 
     def _prepare_prompt(self, prompt: str) -> Any:
@@ -67,21 +72,21 @@ class OpenAILLM(BaseLLM):
     def validate_environment(cls, values: Dict) -> Dict:
         """
         Validate that API key and python package exist in the environment.
+        The clients are shared by all the instances with the same API key (see :mod:`openCHA.llms.http_client`).
         """
         openai_api_key = get_from_dict_or_env(
             values, "openai_api_key", "OPENAI_API_KEY"
         )
         values["api_key"] = openai_api_key
-        try:
-            from openai import OpenAI
-            values["llm_model"] = OpenAI()
-        except ImportError:
-            raise ValueError(
-                "Could not import openai python package. "
-                "Please install it with `pip install openai`."
-            )
+        values["llm_model"] = get_openai_client(openai_api_key)
         return values
 
+    def _async_client(self) -> Any:
+        # the async clients are shared per event loop, so the client is looked up on each call
+        if self.async_llm_model is not None:
+            return self.async_llm_model
+        return get_async_openai_client(self.api_key)
+
     def get_model_names(self) -> List[str]:
         return list(self.models.keys())
 
@@ -90,22 +95,18 @@ class OpenAILLM(BaseLLM):
         Token estimation for text prompts. When images are included,
         this check is skipped (images are not tokenized via tiktoken).
         """
-        model_max_token = self.models[model_name]
-        try:
-            import tiktoken
-        except ImportError:
-            raise ValueError(
-                "Could not import tiktoken python package. "
-                "This is needed in order to calculate get_num_tokens. "
-                "Please install it with `pip install tiktoken`."
-            )
-        encoder = "gpt2"
-        if model_name in ("text-davinci-003", "text-davinci-002") or model_name.startswith("code"):
-            encoder = "p50k_base"
+        return self.models[model_name] < self.count_tokens(
+            query, model_name=model_name
+        )
 
-        enc = tiktoken.get_encoding(encoder)
-        tokenized_text = enc.encode(query)
-        return model_max_token < len(tokenized_text)
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        """
+        Count the tokens of a text with the tiktoken encoding of the model using the shared **TokenCounter**.
+        Falls back to the approximation of **BaseLLM** if the encoding is not available.
+        """
+        return get_token_counter().count(
+            text, kwargs.get("model_name", "gpt-4o")
+        )
 
     def _parse_response(self, response) -> str:
         return response.choices[0].message.content
@@ -175,19 +176,10 @@ class OpenAILLM(BaseLLM):
             # Preserve original behavior for text-only (single system message)
             return [{"role": "system", "content": prompt}]
 
-    # ---------- Public API ----------
-    def generate(
-        self,
-        query: str,
-        **kwargs: Any,
-    ) -> str:
+    def _prepare_request(self, query: str, **kwargs: Any) -> Dict[str, Any]:
         """
-        Generate a response.
-
-        New optional kwargs:
-            images: List[str | Path]  # image URLs or local paths
-            system_prompt: str        # optional system instruction
-            image_detail: str         # 'low' | 'high' | 'auto' (default 'auto')
+        Validate the generation kwargs and build the chat.completions request
+        shared by **generate** and **agenerate**.
         """
         model_name = kwargs.get("model_name", "gpt-4o")
         if model_name not in self.get_model_names():
@@ -209,30 +201,98 @@ class OpenAILLM(BaseLLM):
         stop = kwargs.get("stop")
         max_tokens = kwargs.get("max_tokens", self.max_tokens)
 
-        # For text-only prompts, optionally enforce token limit check
+        # For text-only prompts, enforce the token limit
         # (skip when images are present, because tiktoken doesn't count images)
-        if not images:
-            try:
-                if self.is_max_token(model_name, query):
-                    raise ValueError(
-                        f"Your prompt exceeds the max token limit for model '{model_name}'."
-                    )
-            except Exception:
-                # Do not block the call if tiktoken isn't available
-                pass
-
-        self.llm_model.api_key = self.api_key
+        if not images and self.is_max_token(model_name, query):
+            raise ValueError(
+                f"Your prompt exceeds the max token limit for model '{model_name}'."
+            )
+
         messages = self._prepare_messages(
             prompt=query,
             images=images,
             system_prompt=system_prompt,
             image_detail=image_detail,
         )
+        request = {
+            "model": model_name,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "stop": stop,
+        }
+        if kwargs.get("temperature") is not None:
+            request["temperature"] = kwargs["temperature"]
+        return request
+
+    def _request_tokens(self, query: str, request: Dict[str, Any]) -> int:
+        """
+        The tokens of a request counted against the rate limits: the prompt
+        and the maximum output.
+        """
+        return self.count_tokens(
+            query, model_name=request["model"]
+        ) + (request["max_tokens"] or 0)
+
+    # ---------- Public API ----------
+    def generate(
+        self,
+        query: str,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Generate a response.
+
+        New optional kwargs:
+            images: List[str | Path]  # image URLs or local paths
+            system_prompt: str        # optional system instruction
+            image_detail: str         # 'low' | 'high' | 'auto' (default 'auto')
+        """
+        request = self._prepare_request(query, **kwargs)
+        get_rate_limiter().acquire(
+            request["model"], self._request_tokens(query, request)
+        )
+        response = self.llm_model.chat.completions.create(**request)
+        return self._parse_response(response)
 
-        response = self.llm_model.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            max_tokens=max_tokens,
-            stop=stop,
+    async def agenerate(
+        self,
+        query: str,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Async version of **generate** using the `AsyncOpenAI` client.
+        It accepts the same kwargs as **generate**.
+        """
+        request = self._prepare_request(query, **kwargs)
+        await get_rate_limiter().aacquire(
+            request["model"], self._request_tokens(query, request)
+        )
+        response = await self._async_client().chat.completions.create(
+            **request
         )
         return self._parse_response(response)
+
+    async def agenerate_stream(
+        self,
+        query: str,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response of **agenerate** chunk by chunk.
+        It accepts the same kwargs as **generate**.
+        """
+        request = self._prepare_request(query, **kwargs)
+        await get_rate_limiter().aacquire(
+            request["model"], self._request_tokens(query, request)
+        )
+        stream = await self._async_client().chat.completions.create(
+            **request, stream=True
+        )
+        try:
+            async for chunk in stream:
+                if len(chunk.choices) > 0 and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # closing the response cancels the generation when the
+            # consumer stops early (e.g. at a stop sequence)
+            await stream.close()
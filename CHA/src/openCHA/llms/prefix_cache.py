@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class PrefixCache(BaseModel):
+    """
+    **Description:**
+
+        An in-memory cache of the key/value states (`past_key_values`) of static prompt prefixes of a local model,
+        e.g. the tool descriptions and the fixed instructions of the planner prompts. A prompt starting with a cached
+        prefix only prefills its variable suffix. The entries are keyed by the hash of the prefix text and store its
+        token ids, so a prefix that tokenizes differently inside the prompt is not reused. The least recently used
+        entries are evicted when their total size exceeds `max_bytes`.
+
+    Attributes:
+        max_bytes:      Maximum total size of the cached states in bytes.
+        hits:           Number of prompts that reused a cached prefix.
+        misses:         Number of prompts whose prefix was not cached.
+        saved_tokens:   Number of prompt tokens that were not prefilled thanks to the cache.
+    """
+
+    max_bytes: int = 2 * 1024**3
+    hits: int = 0
+    misses: int = 0
+    saved_tokens: int = 0
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _bytes: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def make_key(model: str, prefix: str) -> str:
+        """
+            Create the key of a prefix.
+
+        Args:
+            model (str): The name or path of the model.
+            prefix (str): The prefix text, with the chat template applied.
+        Return:
+            str: The key.
+
+        """
+        return hashlib.sha256(
+            f"{model}\n{prefix}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str, token_ids: List[int]) -> Optional[Any]:
+        """
+            Look up the states of a prefix.
+
+        Args:
+            key (str): The key created by **make_key**.
+            token_ids (List[int]): The token ids of the whole prompt.
+        Return:
+            Optional[Any]: The cached states, or None if the prefix is not cached or is not a strict prefix of the
+            prompt tokens. The states must be copied before they are extended.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                prefix_ids, states, _ = entry
+                length = len(prefix_ids)
+                if (
+                    length < len(token_ids)
+                    and token_ids[:length] == prefix_ids
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_tokens += length
+                    return states
+            self.misses += 1
+            return None
+
+    def put(
+        self, key: str, token_ids: List[int], states: Any, size: int
+    ):
+        """
+            Store the states of a prefix and evict the least recently used entries if the cache is too large.
+
+        Args:
+            key (str): The key created by **make_key**.
+            token_ids (List[int]): The token ids of the prefix.
+            states (Any): The `past_key_values` of the prefix.
+            size (int): The size of the states in bytes.
+
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[2]
+            self._entries[key] = (list(token_ids), states, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        """
+        Remove all the cached states. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Return the counters and the current size of the cache.
+
+        Return:
+            Dict[str, int]: hits, misses, saved_tokens, entries and bytes.
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "saved_tokens": self.saved_tokens,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
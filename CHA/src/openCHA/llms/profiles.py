@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.llms import BaseLLM
+from openCHA.llms.initialize_llm import initialize_llm
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class GenerationProfile(BaseModel):
+    """
+    **Description:**
+
+        The generation settings of one kind of LLM call (e.g. the strategy or the evaluation of the planner).
+        The unset settings keep the values of the caller and of the LLM.
+
+    Attributes:
+        llm:            The LLM type used for the calls. None uses the LLM of the component.
+        model_name:     The model of the LLM (e.g. `gpt-4o-mini` for OpenAI).
+        max_tokens:     The maximum number of generated tokens.
+        stop:           The stop sequences.
+        escalate_to:    The profile used again when the response cannot be used (see the evaluation of the planner).
+    """
+
+    llm: Optional[str] = None
+    model_name: Optional[str] = None
+    max_tokens: Optional[int] = None
+    stop: Optional[List[str]] = None
+    escalate_to: Optional[str] = None
+
+    def apply(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+            Return a copy of the generation kwargs with the settings of the profile.
+
+        Args:
+            kwargs (Dict[str, Any]): The generation kwargs of the caller.
+        Return:
+            Dict[str, Any]: The updated kwargs.
+
+        """
+        kwargs = dict(kwargs)
+        if self.model_name is not None:
+            kwargs["model_name"] = self.model_name
+        if self.max_tokens is not None:
+            # the max tokens kwargs of the OpenAI, Llama, and Anthropic LLMs
+            kwargs["max_tokens"] = self.max_tokens
+            kwargs["max_new_tokens"] = self.max_tokens
+            kwargs["max_token"] = self.max_tokens
+        if self.stop is not None:
+            kwargs["stop"] = self.stop
+        return kwargs
+
+
+def _default_profiles() -> Dict[str, GenerationProfile]:
+    return {
+        "strategy": GenerationProfile(
+            model_name="gpt-4o", max_tokens=1500, stop=["Wait"]
+        ),
+        # one of the parallel strategies (see TreeOfThoughtStepPlanner.strategy_branches)
+        "strategy_branch": GenerationProfile(
+            model_name="gpt-4o", max_tokens=800, stop=["Wait"]
+        ),
+        "branch_scoring": GenerationProfile(
+            model_name="gpt-4o-mini", max_tokens=10
+        ),
+        # mostly a formatting task, escalated on a bad response
+        "evaluation": GenerationProfile(
+            model_name="gpt-4o-mini",
+            max_tokens=1000,
+            stop=["Wait"],
+            escalate_to="evaluation_escalated",
+        ),
+        "evaluation_escalated": GenerationProfile(
+            model_name="gpt-4o", max_tokens=1500, stop=["Wait"]
+        ),
+        # the callers split the token budget between the chunks
+        "summarization": GenerationProfile(model_name="gpt-4o-mini"),
+        "final_answer": GenerationProfile(
+            model_name="gpt-4o", max_tokens=2000
+        ),
+        "codegen": GenerationProfile(
+            model_name="gpt-4o", max_tokens=1500
+        ),
+    }
+
+
+class GenerationProfiles(BaseModel):
+    """
+    **Description:**
+
+        The named generation profiles of the planner, the response generator, and the tasks. The defaults are made
+        for the OpenAI LLMs: `strategy`, `strategy_branch` and `branch_scoring` (parallel strategies), `evaluation`
+        (with `gpt-4o-mini`, escalated to `evaluation_escalated`), `summarization`, `final_answer`, and `codegen`.
+        The calls of a missing profile are not changed.
+
+    Example:
+        .. code-block:: python
+
+            from openCHA.llms import GenerationProfile, GenerationProfiles, LLMType
+            profiles = GenerationProfiles()
+            # evaluate with the local model first
+            profiles.profiles["evaluation"] = GenerationProfile(
+                llm=LLMType.LLAMA, max_tokens=1000, escalate_to="evaluation_escalated"
+            )
+
+    """
+
+    profiles: Dict[str, GenerationProfile] = Field(
+        default_factory=_default_profiles
+    )
+
+    def get(self, name: str) -> Optional[GenerationProfile]:
+        return self.profiles.get(name)
+
+    def resolve(
+        self, name: str, llm: BaseLLM, kwargs: Dict[str, Any]
+    ) -> Tuple[BaseLLM, Dict[str, Any]]:
+        """
+            Return the LLM and the generation kwargs of a call with a profile.
+
+        Args:
+            name (str): The name of the profile.
+            llm (BaseLLM): The LLM of the component.
+            kwargs (Dict[str, Any]): The generation kwargs of the caller.
+        Return:
+            Tuple[BaseLLM, Dict[str, Any]]: The LLM and the kwargs to use.
+
+        """
+        profile = self.get(name)
+        if profile is None:
+            return llm, kwargs
+        if profile.llm is not None:
+            llm = initialize_llm(profile.llm, lazy=True)
+        return llm, profile.apply(kwargs)
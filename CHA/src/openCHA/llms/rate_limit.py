@@ -0,0 +1,374 @@
+"""
+Process-wide rate limiting of the outbound LLM calls.
+
+Each configured model has a requests-per-minute and a tokens-per-minute token bucket. A call first waits until
+both buckets can pay for it, with the tokens counted before the call (prompt plus the maximum output). The waiting
+calls of a model are served by priority, so final answers and interactive turns go ahead of summaries and
+background work. The priority of the calls is set for a block of code with **llm_priority**.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.tracing import current_span
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class Priority(IntEnum):
+    """
+    **Description:**
+
+        Priority classes of the LLM calls. Lower values are served first.
+    """
+
+    FINAL_ANSWER = 0
+    INTERACTIVE = 1
+    SUMMARY = 2
+    BACKGROUND = 3
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "openCHA_llm_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    """
+        Set the priority of the LLM calls made in a block of code (including the tasks and threads started from it).
+
+    Args:
+        priority (Priority): The priority.
+
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """
+    Return the priority of the LLM calls made in the current context.
+    """
+    return _priority.get()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _report_wait(waited: float):
+    span = current_span()
+    if span is not None:
+        span.set_attribute("rate_limit_wait", waited)
+
+
+class RateLimit(BaseModel):
+    """
+    **Description:**
+
+        The limits of a model. A limit of 0 is not enforced.
+
+    Attributes:
+        requests_per_minute:    Maximum number of requests per minute.
+        tokens_per_minute:      Maximum number of tokens (prompt and maximum output) per minute.
+    """
+
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+
+class _Buckets(BaseModel):
+    limit: RateLimit
+    requests: float = 0.0
+    tokens: float = 0.0
+    updated: float = 0.0
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(
+            self.limit.requests_per_minute,
+            self.requests
+            + elapsed * self.limit.requests_per_minute / 60,
+        )
+        self.tokens = min(
+            self.limit.tokens_per_minute,
+            self.tokens + elapsed * self.limit.tokens_per_minute / 60,
+        )
+
+    def cost(self, tokens: int) -> Tuple[float, float]:
+        # a call larger than the bucket waits for a full bucket
+        return (
+            1.0 if self.limit.requests_per_minute > 0 else 0.0,
+            float(min(tokens, self.limit.tokens_per_minute)),
+        )
+
+    def delay(self, tokens: int) -> float:
+        requests, tokens = self.cost(tokens)
+        delay = 0.0
+        if requests > self.requests:
+            delay = (
+                (requests - self.requests)
+                * 60
+                / self.limit.requests_per_minute
+            )
+        if tokens > self.tokens:
+            delay = max(
+                delay,
+                (tokens - self.tokens)
+                * 60
+                / self.limit.tokens_per_minute,
+            )
+        return delay
+
+
+class RateLimiter(BaseModel):
+    """
+    **Description:**
+
+        The governor of the outbound LLM calls. See the module description. Models without limits are not
+        delayed.
+
+    Attributes:
+        limits:     The limits per model name. The `*` entry applies to the models without their own limits.
+    """
+
+    limits: Dict[str, RateLimit] = {}
+    _buckets: Dict[str, _Buckets] = PrivateAttr(default_factory=dict)
+    _waiting: Dict[str, List[Tuple[int, int]]] = PrivateAttr(
+        default_factory=dict
+    )
+    _counter: Any = PrivateAttr(default_factory=itertools.count)
+    _condition: Any = PrivateAttr(default_factory=threading.Condition)
+    _granted: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _waited: Dict[str, float] = PrivateAttr(default_factory=dict)
+    # the future of every call waiting in **aacquire** and its event loop, by ticket
+    _wakeups: Dict[Tuple[int, int], Tuple[Any, Any]] = PrivateAttr(
+        default_factory=dict
+    )
+
+    def _limit(self, model: str) -> Optional[RateLimit]:
+        return self.limits.get(model, self.limits.get("*"))
+
+    def _model_buckets(
+        self, model: str, limit: RateLimit
+    ) -> _Buckets:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            buckets = _Buckets(
+                limit=limit,
+                requests=limit.requests_per_minute,
+                tokens=limit.tokens_per_minute,
+                updated=time.monotonic(),
+            )
+            self._buckets[model] = buckets
+        return buckets
+
+    def _enqueue(
+        self, model: str, limit: RateLimit, priority: Priority
+    ) -> Tuple[_Buckets, List[Tuple[int, int]], Tuple[int, int]]:
+        buckets = self._model_buckets(model, limit)
+        waiting = self._waiting.setdefault(model, [])
+        ticket = (int(priority), next(self._counter))
+        heapq.heappush(waiting, ticket)
+        return buckets, waiting, ticket
+
+    def _dequeue(self, waiting: List[Tuple[int, int]], ticket):
+        waiting.remove(ticket)
+        heapq.heapify(waiting)
+        self._notify()
+
+    def _notify(self):
+        # wake the threads and the event loops waiting for a grant
+        self._condition.notify_all()
+        for loop, future in self._wakeups.values():
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:  # the loop of the waiter is closed
+                pass
+
+    def _grant(
+        self,
+        model: str,
+        tokens: int,
+        priority: Priority,
+        buckets: _Buckets,
+        waiting: List[Tuple[int, int]],
+        started: float,
+    ) -> float:
+        heapq.heappop(waiting)
+        requests, tokens = buckets.cost(tokens)
+        buckets.requests -= requests
+        buckets.tokens -= tokens
+        waited = time.monotonic() - started
+        key = f"{model}:{priority.name.lower()}"
+        self._granted[key] = self._granted.get(key, 0) + 1
+        self._waited[key] = self._waited.get(key, 0.0) + waited
+        # the next waiter becomes the head
+        self._notify()
+        return waited
+
+    def acquire(
+        self,
+        model: str,
+        tokens: int,
+        priority: Optional[Priority] = None,
+    ) -> float:
+        """
+            Wait until a call can be made within the limits of its model and pay for it.
+
+        Args:
+            model (str): The name of the model.
+            tokens (int): The tokens of the call, counted before the call.
+            priority (Priority): The priority of the call. Defaults to **current_priority**.
+        Return:
+            float: The time waited in seconds.
+
+        """
+        limit = self._limit(model)
+        if limit is None:
+            return 0.0
+        priority = Priority(
+            current_priority() if priority is None else priority
+        )
+        started = time.monotonic()
+        with self._condition:
+            buckets, waiting, ticket = self._enqueue(
+                model, limit, priority
+            )
+            try:
+                while True:
+                    buckets.refill(time.monotonic())
+                    timeout = None
+                    if waiting[0] == ticket:
+                        timeout = buckets.delay(tokens)
+                        if timeout <= 0:
+                            break
+                    self._condition.wait(timeout)
+            except BaseException:
+                self._dequeue(waiting, ticket)
+                raise
+            waited = self._grant(
+                model, tokens, priority, buckets, waiting, started
+            )
+        _report_wait(waited)
+        return waited
+
+    async def aacquire(
+        self,
+        model: str,
+        tokens: int,
+        priority: Optional[Priority] = None,
+    ) -> float:
+        """
+        Async version of **acquire**. The call waits on the event loop in the same queue as the threads
+        calling **acquire**, and is woken up when a call is granted or its own delay is over.
+        """
+        limit = self._limit(model)
+        if limit is None:
+            return 0.0
+        priority = Priority(
+            current_priority() if priority is None else priority
+        )
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        with self._condition:
+            buckets, waiting, ticket = self._enqueue(
+                model, limit, priority
+            )
+        try:
+            while True:
+                with self._condition:
+                    buckets.refill(time.monotonic())
+                    timeout = None
+                    if waiting[0] == ticket:
+                        timeout = buckets.delay(tokens)
+                        if timeout <= 0:
+                            self._wakeups.pop(ticket, None)
+                            waited = self._grant(
+                                model,
+                                tokens,
+                                priority,
+                                buckets,
+                                waiting,
+                                started,
+                            )
+                            break
+                    wakeup = loop.create_future()
+                    self._wakeups[ticket] = (loop, wakeup)
+                await asyncio.wait([wakeup], timeout=timeout)
+        except BaseException:
+            with self._condition:
+                self._wakeups.pop(ticket, None)
+                self._dequeue(waiting, ticket)
+            raise
+        _report_wait(waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Return the queue depths and the counters of the limiter.
+
+        Return:
+            Dict[str, Any]: `queue_depth` per model and priority, and `granted` and `waited` (seconds) per
+            `model:priority`.
+
+        """
+        with self._condition:
+            depth: Dict[str, Dict[str, int]] = {}
+            for model, waiting in self._waiting.items():
+                depth[model] = {}
+                for priority, _ in waiting:
+                    name = Priority(priority).name.lower()
+                    depth[model][name] = depth[model].get(name, 0) + 1
+            return {
+                "queue_depth": depth,
+                "granted": dict(self._granted),
+                "waited": dict(self._waited),
+            }
+
+
+_rate_limiter = RateLimiter()
+
+
+def configure_rate_limits(limits: Dict[str, RateLimit]):
+    """
+        Replace the limits of the process-wide rate limiter.
+
+    Args:
+        limits (Dict[str, RateLimit]): The limits per model name, `*` for the other models.
+
+    Example:
+        .. code-block:: python
+
+            from openCHA.llms import RateLimit, configure_rate_limits
+            configure_rate_limits({"gpt-4o": RateLimit(requests_per_minute=500, tokens_per_minute=30000)})
+
+    """
+    global _rate_limiter
+    _rate_limiter = RateLimiter(limits=limits)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide rate limiter of the LLM calls.
+    """
+    return _rate_limiter
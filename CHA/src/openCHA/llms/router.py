@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.journal import record
+from openCHA.llms import BaseLLM
+from openCHA.tracing import current_span
+from openCHA.utils import run_sync
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class RoutingPolicy(BaseModel):
+    """
+    **Description:**
+
+        How a **RouterLLM** uses its backends. Each component (planner, response generator) can have its own policy.
+
+    Attributes:
+        fallbacks:          The LLM types used after the primary one (only used by the initializers).
+        hedge:              Send a duplicate request to the next backend when the primary is slower than usual.
+        hedge_percentile:   The latency percentile of the primary after which the duplicate request is sent.
+        min_samples:        Number of latencies of the primary needed before hedging.
+        window:             Number of recent latencies kept per backend.
+        fallback:           Try the next backend when a backend fails.
+    """
+
+    fallbacks: List[str] = []
+    hedge: bool = True
+    hedge_percentile: float = 0.95
+    min_samples: int = 20
+    window: int = 200
+    fallback: bool = True
+
+
+class RouterLLM(BaseLLM):
+    """
+    **Description:**
+
+        Routes the calls over several LLM backends to cap the tail latency. The first backend is the primary. When
+        it takes longer than its recent `hedge_percentile` latency, the same request is sent to the next backend,
+        the first response wins, and the other request is cancelled. Failed requests fall back to the next backend.
+        For streams, the latency to the first chunk is used and the backend is chosen before the first chunk.
+
+        Cancelling a request of a local model that runs in a worker thread does not stop the thread.
+
+    Example:
+        .. code-block:: python
+
+            from openCHA.llms import LLMType, RouterLLM, initialize_llm
+            llm = RouterLLM(backends=[initialize_llm(LLMType.OPENAI), initialize_llm(LLMType.LLAMA, lazy=True)])
+
+    """
+
+    backends: List[BaseLLM]
+    policy: RoutingPolicy = RoutingPolicy()
+    _latencies: Dict[Tuple[int, str], Deque[float]] = PrivateAttr(
+        default_factory=dict
+    )
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _parse_response(self, response) -> str:
+        return self.backends[0]._parse_response(response)
+
+    def _prepare_prompt(self, prompt) -> Any:
+        return self.backends[0]._prepare_prompt(prompt)
+
+    def count_tokens(self, text: str, **kwargs: Any) -> int:
+        return self.backends[0].count_tokens(text, **kwargs)
+
+    def _name(self, index: int) -> str:
+        backend = self.backends[index]
+        llm_class = getattr(backend, "llm_class", None)
+        return (llm_class or type(backend)).__name__
+
+    def _observe(self, index: int, kind: str, seconds: float):
+        with self._lock:
+            latencies = self._latencies.setdefault(
+                (index, kind), deque(maxlen=self.policy.window)
+            )
+            latencies.append(seconds)
+
+    def _percentile(self, index: int, kind: str) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get((index, kind), ()))
+        if len(latencies) < max(self.policy.min_samples, 1):
+            return None
+        position = math.ceil(
+            self.policy.hedge_percentile * len(latencies)
+        )
+        return latencies[
+            min(max(position - 1, 0), len(latencies) - 1)
+        ]
+
+    def latencies(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+            Return the hedging thresholds of the backends.
+
+        Return:
+            Dict[str, Dict[str, Optional[float]]]: The `hedge_percentile` latency of the responses and of the first
+            chunks of the streams per backend, or None if there are not enough samples.
+
+        """
+        return {
+            f"{index}:{self._name(index)}": {
+                kind: self._percentile(index, kind)
+                for kind in ("response", "first_chunk")
+            }
+            for index in range(len(self.backends))
+        }
+
+    async def _race(
+        self, kind: str, make: Callable[[int], Awaitable[Any]]
+    ) -> Tuple[int, Any]:
+        """
+            Run the request on the primary backend, hedge and fall back as the policy says.
+
+        Args:
+            kind (str): `response` or `first_chunk`, the latency that is measured.
+            make (Callable): Creates the request of a backend from its index.
+        Return:
+            Tuple[int, Any]: The index of the backend that answered first and its result.
+        Raise:
+            Exception: The error of the last backend if all of them failed.
+
+        """
+        tasks: Dict[asyncio.Future, Tuple[int, float]] = {}
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            tasks[asyncio.ensure_future(make(next_index))] = (
+                next_index,
+                time.monotonic(),
+            )
+            next_index += 1
+
+        launch()
+        started = time.monotonic()
+        hedged = False
+        error = None
+        try:
+            while len(tasks) > 0:
+                timeout = None
+                threshold = self._percentile(0, kind)
+                if (
+                    self.policy.hedge
+                    and not hedged
+                    and threshold is not None
+                    and next_index < len(self.backends)
+                ):
+                    timeout = max(
+                        threshold - (time.monotonic() - started), 0
+                    )
+                done, _ = await asyncio.wait(
+                    list(tasks),
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if len(done) == 0:
+                    hedged = True
+                    record(
+                        "llm_hedged",
+                        primary=self._name(0),
+                        backend=self._name(next_index),
+                        threshold=threshold,
+                    )
+                    launch()
+                    continue
+                for task in done:
+                    index, task_started = tasks.pop(task)
+                    if task.exception() is None:
+                        self._observe(
+                            index,
+                            kind,
+                            time.monotonic() - task_started,
+                        )
+                        span = current_span()
+                        if span is not None:
+                            span.set_attribute(
+                                "backend", self._name(index)
+                            )
+                            span.set_attribute("hedged", hedged)
+                        return index, task.result()
+                    error = task.exception()
+                    record(
+                        "llm_backend_failed",
+                        logging.WARNING,
+                        backend=self._name(index),
+                        error=repr(error),
+                    )
+                if (
+                    len(tasks) == 0
+                    and self.policy.fallback
+                    and next_index < len(self.backends)
+                ):
+                    launch()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if len(tasks) > 0:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def generate(self, query: str, **kwargs: Any) -> str:
+        """
+            Generate a response with the backends. See **agenerate**.
+
+        Args:
+            query (str): The query for generating the response.
+            **kwargs (Any): The kwargs of the backends.
+        Return:
+            str: The generated response.
+
+        """
+        return run_sync(self.agenerate(query, **kwargs))
+
+    async def agenerate(self, query: str, **kwargs: Any) -> str:
+        _, response = await self._race(
+            "response",
+            lambda index: self.backends[index].agenerate(
+                query, **kwargs
+            ),
+        )
+        return response
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        streams: Dict[int, Any] = {}
+
+        async def first_chunk(index: int) -> Optional[str]:
+            streams[index] = self.backends[index].agenerate_stream(
+                query, **kwargs
+            )
+            try:
+                return await streams[index].__anext__()
+            except StopAsyncIteration:
+                return None
+
+        winner = None
+        try:
+            winner, chunk = await self._race(
+                "first_chunk", first_chunk
+            )
+        finally:
+            # close the streams of the cancelled or failed backends
+            for index, stream in list(streams.items()):
+                if index != winner:
+                    await stream.aclose()
+        if chunk is None:
+            return
+        try:
+            yield chunk
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            await streams[winner].aclose()
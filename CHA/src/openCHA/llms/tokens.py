@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+def encoding_name(model_name: str) -> str:
+    """
+        Return the name of the tiktoken encoding of an OpenAI model.
+
+    Args:
+        model_name (str): The name of the model.
+    Return:
+        str: `o200k_base` for the 4o and later models, `cl100k_base` for gpt-4 and gpt-3.5, `p50k_base` for the
+        codex and text-davinci models, and `r50k_base` for the older ones.
+
+    """
+    model_name = model_name.lower()
+    if model_name.startswith(
+        ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+    ):
+        return "o200k_base"
+    if model_name.startswith(("gpt-4", "gpt-3.5", "text-embedding")):
+        return "cl100k_base"
+    if model_name.startswith(
+        ("text-davinci-002", "text-davinci-003", "code-")
+    ):
+        return "p50k_base"
+    return "r50k_base"
+
+
+class TokenCounter(BaseModel):
+    """
+    **Description:**
+
+        A shared token counting service. The tiktoken encoders are loaded once per encoding, and the counts of texts
+        up to `max_text_length` characters are memoized, so repeated static prompt segments (e.g. the tool
+        descriptions) are tokenized once. The counts are keyed by a 16 bytes digest of the text, so the memo does
+        not keep the prompts alive and takes about 200 bytes per entry. If the encoder can not be loaded (tiktoken
+        is not installed or the encoding can not be downloaded), the approximation of 4 characters per token is used.
+
+    Attributes:
+        max_entries:        Maximum number of memoized counts.
+        max_text_length:    Longer texts are counted but not memoized.
+    """
+
+    max_entries: int = 4096
+    max_text_length: int = 32768
+    _encoders: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _counts: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def encoder(self, name: str) -> Optional[Any]:
+        """
+            Return the tiktoken encoder of an encoding, or None if it can not be loaded.
+
+        Args:
+            name (str): The name of the encoding, e.g. `o200k_base`.
+        Return:
+            Optional[Any]: The encoder.
+
+        """
+        with self._lock:
+            if name in self._encoders:
+                return self._encoders[name]
+        try:
+            import tiktoken
+
+            encoder = tiktoken.get_encoding(name)
+        except Exception:
+            encoder = None
+        with self._lock:
+            self._encoders[name] = encoder
+        return encoder
+
+    def count(
+        self,
+        text: str,
+        model_name: str = "gpt-4o",
+        encode: Optional[Callable[[str], Any]] = None,
+    ) -> int:
+        """
+            Count the tokens of a text.
+
+        Args:
+            text (str): The text.
+            model_name (str): The OpenAI model whose encoding is used, or the name of the tokenizer if `encode` is given.
+            encode (Callable): Optional tokenizer (e.g. of a local model) returning the list of tokens of a text.
+        Return:
+            int: The number of tokens.
+
+        """
+        if len(text) == 0:
+            return 0
+        if encode is None:
+            name = encoding_name(model_name)
+        else:
+            name = model_name
+        memoize = len(text) <= self.max_text_length
+        if memoize:
+            key = (
+                name,
+                hashlib.blake2b(
+                    text.encode("utf-8"), digest_size=16
+                ).digest(),
+            )
+            with self._lock:
+                count = self._counts.get(key)
+                if count is not None:
+                    self._counts.move_to_end(key)
+                    return count
+        if encode is not None:
+            count = len(encode(text))
+        else:
+            encoder = self.encoder(name)
+            if encoder is None:
+                count = math.ceil(len(text) / 4)
+            else:
+                count = len(
+                    encoder.encode(text, disallowed_special=())
+                )
+        if memoize:
+            with self._lock:
+                self._counts[key] = count
+                while len(self._counts) > self.max_entries:
+                    self._counts.popitem(last=False)
+        return count
+
+    def count_segments(
+        self, segments: Iterable[str], model_name: str = "gpt-4o"
+    ) -> int:
+        """
+            Count the tokens of a prompt made of several segments. Counting the static segments separately lets them
+            be memoized even if the whole prompt changes on every call. The result can be off by a few tokens at the
+            boundaries of the segments.
+
+        Args:
+            segments (Iterable[str]): The segments of the prompt.
+            model_name (str): The OpenAI model whose encoding is used.
+        Return:
+            int: The number of tokens.
+
+        """
+        return sum(
+            self.count(segment, model_name) for segment in segments
+        )
+
+
+_token_counter = TokenCounter()
+
+
+def get_token_counter() -> TokenCounter:
+    """
+    Return the token counter shared by the LLMs, the planners, and the response generators.
+    """
+    return _token_counter
@@ -1,12 +1,24 @@
+import base64
+import mimetypes
 import os
+import re
+import threading
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Tuple
 from typing import Optional
 
 from openCHA.datapipes import DatapipeType
 from openCHA.interface import Interface
+from openCHA.llms import get_async_openai_client
+from openCHA.llms import get_openai_client
 from openCHA.llms import LLMType
 from openCHA.orchestrator import Orchestrator
+from openCHA.orchestrator import OrchestratorPool
+from openCHA.orchestrator import SessionState
 from openCHA.planners import Action
 from openCHA.planners import PlannerType
 from openCHA.response_generators import (
@@ -14,13 +26,76 @@ from openCHA.response_generators import (
 )
 from openCHA.tasks import TASK_TO_CLASS
 from openCHA.tasks import TaskType
+from openCHA.utils import iterate_sync
 from openCHA.utils import parse_addresses
 from pydantic import BaseModel
+from pydantic import Field
+from pydantic import PrivateAttr
+
+
+def _extract_url(text: str) -> Optional[str]:
+    """Return the first http/https/data image URL found in the text."""
+    if not text:
+        return None
+    m = re.search(r"(https?://\S+|data:image/\w+;base64,[A-Za-z0-9+/=]+)", text, re.IGNORECASE)
+    if m:
+        return m.group(1).rstrip(').,;\'"')
+    return None
+
+
+def _extract_local_path(text: str) -> Optional[str]:
+    """Return a local image path starting at BOL or after whitespace (avoid matching https://...)."""
+    if not text:
+        return None
+    m = re.search(r"(?:(?<=\s)|^)(/[^ \n\t]+\.(?:jpg|jpeg|png|webp|gif|bmp))", text, re.IGNORECASE)
+    if m:
+        return m.group(1)
+    return None
+
+
+def _to_data_url(local_path: str) -> Optional[str]:
+    """Convert a local image file to a data URL; return None if unreadable."""
+    try:
+        if not os.path.exists(local_path):
+            return None
+        mime, _ = mimetypes.guess_type(local_path)
+        if mime is None:
+            mime = "image/jpeg"
+        with open(local_path, "rb") as f:
+            b64 = base64.b64encode(f.read()).decode("utf-8")
+        return f"data:{mime};base64,{b64}"
+    except Exception:
+        return None
+
+
+def _stream_safe(text: str) -> str:
+    """Hold back a trailing `address:...` reference that may still be incomplete while streaming."""
+    index = text.rfind("address:")
+    if index != -1 and not re.search(r"\s", text[index:]):
+        return text[:index]
+    for size in range(len("address:") - 1, 0, -1):
+        if text.endswith("address:"[:size]):
+            return text[:-size]
+    return text
+
+
+def _strip_image_refs(text: str) -> str:
+    """Remove URLs and local paths so only the user's question remains."""
+    if not text:
+        return ""
+    t = re.sub(r"https?://\S+", "", text)  # remove URLs
+    t = re.sub(r"(?:(?<=\s)|^)(/[^ \n\t]+\.(?:jpg|jpeg|png|webp|gif|bmp))", "", t, flags=re.IGNORECASE)  # remove paths
+    return " ".join(t.split()).strip()
 
 
 class openCHA(BaseModel):
     name: str = "openCHA"
-    previous_actions: List[Action] = []
+    # the session of the calls without a session id
+    session: SessionState = Field(default_factory=SessionState)
+    # the sessions of the callers by session id (e.g. one per Gradio user)
+    sessions: Dict[str, SessionState] = Field(default_factory=dict)
+    max_sessions: int = 1000
+    orchestrator_pool: Optional[OrchestratorPool] = None
     orchestrator: Optional[Orchestrator] = None
     planner_llm: str = LLMType.OPENAI
     planner: str = PlannerType.TREE_OF_THOUGHT_STEP
@@ -30,6 +105,29 @@ class openCHA(BaseModel):
     response_generator: str = ResponseGeneratorType.BASE_GENERATOR
     meta: List[str] = []
     verbose: bool = False
+    _sessions_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_session(self, session_id: Optional[str] = None) -> SessionState:
+        """
+            Return the session of a caller, creating it on its first call. The least recently used sessions are
+            removed after `max_sessions`.
+
+        Args:
+            session_id (str): The id of the caller. None returns the default session.
+        Return:
+            SessionState: The session.
+
+        """
+        if session_id is None:
+            return self.session
+        with self._sessions_lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                session = SessionState(session_id=session_id)
+            self.sessions[session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                del self.sessions[next(iter(self.sessions))]
+        return session
 
     def _generate_history(
         self, chat_history: Optional[List[Tuple[str, str]]] = None
@@ -45,12 +143,29 @@ class openCHA(BaseModel):
         )
         return history
 
+    def _get_orchestrator(
+        self, tasks_list: List[str], **kwargs
+    ) -> Orchestrator:
+        pool = self.orchestrator_pool or OrchestratorPool.default()
+        return pool.get(
+            planner_llm=self.planner_llm,
+            planner_name=self.planner,
+            datapipe_name=self.datapipe,
+            promptist_name=self.promptist,
+            response_generator_llm=self.response_generator_llm,
+            response_generator_name=self.response_generator,
+            available_tasks=tasks_list,
+            verbose=self.verbose,
+            **kwargs,
+        )
+
     def _run(
         self,
         query: str,
         chat_history: Optional[List[Tuple[str, str]]] = None,
         tasks_list: Optional[List[str]] = None,
         use_history: bool = False,
+        session_id: Optional[str] = None,
         **kwargs,
     ) -> str:
         if chat_history is None:
@@ -62,114 +177,101 @@ class openCHA(BaseModel):
         # query += f"User: {message}"
         # print(orchestrator.run("what is the name of the girlfriend of Leonardo Dicaperio?"))
 
-        if self.orchestrator is None:
-            self.orchestrator = Orchestrator.initialize(
-                planner_llm=self.planner_llm,
-                planner_name=self.planner,
-                datapipe_name=self.datapipe,
-                promptist_name=self.promptist,
-                response_generator_llm=self.response_generator_llm,
-                response_generator_name=self.response_generator,
-                available_tasks=tasks_list,
-                previous_actions=self.previous_actions,
-                verbose=self.verbose,
-                **kwargs,
-            )
+        # the pooled orchestrator is shared, so it is not stored on the instance per request
+        orchestrator = self._get_orchestrator(tasks_list, **kwargs)
 
-        response = self.orchestrator.run(
+        response = orchestrator.run(
             query=query,
             meta=self.meta,
             history=history,
             use_history=use_history,
+            session=self._get_session(session_id),
             **kwargs,
         )
 
         return response
 
-    def respond(
+    async def _arun(
         self,
-        message,
-        openai_api_key_input,
-        serp_api_key_input,
-        chat_history: Optional[List[Tuple[str, str]]],
-        check_box,
-        tasks_list: Optional[List[str]],
-    ):
-        """
-        Handle user input for both text and image.
+        query: str,
+        chat_history: Optional[List[Tuple[str, str]]] = None,
+        tasks_list: Optional[List[str]] = None,
+        use_history: bool = False,
+        session_id: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        if chat_history is None:
+            chat_history = []
+        if tasks_list is None:
+            tasks_list = []
 
-        Priority:
-          1) If there is an uploaded image recorded in self.meta, send BOTH the user's text (question)
-             and the image (as a data URL) to GPT-4o.
-          2) Else if the message contains an image URL (http/https/data), send both text and image URL.
-          3) Else if the message contains a local image path, convert to data URL and send both.
-          4) Otherwise, use the default orchestrator pipeline.
+        history = self._generate_history(chat_history=chat_history)
 
-        Notes:
-          - OpenAI servers cannot access local files via file://. I convert local files to data URLs.
-          - Gradio uploads store a temp file path in `file.name`; upload_meta() appends that to self.meta.
-        """
-        import os
-        import re
-        import base64
-        import mimetypes
-        import openai
-        from typing import Optional
+        orchestrator = self._get_orchestrator(tasks_list, **kwargs)
 
+        response = await orchestrator.arun(
+            query=query,
+            meta=self.meta,
+            history=history,
+            use_history=use_history,
+            session=self._get_session(session_id),
+            **kwargs,
+        )
+
+        return response
+
+    async def _astream(
+        self,
+        query: str,
+        chat_history: Optional[List[Tuple[str, str]]] = None,
+        tasks_list: Optional[List[str]] = None,
+        use_history: bool = False,
+        session_id: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[str]:
         if chat_history is None:
             chat_history = []
         if tasks_list is None:
             tasks_list = []
 
-        # Preserve the original behavior for env vars
-        os.environ["OPENAI_API_KEY"] = openai_api_key_input
-        os.environ["SEPR_API_KEY"] = serp_api_key_input  # (typo kept to match existing code)
+        history = self._generate_history(chat_history=chat_history)
 
-        # ---------- helpers ----------
-        def extract_url(text: str) -> Optional[str]:
-            """Return the first http/https/data image URL found in the text."""
-            if not text:
-                return None
-            m = re.search(r"(https?://\S+|data:image/\w+;base64,[A-Za-z0-9+/=]+)", text, re.IGNORECASE)
-            if m:
-                return m.group(1).rstrip(').,;\'"')
-            return None
+        orchestrator = self._get_orchestrator(tasks_list, **kwargs)
 
-        def extract_local_path(text: str) -> Optional[str]:
-            """Return a local image path starting at BOL or after whitespace (avoid matching https://...)."""
-            if not text:
-                return None
-            m = re.search(r"(?:(?<=\s)|^)(/[^ \n\t]+\.(?:jpg|jpeg|png|webp|gif|bmp))", text, re.IGNORECASE)
-            if m:
-                return m.group(1)
-            return None
+        async for chunk in orchestrator.astream(
+            query=query,
+            meta=self.meta,
+            history=history,
+            use_history=use_history,
+            session=self._get_session(session_id),
+            **kwargs,
+        ):
+            yield chunk
 
-        def to_data_url(local_path: str) -> Optional[str]:
-            """Convert a local image file to a data URL; return None if unreadable."""
-            try:
-                if not os.path.exists(local_path):
-                    return None
-                mime, _ = mimetypes.guess_type(local_path)
-                if mime is None:
-                    mime = "image/jpeg"
-                with open(local_path, "rb") as f:
-                    b64 = base64.b64encode(f.read()).decode("utf-8")
-                return f"data:{mime};base64,{b64}"
-            except Exception:
-                return None
-
-        def strip_image_refs(text: str) -> str:
-            """Remove URLs and local paths so only the user's question remains."""
-            if not text:
-                return ""
-            t = re.sub(r"https?://\S+", "", text)  # remove URLs
-            t = re.sub(r"(?:(?<=\s)|^)(/[^ \n\t]+\.(?:jpg|jpeg|png|webp|gif|bmp))", "", t, flags=re.IGNORECASE)  # remove paths
-            return " ".join(t.split()).strip()
+    def _image_request(
+        self, message: str
+    ) -> Optional[Tuple[str, List[Dict]]]:
+        """
+        Build the GPT-4o request for messages about an image.
+
+        Priority:
+          1) If there is an uploaded image recorded in self.meta, send BOTH the user's text (question)
+             and the image (as a data URL) to GPT-4o.
+          2) Else if the message contains an image URL (http/https/data), send both text and image URL.
+          3) Else if the message contains a local image path, convert to data URL and send both.
+          4) Otherwise, None is returned and the default orchestrator pipeline should be used.
 
+        Notes:
+          - OpenAI servers cannot access local files via file://. I convert local files to data URLs.
+          - Gradio uploads store a temp file path in `file.name`; upload_meta() appends that to self.meta.
+
+        Return:
+            Optional[Tuple[str, List[Dict]]]: The user entry of the chat history and the messages to send.
+        """
         # ---------- gather possible image sources ----------
         text = message or ""
-        url_in_text = extract_url(text)
-        path_in_text = extract_local_path(text)
+        url_in_text = _extract_url(text)
+        path_in_text = _extract_local_path(text)
 
         # Also look at recently uploaded files recorded by upload_meta()
         # We will use the *latest* image-looking path if present.
@@ -182,90 +284,52 @@ class openCHA(BaseModel):
                     break
 
         # Build the user's question (text without raw URL/path). If empty, provide a default instruction.
-        user_question = strip_image_refs(text)
+        user_question = _strip_image_refs(text)
         if not user_question:
             user_question = "Please answer my question about this image (e.g., healthiness, ingredients, nutrition)."
 
-        client = openai.OpenAI(api_key=openai_api_key_input)
+        def image_messages(url: str) -> List[Dict]:
+            return [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": f"{user_question}\nAnswer based on the image."},
+                        {"type": "image_url", "image_url": {"url": url}},
+                    ],
+                }
+            ]
 
         # ---------- Case 1: Prefer uploaded image (from self.meta) ----------
         if uploaded_path:
-            data_url = to_data_url(uploaded_path)
+            data_url = _to_data_url(uploaded_path)
+            # consume the used path once, to avoid reusing it on the next turn.
+            # If upload path is unreadable, silently continue to other cases.
+            try:
+                self.meta.remove(uploaded_path)
+            except ValueError:
+                pass
             if data_url is not None:
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini",  # or "gpt-4o"
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": f"{user_question}\nAnswer based on the image."},
-                                {"type": "image_url", "image_url": {"url": data_url}},
-                            ],
-                        }
-                    ],
-                )
-                answer = resp.choices[0].message.content
-                chat_history.append((f"[Uploaded Image] {uploaded_path}", answer))
-                # consume the used path once, to avoid reusing it on the next turn
-                try:
-                    self.meta.remove(uploaded_path)
-                except ValueError:
-                    pass
-                return "", chat_history
-            else:
-                # If upload path is unreadable, silently continue to other cases.
-                try:
-                    self.meta.remove(uploaded_path)
-                except ValueError:
-                    pass
+                return f"[Uploaded Image] {uploaded_path}", image_messages(data_url)
 
         # ---------- Case 2: Image URL in text ----------
         if url_in_text:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": f"{user_question}\nAnswer based on the image."},
-                            {"type": "image_url", "image_url": {"url": url_in_text}},
-                        ],
-                    }
-                ],
-            )
-            answer = resp.choices[0].message.content
-            chat_history.append((message, answer))
-            return "", chat_history
+            return message, image_messages(url_in_text)
 
         # ---------- Case 3: Local image path in text ----------
         if path_in_text:
-            data_url = to_data_url(path_in_text)
+            data_url = _to_data_url(path_in_text)
             if data_url is not None:
-                resp = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": f"{user_question}\nAnswer based on the image."},
-                                {"type": "image_url", "image_url": {"url": data_url}},
-                            ],
-                        }
-                    ],
-                )
-                answer = resp.choices[0].message.content
-                chat_history.append((message, answer))
-                return "", chat_history
+                return message, image_messages(data_url)
             # If we couldn't read/encode the file, fall through to text-only pipeline.
 
-        # ---------- Case 4: Default text-only pipeline ----------
-        response = self._run(
-            query=text,
-            chat_history=chat_history,
-            tasks_list=tasks_list,
-            use_history=check_box,
-        )
+        return None
 
+    def _append_response(
+        self,
+        chat_history: List[Tuple[str, str]],
+        text: str,
+        response: str,
+    ) -> List[Tuple[str, str]]:
         files = parse_addresses(response)
 
         if len(files) == 0:
@@ -281,17 +345,192 @@ class openCHA(BaseModel):
                 chat_history.append(("", str(files[i][0])))
                 response = response[files[i][2] :]
 
-        return "", chat_history
+        return chat_history
+
+    def respond(
+        self,
+        message,
+        openai_api_key_input,
+        serp_api_key_input,
+        chat_history: Optional[List[Tuple[str, str]]],
+        check_box,
+        tasks_list: Optional[List[str]],
+        session_id: Optional[str] = None,
+    ):
+        """
+        Handle user input for both text and image.
+        Messages about an image are directly answered by GPT-4o (look at **_image_request**),
+        otherwise the default orchestrator pipeline is used. The previous actions are kept in the
+        session of `session_id` (e.g. the Gradio session of the user), or in the default session.
+        """
+        if chat_history is None:
+            chat_history = []
+        if tasks_list is None:
+            tasks_list = []
+
+        # Preserve the original behavior for env vars
+        os.environ["OPENAI_API_KEY"] = openai_api_key_input
+        os.environ["SEPR_API_KEY"] = serp_api_key_input  # (typo kept to match existing code)
+
+        text = message or ""
+        request = self._image_request(text)
+        if request is not None:
+            entry, messages = request
+            client = get_openai_client(openai_api_key_input)
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",  # or "gpt-4o"
+                messages=messages,
+            )
+            chat_history.append((entry, resp.choices[0].message.content))
+            return "", chat_history
+
+        # ---------- Default text-only pipeline ----------
+        response = self._run(
+            query=text,
+            chat_history=chat_history,
+            tasks_list=tasks_list,
+            use_history=check_box,
+            session_id=session_id,
+        )
+        return "", self._append_response(chat_history, text, response)
+
+    async def arespond(
+        self,
+        message,
+        openai_api_key_input,
+        serp_api_key_input,
+        chat_history: Optional[List[Tuple[str, str]]],
+        check_box,
+        tasks_list: Optional[List[str]],
+        session_id: Optional[str] = None,
+    ):
+        """
+        Async version of **respond**. Gradio runs async handlers on its event loop,
+        so many conversations can wait on the LLMs at the same time.
+        """
+        if chat_history is None:
+            chat_history = []
+        if tasks_list is None:
+            tasks_list = []
+
+        os.environ["OPENAI_API_KEY"] = openai_api_key_input
+        os.environ["SEPR_API_KEY"] = serp_api_key_input
+
+        text = message or ""
+        request = self._image_request(text)
+        if request is not None:
+            entry, messages = request
+            client = get_async_openai_client(openai_api_key_input)
+            resp = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+            )
+            chat_history.append((entry, resp.choices[0].message.content))
+            return "", chat_history
+
+        response = await self._arun(
+            query=text,
+            chat_history=chat_history,
+            tasks_list=tasks_list,
+            use_history=check_box,
+            session_id=session_id,
+        )
+        return "", self._append_response(chat_history, text, response)
+
+    async def arespond_stream(
+        self,
+        message,
+        openai_api_key_input,
+        serp_api_key_input,
+        chat_history: Optional[List[Tuple[str, str]]],
+        check_box,
+        tasks_list: Optional[List[str]],
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, List[Tuple[str, str]]]]:
+        """
+        Streaming version of **arespond** used by the Gradio interface. The chat history is yielded every time a new
+        chunk of the answer arrives, so the partial answer is rendered while it is generated. File addresses are
+        parsed on every update; an address is only shown once it is complete.
+        """
+        if chat_history is None:
+            chat_history = []
+        if tasks_list is None:
+            tasks_list = []
 
+        os.environ["OPENAI_API_KEY"] = openai_api_key_input
+        os.environ["SEPR_API_KEY"] = serp_api_key_input
 
-    def reset(self):
-        self.previous_actions = []
+        text = message or ""
+        request = self._image_request(text)
+        if request is not None:
+            entry, messages = request
+            client = get_async_openai_client(openai_api_key_input)
+            stream = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                stream=True,
+            )
+            response = ""
+            async for chunk in stream:
+                if len(chunk.choices) > 0 and chunk.choices[0].delta.content:
+                    response += chunk.choices[0].delta.content
+                    yield "", chat_history + [(entry, response)]
+            chat_history.append((entry, response))
+            yield "", chat_history
+            return
+
+        history = list(chat_history)
+        response = ""
+        async for chunk in self._astream(
+            query=text,
+            chat_history=history,
+            tasks_list=tasks_list,
+            use_history=check_box,
+            session_id=session_id,
+        ):
+            response += chunk
+            yield "", self._append_response(
+                list(history), text, _stream_safe(response)
+            )
+        yield "", self._append_response(chat_history, text, response)
+
+    def respond_stream(
+        self,
+        message,
+        openai_api_key_input,
+        serp_api_key_input,
+        chat_history: Optional[List[Tuple[str, str]]],
+        check_box,
+        tasks_list: Optional[List[str]],
+        session_id: Optional[str] = None,
+    ) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        """
+        Sync version of **arespond_stream**.
+        """
+        return iterate_sync(
+            self.arespond_stream(
+                message,
+                openai_api_key_input,
+                serp_api_key_input,
+                chat_history,
+                check_box,
+                tasks_list,
+                session_id,
+            )
+        )
+
+    def reset(self, session_id: Optional[str] = None):
+        if session_id is None:
+            self.session = SessionState()
+            return
+        with self._sessions_lock:
+            self.sessions.pop(session_id, None)
 
     def run_with_interface(self):
         available_tasks = [key.value for key in TASK_TO_CLASS.keys()]
         interface = Interface()
         interface.prepare_interface(
-            respond=self.respond,
+            respond=self.arespond_stream,
             reset=self.reset,
             upload_meta=self.upload_meta,
             available_tasks=available_tasks,
@@ -308,6 +547,7 @@ class openCHA(BaseModel):
         chat_history: Optional[List[Tuple[str, str]]] = None,
         available_tasks: Optional[List[str]] = None,
         use_history: bool = False,
+        session_id: Optional[str] = None,
         **kwargs,
     ) -> str:
         if chat_history is None:
@@ -320,5 +560,29 @@ class openCHA(BaseModel):
             chat_history=chat_history,
             tasks_list=available_tasks,
             use_history=use_history,
+            session_id=session_id,
+            **kwargs,
+        )
+
+    async def arun(
+        self,
+        query: str,
+        chat_history: Optional[List[Tuple[str, str]]] = None,
+        available_tasks: Optional[List[str]] = None,
+        use_history: bool = False,
+        session_id: Optional[str] = None,
+        **kwargs,
+    ) -> str:
+        if chat_history is None:
+            chat_history = []
+        if available_tasks is None:
+            available_tasks = []
+
+        return await self._arun(
+            query=query,
+            chat_history=chat_history,
+            tasks_list=available_tasks,
+            use_history=use_history,
+            session_id=session_id,
             **kwargs,
         )
@@ -1,8 +1,24 @@
 from openCHA.orchestrator.action import Action
+from openCHA.orchestrator.interpreter import CallPlan
+from openCHA.orchestrator.interpreter import PlanInterpreter
+from openCHA.orchestrator.interpreter import TaskCall
+from openCHA.orchestrator.state import RunState
+from openCHA.orchestrator.state import SessionState
+from openCHA.orchestrator.task_cache import TaskResultCache
+from openCHA.orchestrator.plan_library import PlanLibrary
 from openCHA.orchestrator.orchestrator import Orchestrator
+from openCHA.orchestrator.pool import OrchestratorPool
 
 
 __all__ = [
     "Orchestrator",
     "Action",
+    "CallPlan",
+    "PlanInterpreter",
+    "TaskCall",
+    "RunState",
+    "SessionState",
+    "TaskResultCache",
+    "PlanLibrary",
+    "OrchestratorPool",
 ]
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+_ALLOWED_NODES = (
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.List,
+    ast.Tuple,
+    ast.Dict,
+    ast.JoinedStr,
+    ast.FormattedValue,
+    ast.UnaryOp,
+    ast.USub,
+    ast.UAdd,
+)
+
+
+class TaskCall(BaseModel):
+    """
+    **Description:**
+
+        A single `self.execute_task('<tool>', [...])` line of a planner code block.
+        The inputs expression is compiled once and evaluated against the variables of the current run.
+    """
+
+    target: Optional[str] = None
+    task_name: str
+    inputs: Any = None
+    reads: List[str] = []
+    depends_on: Dict[str, int] = {}
+    level: int = 0
+    source: str = ""
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+
+class CallPlan(BaseModel):
+    """
+    **Description:**
+
+        The parsed and validated form of a planner code block. `calls` keep the order of the code block and
+        `free_names` are the variables the block reads without assigning them first (results of previous steps).
+    """
+
+    key: str
+    calls: List[TaskCall] = []
+    free_names: List[str] = []
+
+    def waves(self) -> List[List[int]]:
+        """
+            Group the calls into waves. Every call of a wave only depends on calls of the previous waves,
+            so the calls inside a wave can be executed concurrently.
+
+        Return:
+            List[List[int]]: The indices of the calls for each wave.
+        """
+        waves: Dict[int, List[int]] = {}
+        for index, call in enumerate(self.calls):
+            waves.setdefault(call.level, []).append(index)
+        return [waves[level] for level in sorted(waves)]
+
+    def task_names(self) -> List[str]:
+        return [call.task_name for call in self.calls]
+
+
+class PlanInterpreter(BaseModel):
+    """
+    **Description:**
+
+        Parses the python code blocks generated by the planner into a **CallPlan** instead of running them with `exec`.
+        Only the following grammar is accepted, one statement per line::
+
+            result = self.execute_task('<tool_name>', ['arg1', 'arg2', ...])
+
+        The arguments can be literals, names assigned by earlier lines (or previous steps), f-strings of those,
+        and nested lists, tuples or dicts of them. Anything else is rejected with a `ValueError` before any task
+        is executed. Compiled plans are cached by the hash of the code block.
+    """
+
+    max_cached_plans: int = 256
+    _plans: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _hash(self, content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _check_expression(self, node: ast.AST, line: str):
+        for child in ast.walk(node):
+            if not isinstance(child, _ALLOWED_NODES):
+                raise ValueError(
+                    f"Unsupported expression `{type(child).__name__}` in: {line}"
+                )
+            if isinstance(child, ast.UnaryOp) and not isinstance(
+                child.operand, ast.Constant
+            ):
+                raise ValueError(
+                    f"Only numbers can be negated in: {line}"
+                )
+
+    def _parse_statement(self, statement: ast.stmt, content: str):
+        line = ast.get_source_segment(content, statement) or ""
+        target = None
+        if isinstance(statement, ast.Assign):
+            if len(statement.targets) != 1 or not isinstance(
+                statement.targets[0], ast.Name
+            ):
+                raise ValueError(
+                    f"Only a single variable can be assigned in: {line}"
+                )
+            target = statement.targets[0].id
+        elif not isinstance(statement, ast.Expr):
+            raise ValueError(
+                "Each line must follow the pattern "
+                f"`result = self.execute_task('<tool_name>', [...])`, got: {line}"
+            )
+        call = statement.value
+        if not (
+            isinstance(call, ast.Call)
+            and isinstance(call.func, ast.Attribute)
+            and call.func.attr == "execute_task"
+            and isinstance(call.func.value, ast.Name)
+            and call.func.value.id == "self"
+            and len(call.args) == 2
+            and len(call.keywords) == 0
+        ):
+            raise ValueError(
+                f"Only `self.execute_task(task_name, inputs)` can be called, got: {line}"
+            )
+        task_name, inputs = call.args
+        if not (
+            isinstance(task_name, ast.Constant)
+            and isinstance(task_name.value, str)
+        ):
+            raise ValueError(
+                f"The task name should be a string literal in: {line}"
+            )
+        if not isinstance(inputs, ast.List):
+            raise ValueError(
+                f"The task inputs should be a list in: {line}"
+            )
+        self._check_expression(inputs, line)
+        reads = sorted(
+            {
+                node.id
+                for node in ast.walk(inputs)
+                if isinstance(node, ast.Name)
+            }
+        )
+        return target, task_name.value, inputs, reads, line
+
+    def _compile(self, content: str, key: str) -> CallPlan:
+        try:
+            tree = ast.parse(content)
+        except SyntaxError as e:
+            raise ValueError(f"Invalid python code block: {e}") from e
+        if len(tree.body) == 0:
+            raise ValueError("The python code block is empty.")
+
+        calls: List[TaskCall] = []
+        free_names = []
+        writers: Dict[str, int] = {}
+        for statement in tree.body:
+            (
+                target,
+                task_name,
+                inputs,
+                reads,
+                line,
+            ) = self._parse_statement(statement, content)
+            depends_on = {
+                name: writers[name]
+                for name in reads
+                if name in writers
+            }
+            free_names.extend(
+                name
+                for name in reads
+                if name not in writers and name not in free_names
+            )
+            level = 1 + max(
+                [calls[index].level for index in depends_on.values()],
+                default=-1,
+            )
+            calls.append(
+                TaskCall(
+                    target=target,
+                    task_name=task_name,
+                    inputs=compile(
+                        ast.Expression(inputs), "<planner>", "eval"
+                    ),
+                    reads=reads,
+                    depends_on=depends_on,
+                    level=level,
+                    source=line,
+                )
+            )
+            if target is not None:
+                writers[target] = len(calls) - 1
+        return CallPlan(key=key, calls=calls, free_names=free_names)
+
+    def compile(self, content: str) -> CallPlan:
+        """
+            Parse and validate a planner code block. The result is cached by the hash of the code block.
+
+        Args:
+            content (str): The python code block generated by the planner.
+        Return:
+            CallPlan: The parsed plan.
+        Raise:
+            ValueError: If the code block contains anything outside the accepted grammar.
+
+        """
+        content = textwrap.dedent(content or "").strip()
+        key = self._hash(content)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        plan = self._compile(content, key)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_cached_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def validate(
+        self,
+        plan: CallPlan,
+        available_tasks: Iterable[str],
+        variables: Dict[str, Any] = None,
+    ):
+        """
+            Check that all the tasks of the plan are available and all the variables it reads are defined.
+
+        Args:
+            plan (CallPlan): The parsed plan.
+            available_tasks (Iterable[str]): The names of the available tasks.
+            variables (Dict[str, Any]): The variables assigned by the previous steps.
+        Raise:
+            ValueError: If an unknown task or an undefined variable is used.
+
+        """
+        if variables is None:
+            variables = {}
+        available_tasks = set(available_tasks)
+        unknown = [
+            name
+            for name in plan.task_names()
+            if name not in available_tasks
+        ]
+        if len(unknown) > 0:
+            raise ValueError(
+                f"Unknown tool(s): {', '.join(unknown)}. "
+                f"Valid tools are: {', '.join(sorted(available_tasks))}."
+            )
+        undefined = [
+            name for name in plan.free_names if name not in variables
+        ]
+        if len(undefined) > 0:
+            raise ValueError(
+                f"Undefined variable(s): {', '.join(undefined)}."
+            )
+
+    def evaluate_inputs(
+        self, call: TaskCall, variables: Dict[str, Any]
+    ) -> List[Any]:
+        """
+            Evaluate the inputs of a call using the given variables.
+
+        Args:
+            call (TaskCall): The call.
+            variables (Dict[str, Any]): The variables visible to the call.
+        Return:
+            List[Any]: The task inputs.
+
+        """
+        return eval(call.inputs, {"__builtins__": {}}, variables)
@@ -1,18 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 from ast import Continue
 import logging
+import time
 from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from openCHA.CustomDebugFormatter import CustomDebugFormatter
 from openCHA.datapipes import DataPipe
 from openCHA.datapipes import DatapipeType
 from openCHA.datapipes import initialize_datapipe
+from openCHA.journal import journal_context
+from openCHA.journal import record
+from openCHA.llms import llm_priority
 from openCHA.llms import LLMType
+from openCHA.llms import Priority
+from openCHA.llms import prewarm_llms
 from openCHA.orchestrator import Action
+from openCHA.orchestrator import PlanInterpreter
+from openCHA.orchestrator import PlanLibrary
+from openCHA.orchestrator import RunState
+from openCHA.orchestrator import SessionState
+from openCHA.orchestrator import TaskCall
+from openCHA.orchestrator import TaskResultCache
 from openCHA.planners import BasePlanner
 from openCHA.planners import initialize_planner
 from openCHA.planners import PlanFinish
@@ -29,9 +46,28 @@ from openCHA.response_generators import (
 from openCHA.tasks import BaseTask
 from openCHA.tasks import initialize_task
 from openCHA.tasks import TaskType
+from openCHA.tracing import span
+from openCHA.utils import iterate_sync
+from openCHA.utils import run_sync
 from pydantic import BaseModel
+from pydantic import Field
 import re
 
+
+_STREAM_END = object()
+_SENTENCE_END = re.compile(r"[.!?\n。！？]\s")
+
+
+async def _in_span(name: str, awaitable: Awaitable, **attributes: Any):
+    with span(name, **attributes):
+        return await awaitable
+
+
+async def _with_priority(priority: Priority, awaitable: Awaitable):
+    with llm_priority(priority):
+        return await awaitable
+
+
 class Orchestrator(BaseModel):
     """
     **Description:**
@@ -52,6 +88,7 @@ class Orchestrator(BaseModel):
     max_task_execute_retries: int = 3
     max_planner_execute_retries: int = 16
     max_final_answer_execute_retries: int = 3
+    max_parallel_tasks: int = 4
     role: int = 0
     verbose: bool = False
     planner_logger: Optional[logging.Logger] = None
@@ -60,16 +97,15 @@ class Orchestrator(BaseModel):
     final_answer_generator_logger: Optional[logging.Logger] = None
     promptist_logger: Optional[logging.Logger] = None
     error_logger: Optional[logging.Logger] = None
-    previous_actions: List[str] = []
-    current_actions: List[Optional[Action]] = []
-    current_actions_inputs: str = ""
-    current_failed_actions: List[str] = []
-    current_failed_actions_inputs: List[str] = []
-    succeed_inputs: List[str] = []
-    succeed_actions: List[str] = []
-    runtime: Dict[str, bool] = {}
-    strategy: str = ""
-    vars: Dict[str, Any] = {}
+    session: SessionState = Field(default_factory=SessionState)
+    interpreter: PlanInterpreter = Field(default_factory=PlanInterpreter)
+    task_cache: Optional[TaskResultCache] = Field(
+        default_factory=TaskResultCache
+    )
+    # start evaluating the next step with the cached results of speculative tasks while they are executed
+    speculative: bool = False
+    # replays the code blocks of past queries with the same intent instead of planning. None disables it
+    plan_library: Optional[PlanLibrary] = None
 
     class Config:
         """Configuration for this pydantic object."""
@@ -119,7 +155,13 @@ class Orchestrator(BaseModel):
             available_tasks (List[str]): List of available task using TaskType.
             previous_actions (List[Action]): List of previous actions.
             verbose (bool): Specifies if the debugging logs be printed or not.
-            **kwargs (Any): Additional keyword arguments.
+            **kwargs (Any): Additional keyword arguments. If `prewarm_llms` is True, the LLMs are loaded in the
+                background right away instead of on their first use. `generation_profiles` (GenerationProfiles) sets
+                the models and settings of the planner steps, the final answer, and the generated code.
+                `strategy_branches` (int) makes the planner generate and score that many strategies concurrently.
+                `strategy_cache` (StrategyCache) reuses the strategies of similar past queries of all the sessions.
+                `tool_index` (ToolIndex) describes only the tasks relevant to the query in the planner prompts.
+                `plan_library` (PlanLibrary) replays the plans of past queries with the same intent.
         Return:
             Orchestrator: Initialized Orchestrator instance.
 
@@ -219,6 +261,8 @@ class Orchestrator(BaseModel):
             orchestrator_logger.debug(
                 f"Response Generator {response_generator_name} is successfully initialized."
             )
+        if kwargs.get("prewarm_llms"):
+            prewarm_llms()
 
         return self(
             planner=planner,
@@ -227,19 +271,14 @@ class Orchestrator(BaseModel):
             response_generator=response_generator,
             available_tasks=tasks,
             verbose=verbose,
-            previous_actions=previous_actions,
-            current_failed_actions=[],
-            current_failed_actions_inputs=[],
-            succeed_actions=[],
-            current_action=None,
-            current_actions_inputs="",
+            session=SessionState(previous_actions=previous_actions),
             planner_logger=planner_logger,
             tasks_logger=tasks_logger,
-            succeed_inputs = [], 
             orchestrator_logger=orchestrator_logger,
             final_answer_generator_logger=final_answer_generator_logger,
             promptist_logger=promptist_logger,
             error_logger=error_logger,
+            plan_library=kwargs.get("plan_library"),
         )
 
     def process_meta(self) -> bool:
@@ -252,15 +291,134 @@ class Orchestrator(BaseModel):
         """
         return False
 
-    def _update_runtime(self, action: Action = None):
+    def _update_runtime(self, action: Action, state: RunState):
         if action.output_type:
-            self.runtime[action.task_response] = False
+            state.runtime[action.task_response] = False
         for task_input in action.task_inputs:
-            if task_input in self.runtime:
-                self.runtime[task_input] = True
+            if task_input in state.runtime:
+                state.runtime[task_input] = True
 
-    def execute_task(
+    def _task_action(
+        self, task_name: str, task_inputs: List[str], result: Any
+    ) -> Action:
+        if isinstance(result, Exception):
+            self.print_log(
+                "error",
+                f"Error running task: \n{result}\n---------------\n",
+            )
+            logging.exception(result)
+            return Action(
+                task_name=task_name,
+                task_inputs=task_inputs,
+                task_response=result,
+                output_type=False,
+                datapipe=self.datapipe,
+            )
+        self.print_log(
+            "task",
+            f"Task is executed successfully\nResult: {result}\n---------------\n",
+        )
+        return Action(
+            task_name=task_name,
+            task_inputs=task_inputs,
+            task_response=result,
+            output_type=self.available_tasks[task_name].output_type,
+            datapipe=self.datapipe,
+        )
+
+    def _task_cache_key(
+        self, task: BaseTask, task_inputs: List[str]
+    ) -> Optional[str]:
+        if self.task_cache is None or not task.cacheable:
+            return None
+        return self.task_cache.make_key(
+            task.name, task_inputs, self.datapipe
+        )
+
+    def _cached_result(self, key: Optional[str]) -> Tuple[bool, Any]:
+        if key is None:
+            return False, None
+        hit, result = self.task_cache.get(key)
+        if hit:
+            self.print_log(
+                "task", "Task result is returned from the cache\n"
+            )
+        return hit, result
+
+    def _cache_result(
+        self, task: BaseTask, key: Optional[str], result: Any
+    ):
+        if key is not None:
+            self.task_cache.put(key, result, task.cache_ttl)
+
+    def _run_task(
         self, task_name: str, task_inputs: List[str]
+    ) -> Tuple[Any, Action]:
+        """
+            Run a single task and wrap its result (or the raised error) in an **Action**. This method does not touch
+            the orchestrator state so it can be safely called concurrently. Results of cacheable tasks are looked up in
+            and stored to **task_cache**; errors are never cached.
+
+        Args:
+            task_name (str): The name of the Task.
+            task_inputs List(str): The list of the inputs for the task.
+        Return:
+            Tuple[Any, Action]: Result of the task execution (or the error) and the created action.
+        """
+        self.print_log(
+            "task",
+            f"---------------\nExecuting task:\nTask Name: {task_name}\nTask Inputs: {task_inputs}\n",
+        )
+        with span(f"task.{task_name}", task=task_name) as task_span:
+            try:
+                task = self.available_tasks[task_name]
+                key = self._task_cache_key(task, task_inputs)
+                hit, result = self._cached_result(key)
+                task_span.set_attribute("cache_hit", hit)
+                if not hit:
+                    result = task.execute(task_inputs)
+                    self._cache_result(task, key, result)
+            except Exception as e:  # return the exception message and store as the current action
+                task_span.status = "error"
+                task_span.set_attribute("error", repr(e))
+                result = e
+        return result, self._task_action(task_name, task_inputs, result)
+
+    async def _arun_task(
+        self, task_name: str, task_inputs: List[str]
+    ) -> Tuple[Any, Action]:
+        """
+            Async version of **_run_task** awaiting the task's **aexecute**.
+        """
+        self.print_log(
+            "task",
+            f"---------------\nExecuting task:\nTask Name: {task_name}\nTask Inputs: {task_inputs}\n",
+        )
+        with span(f"task.{task_name}", task=task_name) as task_span:
+            try:
+                task = self.available_tasks[task_name]
+                key = self._task_cache_key(task, task_inputs)
+                hit, result = self._cached_result(key)
+                task_span.set_attribute("cache_hit", hit)
+                if not hit:
+                    result = await task.aexecute(task_inputs)
+                    self._cache_result(task, key, result)
+            except Exception as e:  # return the exception message and store as the current action
+                task_span.status = "error"
+                task_span.set_attribute("error", repr(e))
+                result = e
+        return result, self._task_action(task_name, task_inputs, result)
+
+    def _record_action(self, action: Action, state: RunState):
+        if not isinstance(action.task_response, Exception):
+            self._update_runtime(action, state)
+        state.current_actions.append(action)
+
+    def execute_task(
+        self,
+        task_name: str,
+        task_inputs: List[str],
+        state: Optional[RunState] = None,
     ) -> Any:
         """
             Execute the specified task based on the planner's selected **Action**. This method executes a specific task based on the provided action.
@@ -271,57 +429,349 @@ class Orchestrator(BaseModel):
         Args:
             task_name (str): The name of the Task.
             task_inputs List(str): The list of the inputs for the task.
+            state (RunState): The state of the run the task belongs to. The executed action is added to its current actions.
         Return:
             str: Result of the task execution.
             bool: If the task result should be directly returned to the user and stop planning.
         """
-        self.print_log(
-            "task",
-            f"---------------\nExecuting task:\nTask Name: {task_name}\nTask Inputs: {task_inputs}\n",
+        if state is None:
+            state = RunState()
+        result, action = self._run_task(task_name, task_inputs)
+        self._record_action(action, state)
+        return result
+
+    async def aexecute_task(
+        self,
+        task_name: str,
+        task_inputs: List[str],
+        state: Optional[RunState] = None,
+    ) -> Any:
+        """
+            Async version of **execute_task**.
+
+        Args:
+            task_name (str): The name of the Task.
+            task_inputs List(str): The list of the inputs for the task.
+            state (RunState): The state of the run the task belongs to.
+        Return:
+            str: Result of the task execution.
+        """
+        if state is None:
+            state = RunState()
+        result, action = await self._arun_task(task_name, task_inputs)
+        self._record_action(action, state)
+        return result
+
+    async def _arun_task_call(
+        self,
+        call: TaskCall,
+        results: List[Any],
+        state: RunState,
+        semaphore: asyncio.Semaphore,
+    ):
+        variables = dict(state.vars)
+        variables.update(
+            {
+                name: results[index]
+                for name, index in call.depends_on.items()
+            }
         )
-        error_message = ""
+        try:
+            task_inputs = self.interpreter.evaluate_inputs(call, variables)
+        except Exception as e:
+            # the call fails like a task, the other calls of the wave are kept
+            return e, self._task_action(call.task_name, [], e)
+        async with semaphore:
+            return await self._arun_task(call.task_name, task_inputs)
+
+    def execute_plan(self, content: str, state: RunState):
+        """
+            Sync wrapper of **aexecute_plan**.
 
+        Args:
+            content (str): The python code block generated by the planner.
+            state (RunState): The state of the run.
+        Return:
+            None
+        """
+        return run_sync(self.aexecute_plan(content, state))
+
+    async def aexecute_plan(self, content: str, state: RunState):
+        """
+            Parse the planner code block into a **CallPlan** and execute it. The plan is validated before running
+            any task, so a malformed block fails without executing half of it. The calls are grouped into waves
+            where every call only depends on calls of the previous waves. The calls inside a wave are executed
+            concurrently, at most `max_parallel_tasks` at a time. The actions and variables are recorded
+            in the same order they appear in the code block, so the planner sees the results exactly as if they
+            were executed one by one.
+
+        Args:
+            content (str): The python code block generated by the planner.
+            state (RunState): The state of the run. The actions are added to its current actions.
+        Return:
+            None
+        """
         try:
-            task = self.available_tasks[task_name]
-            result = task.execute(task_inputs)
-            self.print_log(
-                "task",
-                f"Task is executed successfully\nResult: {result}\n---------------\n",
+            plan = self.interpreter.compile(content)
+            self.interpreter.validate(
+                plan, self.available_tasks.keys(), state.vars
             )
-            action = Action(
-                task_name=task_name,
-                task_inputs=task_inputs,
-                task_response=result,
-                output_type=task.output_type,
-                datapipe=self.datapipe,
+        except ValueError as error:
+            state.current_actions.append(
+                "action initialze failed, error message: "
+                + str(error)
+                + "\n"
+            )
+            return
+
+        calls = plan.calls
+        results = [None] * len(calls)
+        actions = [None] * len(calls)
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel_tasks))
+        for wave in plan.waves():
+            wave_results = await asyncio.gather(
+                *[
+                    self._arun_task_call(
+                        calls[index], results, state, semaphore
+                    )
+                    for index in wave
+                ],
+                return_exceptions=True,
             )
+            for index, outcome in zip(wave, wave_results):
+                if not isinstance(outcome, tuple):
+                    if not isinstance(outcome, Exception):
+                        raise outcome
+                    outcome = outcome, self._task_action(
+                        calls[index].task_name, [], outcome
+                    )
+                results[index], actions[index] = outcome
+
+        for index, action in enumerate(actions):
+            self._record_action(action, state)
+            if calls[index].target is not None:
+                state.vars[calls[index].target] = results[index]
+
+    @staticmethod
+    def _block_succeeded(actions: List[Any]) -> bool:
+        return len(actions) > 0 and all(
+            isinstance(action, Action)
+            and not isinstance(action.task_response, Exception)
+            for action in actions
+        )
 
-            self._update_runtime(action)
+    async def _areplay_plan(self, query: str, state: RunState) -> bool:
+        """
+            Run the plan of a past query with the same intent from **plan_library**, if any.
 
-            # self.previous_actions.append(action) move to parse evaluation response
-            # self.succeed_actions.append(action)
-            self.current_actions.append(action)
-            return result  # , task.return_direct
-        except Exception as e:  # return the exception message and store as the current action
-            self.print_log(
-                "error",
-                f"Error running task: \n{e}\n---------------\n",
+        Args:
+            query (str): The query (translated to English if needed).
+            state (RunState): The state of the run.
+        Return:
+            bool: True if a plan was replayed without errors. Otherwise the state is reset for the planner.
+
+        """
+        program = self.plan_library.lookup(query)
+        if program is None:
+            return False
+        with span("orchestrator.replay_plan"):
+            await self.aexecute_plan(program, state)
+        success = self._block_succeeded(state.current_actions)
+        self.plan_library.report(query, success)
+        record("plan_replayed", success=success, program=program)
+        if not success:
+            state.current_actions = []
+            state.vars = {}
+            state.runtime = {}
+            return False
+        state.current_actions_inputs = program
+        state.succeed_actions.extend(state.current_actions)
+        state.succeed_inputs.append(program)
+        return True
+
+    def _store_plan(self, query: str, state: RunState):
+        """
+            Store the code blocks of a successful run in **plan_library**: the final block and the earlier blocks
+            without errors.
+        """
+        if not self._block_succeeded(state.current_actions):
+            return
+        blocks = [
+            block
+            for block, actions in zip(
+                state.current_failed_actions_inputs,
+                state.current_failed_actions,
             )
-            logging.exception(e)
-            error_message = e
-            action = Action(
-                task_name=task_name,
-                task_inputs=task_inputs,
-                task_response=error_message,
-                output_type=False,
-                datapipe=self.datapipe,
+            if block and self._block_succeeded(actions)
+        ] + [state.current_actions_inputs]
+        reason = self.plan_library.add(query, blocks, self.interpreter)
+        if reason is None:
+            record("plan_stored", query=query)
+        else:
+            record("plan_not_stored", logging.DEBUG, reason=reason)
+
+    def _aplan_evaluation(
+        self,
+        prompt: str,
+        state: RunState,
+        current_actions: List[Any],
+        speculative: bool = False,
+    ):
+        evaluation = self.planner.aplan_evaluation(
+            query=prompt,
+            strategy=state.strategy,
+            current_action=list(current_actions),
+            current_action_input=state.current_actions_inputs,
+            current_failed_actions=list(state.current_failed_actions),
+            current_failed_actions_inputs=list(
+                state.current_failed_actions_inputs
+            ),
+            previous_inputs=list(state.succeed_inputs),
+            previous_actions=list(state.succeed_actions),
+        )
+        if speculative:
+            # a guess that may be discarded waits behind the real turns
+            evaluation = _with_priority(Priority.BACKGROUND, evaluation)
+        return _in_span(
+            "planner.plan_evaluation", evaluation, speculative=speculative
+        )
+
+    def _predict_plan(
+        self, content: str, state: RunState
+    ) -> Optional[List[Action]]:
+        """
+            Predict the actions of a code block from the task cache. The prediction is only possible if every call
+            of the block is a speculative task with a (possibly expired) cached result for its inputs.
+
+        Args:
+            content (str): The python code block generated by the planner.
+            state (RunState): The state of the run.
+        Return:
+            Optional[List[Action]]: The predicted actions in code block order, or None.
+        """
+        if self.task_cache is None:
+            return None
+        try:
+            plan = self.interpreter.compile(content)
+            self.interpreter.validate(
+                plan, self.available_tasks.keys(), state.vars
+            )
+        except ValueError:
+            return None
+        variables = dict(state.vars)
+        predicted = []
+        for call in plan.calls:
+            task = self.available_tasks[call.task_name]
+            if not (task.speculative and task.cacheable):
+                return None
+            try:
+                task_inputs = self.interpreter.evaluate_inputs(
+                    call, variables
+                )
+            except Exception:
+                return None
+            found, result = self.task_cache.peek(
+                self.task_cache.make_key(
+                    task.name, task_inputs, self.datapipe
+                ),
+                allow_stale=True,
+            )
+            if not found:
+                return None
+            if call.target is not None:
+                variables[call.target] = result
+            try:
+                predicted.append(
+                    Action(
+                        task_name=call.task_name,
+                        task_inputs=task_inputs,
+                        task_response=result,
+                        output_type=task.output_type,
+                        datapipe=self.datapipe,
+                    )
+                )
+            except ValueError:
+                return None
+        return predicted
+
+    def _speculate(
+        self, prompt: str, content: str, state: RunState
+    ) -> Optional[Tuple[asyncio.Task, List[Action]]]:
+        """
+            Start the evaluation of the next step with the predicted actions of the code block, so the planner LLM
+            runs while the tasks are executed. The speculation is committed by **_next_evaluation** only if the
+            executed actions match the prediction.
+
+        Args:
+            prompt (str): The user query.
+            content (str): The python code block that is going to be executed.
+            state (RunState): The state of the run.
+        Return:
+            Optional[Tuple[asyncio.Task, List[Action]]]: The running evaluation and the predicted actions, or None
+            if the code block can not be predicted.
+        """
+        predicted = self._predict_plan(content, state)
+        if predicted is None:
+            return None
+        record("speculation_started", calls=len(predicted))
+        task = asyncio.ensure_future(
+            self._aplan_evaluation(
+                prompt, state, predicted, speculative=True
             )
-            self.current_actions.append(action)
-            return error_message
-            # raise ValueError(
-            #     f"Error executing task {task_name}: {error_message}\n\nTry again with different inputs."
-            # )
-            
+        )
+        return task, predicted
+
+    def _same_actions(
+        self, predicted: List[Action], actions: List[Any]
+    ) -> bool:
+        if len(predicted) != len(actions):
+            return False
+        for expected, action in zip(predicted, actions):
+            if not isinstance(action, Action) or isinstance(
+                action.task_response, Exception
+            ):
+                return False
+            # datapipe keys are compared by the stored content
+            if self.task_cache.make_key(
+                expected.task_name,
+                [expected.task_inputs, expected.task_response],
+                self.datapipe,
+            ) != self.task_cache.make_key(
+                action.task_name,
+                [action.task_inputs, action.task_response],
+                self.datapipe,
+            ):
+                return False
+        return True
+
+    async def _next_evaluation(
+        self,
+        prompt: str,
+        state: RunState,
+        speculation: Optional[Tuple[asyncio.Task, List[Action]]] = None,
+    ) -> str:
+        """
+            Evaluate the current step. If the evaluation was speculated with the same actions that were executed,
+            its result is used, otherwise it is cancelled and the evaluation is done with the executed actions.
+
+        Args:
+            prompt (str): The user query.
+            state (RunState): The state of the run.
+            speculation (Tuple[asyncio.Task, List[Action]]): The result of **_speculate**.
+        Return:
+            str: The evaluation response of the planner.
+        """
+        if speculation is not None:
+            task, predicted = speculation
+            if self._same_actions(predicted, state.current_actions):
+                record("speculation", committed=True)
+                return await task
+            task.cancel()
+            record("speculation", committed=False)
+        return await self._aplan_evaluation(
+            prompt, state, state.current_actions
+        )
+
     def parse_evaluation_response_and_update_current_action(
         self,
         response: str
@@ -343,9 +793,7 @@ class Orchestrator(BaseModel):
             Stores the [CONTENT] block in self.current_action (create the
             attribute if it does not yet exist).
         """
-        print("\n============================start of response========================================\n")
-        print(response)
-        print("\n============================end of response========================================\n")
+        record("evaluation_response", logging.DEBUG, response=response)
         # ---- 1. Normalise “[TAG]: value”  →  “[TAG] value” ------------------
         cleaned = re.sub(
             r"\[(STRATEGY_CHANGE|STEP_SUCCESS|CONTENT)]\s*[-:]\s*",
@@ -393,8 +841,7 @@ class Orchestrator(BaseModel):
 
         # ---- 3. Pull only the first ```python``` block from CONTENT ----------
         content_block = sections["CONTENT"]
-        print("======content============\n")
-        print(content_block)
+        record("evaluation_content", logging.DEBUG, content=content_block)
         match = re.search(r"```python([\s\S]*?)``?", content_block, re.IGNORECASE)
         # content = f"```python{match.group(1)}```" if match else ""
         content = match.group(1)
@@ -417,17 +864,25 @@ class Orchestrator(BaseModel):
         """
         return query
 
-    def _prepare_planner_response_for_response_generator(self):
-        print("runtime", self.runtime)
+    def _prepare_planner_response_for_response_generator(
+        self, state: RunState
+    ):
+        record(
+            "planner_runtime",
+            logging.DEBUG,
+            runtime=state.runtime,
+            succeed_actions=len(state.succeed_actions),
+        )
         final_response = ""
-        print(len(self.succeed_actions))
-        if len(self.succeed_actions) == 0:
+        if len(state.succeed_actions) == 0:
             return ""
-        for action in self.succeed_actions:
+        for action in state.succeed_actions:
+            if not isinstance(action, Action):
+                continue
             final_response += action.dict(
                 (
                     action.output_type
-                    and not self.runtime[action.task_response]
+                    and not state.runtime[action.task_response]
                 )
             )
         return final_response
@@ -492,6 +947,24 @@ class Orchestrator(BaseModel):
 
         """
 
+        return run_sync(
+            self.agenerate_final_answer(query, thinker, **kwargs)
+        )
+
+    async def agenerate_final_answer(
+        self, query, thinker, **kwargs
+    ) -> str:
+        """
+            Async version of **generate_final_answer**.
+
+        Args:
+            query (str): Input query.
+            thinker (str): Thinking component.
+        Return:
+            str: Final generated answer.
+
+        """
+
         retries = 0
         while retries < self.max_final_answer_execute_retries:
             try:
@@ -500,23 +973,90 @@ class Orchestrator(BaseModel):
                     if "response_generator_prefix_prompt" in kwargs
                     else ""
                 )
-                return self.response_generator.generate(
-                    query=query,
-                    thinker=thinker,
-                    prefix=prefix,
-                    **kwargs,
-                )
+                with span(
+                    "response_generator.final_answer", retry=retries
+                ):
+                    return await self.response_generator.agenerate(
+                        query=query,
+                        thinker=thinker,
+                        prefix=prefix,
+                        **kwargs,
+                    )
             except Exception as e:
-                print(e)
+                self.print_log(
+                    "error",
+                    f"Error generating the final answer: \n{e}\n",
+                )
+                record(
+                    "final_answer_error",
+                    logging.ERROR,
+                    retry=retries,
+                    error=repr(e),
+                )
                 retries += 1
         return "We currently have problem processing your question. Please try again after a while."
 
+    async def astream_final_answer(
+        self, query, thinker, **kwargs
+    ) -> AsyncIterator[str]:
+        """
+            Streaming version of **agenerate_final_answer**. The generation is retried only if it fails before
+            the first chunk is yielded.
+
+        Args:
+            query (str): Input query.
+            thinker (str): Thinking component.
+        Return:
+            AsyncIterator[str]: The chunks of the final generated answer.
+
+        """
+
+        prefix = (
+            kwargs["response_generator_prefix_prompt"]
+            if "response_generator_prefix_prompt" in kwargs
+            else ""
+        )
+        retries = 0
+        while retries < self.max_final_answer_execute_retries:
+            started = False
+            try:
+                with span(
+                    "response_generator.final_answer",
+                    retry=retries,
+                    stream=True,
+                ):
+                    async for chunk in self.response_generator.agenerate_stream(
+                        query=query,
+                        thinker=thinker,
+                        prefix=prefix,
+                        **kwargs,
+                    ):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                self.print_log(
+                    "error",
+                    f"Error generating the final answer: \n{e}\n",
+                )
+                record(
+                    "final_answer_error",
+                    logging.ERROR,
+                    retry=retries,
+                    error=repr(e),
+                )
+                if started:
+                    return
+                retries += 1
+        yield "We currently have problem processing your question. Please try again after a while."
+
     def run(
         self,
         query: str,
         meta: List[str] = None,
         history: str = "",
         use_history: bool = False,
+        session: Optional[SessionState] = None,
         **kwargs: Any,
     ) -> str:
         """
@@ -532,6 +1072,67 @@ class Orchestrator(BaseModel):
             meta (List[str]): Meta information.
             history (str): History information.
             use_history (bool): Flag indicating whether to use history.
+            session (SessionState): The session the query belongs to. Every run gets its own **RunState**, so only
+                the successful actions of the previous runs are kept in the session.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            str: The final response to shown to the user.
+
+
+        """
+        return run_sync(
+            self.arun(
+                query=query,
+                meta=meta,
+                history=history,
+                use_history=use_history,
+                session=session,
+                **kwargs,
+            )
+        )
+
+    def stream(
+        self,
+        query: str,
+        meta: List[str] = None,
+        history: str = "",
+        use_history: bool = False,
+        session: Optional[SessionState] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+            Sync version of **astream**.
+        """
+        return iterate_sync(
+            self.astream(
+                query=query,
+                meta=meta,
+                history=history,
+                use_history=use_history,
+                session=session,
+                **kwargs,
+            )
+        )
+
+    async def arun(
+        self,
+        query: str,
+        meta: List[str] = None,
+        history: str = "",
+        use_history: bool = False,
+        session: Optional[SessionState] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+            Async version of **run**. The planner, the tasks, and the response generator are awaited, so many
+            conversations can be served concurrently on a single event loop.
+
+        Args:
+            query (str): Input query.
+            meta (List[str]): Meta information.
+            history (str): History information.
+            use_history (bool): Flag indicating whether to use history.
+            session (SessionState): The session the query belongs to. The orchestrator's own session is used if not provided.
             **kwargs (Any): Additional keyword arguments.
         Return:
             str: The final response to shown to the user.
@@ -540,7 +1141,202 @@ class Orchestrator(BaseModel):
         """
         if meta is None:
             meta = []
+        if session is None:
+            session = self.session
+        state = session.new_run()
+        with journal_context(session.session_id, state.run_id), span(
+            "orchestrator.run"
+        ):
+            return await self._arun(
+                query=query,
+                meta=meta,
+                history=history,
+                use_history=use_history,
+                session=session,
+                state=state,
+                **kwargs,
+            )
+
+    async def astream(
+        self,
+        query: str,
+        meta: List[str] = None,
+        history: str = "",
+        use_history: bool = False,
+        session: Optional[SessionState] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+            Streaming version of **arun**. The planning is the same, but the final answer is yielded chunk by chunk
+            as the response generator produces it. If the query was translated, the answer is translated back
+            sentence by sentence.
+
+        Args:
+            query (str): Input query.
+            meta (List[str]): Meta information.
+            history (str): History information.
+            use_history (bool): Flag indicating whether to use history.
+            session (SessionState): The session the query belongs to. The orchestrator's own session is used if not provided.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            AsyncIterator[str]: The chunks of the final response.
+
+
+        """
+        if meta is None:
+            meta = []
+        if session is None:
+            session = self.session
+        chunks: asyncio.Queue = asyncio.Queue()
+        # the run is executed in its own task, so its journal context does not leak into the consumer
+        worker = asyncio.ensure_future(
+            self._astream_worker(
+                chunks,
+                query=query,
+                meta=meta,
+                history=history,
+                use_history=use_history,
+                session=session,
+                **kwargs,
+            )
+        )
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _STREAM_END:
+                    break
+                yield chunk
+            await worker
+        finally:
+            if not worker.done():
+                worker.cancel()
+
+    async def _astream_worker(
+        self,
+        chunks: asyncio.Queue,
+        query: str,
+        meta: List[str],
+        history: str,
+        use_history: bool,
+        session: SessionState,
+        **kwargs: Any,
+    ):
+        try:
+            state = session.new_run()
+            with journal_context(session.session_id, state.run_id), span(
+                "orchestrator.run", stream=True
+            ):
+                started = time.monotonic()
+                thinker, source_language = await self._aplan(
+                    query=query,
+                    meta=meta,
+                    history=history,
+                    use_history=use_history,
+                    session=session,
+                    state=state,
+                    **kwargs,
+                )
+                planned = time.monotonic()
+                stream = self.astream_final_answer(
+                    query=query, thinker=thinker, **kwargs
+                )
+                if source_language is not None:
+                    stream = self._atranslate_stream(
+                        stream, source_language
+                    )
+                final_response = ""
+                async for chunk in stream:
+                    if final_response == "":
+                        record(
+                            "final_answer_first_chunk",
+                            planning=planned - started,
+                            latency=time.monotonic() - planned,
+                        )
+                    final_response += chunk
+                    await chunks.put(chunk)
+                record("run_finished", final_response=final_response)
+        finally:
+            await chunks.put(_STREAM_END)
+
+    async def _atranslate_stream(
+        self, stream: AsyncIterator[str], language: str
+    ) -> AsyncIterator[str]:
+        translator = self.available_tasks["google_translate"]
+        buffer = ""
+        async for chunk in stream:
+            buffer += chunk
+            ends = [match.end() for match in _SENTENCE_END.finditer(buffer)]
+            if len(ends) == 0:
+                continue
+            sentences, buffer = buffer[: ends[-1]], buffer[ends[-1] :]
+            translated = (
+                await translator.aexecute([sentences, language])
+            )[0]
+            yield translated + " "
+        if buffer.strip():
+            yield (await translator.aexecute([buffer, language]))[0]
+
+    async def _arun(
+        self,
+        query: str,
+        meta: List[str],
+        history: str,
+        use_history: bool,
+        session: SessionState,
+        state: RunState,
+        **kwargs: Any,
+    ) -> str:
+        thinker, source_language = await self._aplan(
+            query=query,
+            meta=meta,
+            history=history,
+            use_history=use_history,
+            session=session,
+            state=state,
+            **kwargs,
+        )
+        self.print_log(
+            "response_generator",
+            f"Final Answer Generation Started...\nInput Prompt: \n\n{thinker}",
+        )
+        final_response = await self.agenerate_final_answer(
+            query=query, thinker=thinker, **kwargs
+        )
+        self.print_log(
+            "response_generator",
+            f"Response: {final_response}\n\nFinal Answer Generation Ended.\n",
+        )
+
+        if source_language is not None:
+            final_response = (
+                await self.available_tasks["google_translate"].aexecute(
+                    [final_response, source_language]
+                )
+            )[0]
+
+        record("run_finished", final_response=final_response)
+        return final_response
+
+    async def _aplan(
+        self,
+        query: str,
+        meta: List[str],
+        history: str,
+        use_history: bool,
+        session: SessionState,
+        state: RunState,
+        **kwargs: Any,
+    ) -> Tuple[str, Optional[str]]:
+        """
+            Run the planning loop of a query and prepare the prompt of the response generator.
+
+        Return:
+            Tuple[str, Optional[str]]: The prompt of the response generator and the language of the query
+            if it was translated to English, otherwise None.
+        """
+        record("run_started", query=query)
         i = 0
+        source_language = None
         meta_infos = ""
         for meta_data in meta:
             key = self.datapipe.store(meta_data)
@@ -550,46 +1346,54 @@ class Orchestrator(BaseModel):
             )
         prompt = self.planner_generate_prompt(query)
         if "google_translate" in self.available_tasks:
-            prompt = self.available_tasks["google_translate"].execute(
-                [prompt, "en"]
-            )
+            prompt = await self.available_tasks[
+                "google_translate"
+            ].aexecute([prompt, "en"])
             source_language = prompt[1]
             prompt = prompt[0]
         # history = self.available_tasks["google_translate"].execute(history+"$#en").text
         final_response = ""
         finished = False
-        self.print_log("planner", "Planning Started...\n")
-        strategy = self.planner.plan_strategy(  # should separate plan to 2 parts, first get the strategy, second generate code
-            query=prompt,
-            history=history,
-            meta=meta_infos,
-            use_history=use_history,
-            **kwargs,
+        use_library = (
+            self.plan_library is not None
+            and len(meta) == 0
+            and not (use_history and history)
         )
-        with open("./log/logger.txt", mode="a", encoding="utf-8") as f:
-            f.write("\n==========================================first strategy start================================================\n")
-            f.write(strategy)
-            f.write("\n==========================================first strategy end================================================\n")
+        replayed = use_library and await self._areplay_plan(prompt, state)
+        self.print_log("planner", "Planning Started...\n")
+        if not replayed:
+            with span("planner.plan_strategy"):
+                state.strategy = await self.planner.aplan_strategy(  # should separate plan to 2 parts, first get the strategy, second generate code
+                    query=prompt,
+                    history=history,
+                    meta=meta_infos,
+                    use_history=use_history,
+                    **kwargs,
+                )
+            record("strategy", strategy=state.strategy)
         times = 0
-        while True:  # keep running until finished planning
+        speculation = None
+        succeeded = False
+        while not replayed:  # keep running until finished planning
             if times>10:
-                self.succeed_actions.extend(self.current_actions)
-                self.succeed_inputs.append(self.current_actions_inputs)
+                if speculation is not None:
+                    speculation[0].cancel()
+                state.succeed_actions.extend(state.current_actions)
+                state.succeed_inputs.append(state.current_actions_inputs)
                 break
             times+=1
-            with open("./log/logger.txt", mode="a", encoding="utf-8") as f:
-                f.write(f"==================attempt {times} ==============================")
-            response = self.planner.plan_evaluation(
-                query=prompt, 
-                strategy=strategy, 
-                current_action = self.current_actions, 
-                current_action_input=self.current_actions_inputs, 
-                current_failed_actions=self.current_failed_actions, 
-                current_failed_actions_inputs=self.current_failed_actions_inputs, 
-                previous_inputs=self.succeed_inputs,
-                previous_actions=self.succeed_actions
+            record("attempt", attempt=times)
+            response = await self._next_evaluation(
+                prompt, state, speculation
             )
+            speculation = None
             strategy_change, step_success, content = self.parse_evaluation_response_and_update_current_action(response)
+            record(
+                "evaluation",
+                attempt=times,
+                strategy_change=strategy_change,
+                step_success=step_success,
+            )
             if content is False:
                 continue
             if times == 1:
@@ -597,33 +1401,37 @@ class Orchestrator(BaseModel):
                 step_success = False
             if step_success:
                 assert strategy_change is False
-                self.succeed_actions.extend(self.current_actions)
-                self.succeed_inputs.append(self.current_actions_inputs)
+                succeeded = True
+                state.succeed_actions.extend(state.current_actions)
+                state.succeed_inputs.append(state.current_actions_inputs)
                 break
             if strategy_change:
-                strategy = content
+                state.strategy = content
             else:  # failed
                 # content = self.planner.parse(content)
-                self.current_failed_actions.append(self.current_actions)
-                self.current_failed_actions_inputs.append(self.current_actions_inputs)
-                self.current_actions_inputs = content
-                self.current_actions = []
-                try:
-                    exec(content, locals(), self.vars)
-                except (Exception, SystemExit) as error:
-                    self.current_actions.append("action initialze failed, error message: " + str(error) + '\n')
-        
-        
-        print("reach to final response")
+                state.current_failed_actions.append(state.current_actions)
+                state.current_failed_actions_inputs.append(state.current_actions_inputs)
+                state.current_actions_inputs = content
+                state.current_actions = []
+                if self.speculative:
+                    speculation = self._speculate(prompt, content, state)
+                await self.aexecute_plan(content, state)
+        if use_library and succeeded:
+            self._store_plan(prompt, state)
+
         final_response = (  # move to the end
-            self._prepare_planner_response_for_response_generator()
+            self._prepare_planner_response_for_response_generator(state)
+        )
+        record(
+            "planner_final_response",
+            logging.DEBUG,
+            final_response=final_response,
         )
-        print(final_response)
         self.print_log(
             "planner",
             f"Planner final response: {final_response}\nPlanning Ended...\n\n",
         )
-        self.previous_actions.extend(self.succeed_actions)
+        session.finish_run(state)
 
         final_response = self.response_generator_generate_prompt(
             final_response=final_response,
@@ -632,21 +1440,4 @@ class Orchestrator(BaseModel):
             use_history=use_history,
         )
 
-        self.print_log(
-            "response_generator",
-            f"Final Answer Generation Started...\nInput Prompt: \n\n{final_response}",
-        )
-        final_response = self.generate_final_answer(
-            query=query, thinker=final_response, **kwargs
-        )
-        self.print_log(
-            "response_generator",
-            f"Response: {final_response}\n\nFinal Answer Generation Ended.\n",
-        )
-
-        if "google_translate" in self.available_tasks:
-            final_response = self.available_tasks[
-                "google_translate"
-            ].execute([final_response, source_language])[0]
-
-        return final_response
+        return final_response, source_language
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import re
+import textwrap
+import threading
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.orchestrator.interpreter import PlanInterpreter
+from openCHA.orchestrator.task_cache import _DATAPIPE_KEY
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+# slot types of the queries, matched in this order
+_SLOTS = [
+    (
+        "participant_id",
+        re.compile(r"\bpar_\d+\b|\b[A-Z0-9]{3}_[A-Z0-9]{4,}\b"),
+    ),
+    ("date", re.compile(r"\b\d{4}-\d{2}-\d{2}\b")),
+    ("number", re.compile(r"\b\d+(?:\.\d+)?\b")),
+]
+_RELATIVE_DATES = {"today": 0, "yesterday": 1}
+_RELATIVE_DATE = re.compile(r"\b(today|yesterday)\b", re.IGNORECASE)
+_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+
+
+class PlanLibrary(BaseModel):
+    """
+    **Description:**
+
+        A library of the code blocks that answered past queries, so repetitive questions (e.g. "risk factor for
+        participant A4F_12345 today") are answered by running the stored block again without any planner LLM call.
+
+        A query is reduced to its intent template by replacing its slots (participant ids, dates, numbers) with
+        their types; "today" and "yesterday" are date slots resolved to the current date. The stored block is
+        the successful block of the run and the earlier blocks it reads variables from, with the slot values
+        replaced by placeholders. A new query with the same template fills the placeholders with its own slot
+        values. Blocks with literals that cannot be filled (other dates, datapipe keys), ambiguous slots, or slots
+        of the query that the block does not use are not stored. An entry is removed after `max_failures` failed replays.
+
+    Attributes:
+        path:           JSON file the library is loaded from and saved to. None keeps it in memory.
+        max_entries:    Maximum number of stored plans. The least used ones are removed first.
+        max_failures:   Number of failed replays after which a plan is removed.
+        hits:           Number of lookups that returned a plan.
+        misses:         Number of lookups that did not.
+    """
+
+    path: Optional[str] = None
+    max_entries: int = 1024
+    max_failures: int = 2
+    hits: int = 0
+    misses: int = 0
+    _entries: Optional[Dict[str, Dict[str, Any]]] = PrivateAttr(
+        default=None
+    )
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+
+    @staticmethod
+    def intent(
+        query: str, today: Optional[datetime.date] = None
+    ) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+            Split a query into its intent template and its slots.
+
+        Args:
+            query (str): The user query.
+            today (datetime.date): The date of "today". Defaults to the current date.
+        Return:
+            Tuple[str, List[Tuple[str, str]]]: The template and the (type, value) of the slots in query order.
+
+        """
+        if today is None:
+            today = datetime.date.today()
+        found = []
+        for slot_type, pattern in _SLOTS:
+            for match in pattern.finditer(query):
+                if any(
+                    match.start() < end and start < match.end()
+                    for start, end, _, _ in found
+                ):
+                    continue
+                found.append(
+                    (
+                        match.start(),
+                        match.end(),
+                        slot_type,
+                        match.group(0),
+                    )
+                )
+        for match in _RELATIVE_DATE.finditer(query):
+            days = _RELATIVE_DATES[match.group(1).lower()]
+            date = today - datetime.timedelta(days=days)
+            # the word stays in the template
+            found.append(
+                (
+                    match.start(),
+                    match.start(),
+                    "date",
+                    date.isoformat(),
+                )
+            )
+        found.sort()
+        template, position = "", 0
+        for start, end, slot_type, _ in found:
+            template += query[position:start]
+            if end > start:
+                template += f"<{slot_type}>"
+            position = max(position, end)
+        template += query[position:]
+        template = " ".join(template.lower().split()).rstrip("?.! ")
+        return template, [
+            (slot_type, value) for _, _, slot_type, value in found
+        ]
+
+    def _loaded_entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None and os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as file:
+                    self._entries = json.load(file)
+        return self._entries
+
+    def _save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def lookup(self, query: str) -> Optional[str]:
+        """
+            Find the plan of a query.
+
+        Args:
+            query (str): The user query.
+        Return:
+            Optional[str]: The code block with the slots of the query filled in, or None.
+
+        """
+        template, slots = self.intent(query)
+        with self._lock:
+            entry = self._loaded_entries().get(template)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        program = entry["program"]
+        for index, (_, value) in enumerate(slots):
+            program = program.replace(f"<<slot_{index}>>", value)
+        return program
+
+    def add(
+        self,
+        query: str,
+        blocks: List[str],
+        interpreter: PlanInterpreter,
+    ) -> Optional[str]:
+        """
+            Store the plan of a successful run.
+
+        Args:
+            query (str): The user query.
+            blocks (List[str]): The executed code blocks of the run without errors, in order. The last one is the
+                block that completed the query.
+            interpreter (PlanInterpreter): Parses the code blocks.
+        Return:
+            Optional[str]: Why the plan was not stored, or None if it was stored.
+
+        """
+        blocks = [textwrap.dedent(block).strip() for block in blocks]
+        if len(blocks) == 0:
+            return "no_blocks"
+        try:
+            plan = interpreter.compile("\n".join(blocks))
+            final = interpreter.compile(blocks[-1])
+        except ValueError:
+            return "invalid_code"
+        if len(plan.free_names) > 0:
+            return "reads_previous_runs"
+        # the final block and the calls it reads from
+        needed = set(
+            range(len(plan.calls) - len(final.calls), len(plan.calls))
+        )
+        pending = list(needed)
+        while len(pending) > 0:
+            for index in plan.calls[
+                pending.pop()
+            ].depends_on.values():
+                if index not in needed:
+                    needed.add(index)
+                    pending.append(index)
+        program = "\n".join(
+            call.source
+            for index, call in enumerate(plan.calls)
+            if index in needed
+        )
+
+        template, slots = self.intent(query)
+        values = [value for _, value in slots]
+        for index, value in enumerate(values):
+            pattern = re.compile(
+                rf"(?<![\w.-]){re.escape(value)}(?![\w.-])"
+            )
+            if pattern.search(program) is None:
+                if value in query:
+                    # the template would match queries with any value of the slot
+                    return "unbound_slots"
+                # "today" and "yesterday" stay in the template
+                continue
+            if values.count(value) > 1:
+                return "ambiguous_slots"
+            program = pattern.sub(f"<<slot_{index}>>", program)
+        if _DATE.search(program) or _DATAPIPE_KEY.search(program):
+            return "unfilled_literals"
+
+        with self._lock:
+            entries = self._loaded_entries()
+            entries[template] = {
+                "program": program,
+                "tasks": [
+                    call.task_name
+                    for index, call in enumerate(plan.calls)
+                    if index in needed
+                ],
+                "slots": [slot_type for slot_type, _ in slots],
+                "uses": 0,
+                "failures": 0,
+            }
+            while len(entries) > self.max_entries:
+                del entries[
+                    min(entries, key=lambda key: entries[key]["uses"])
+                ]
+            self._save()
+        return None
+
+    def report(self, query: str, success: bool):
+        """
+            Record the outcome of a replayed plan. A plan is removed after `max_failures` failures.
+
+        Args:
+            query (str): The user query.
+            success (bool): If the replayed plan ran without errors.
+
+        """
+        template, _ = self.intent(query)
+        with self._lock:
+            entries = self._loaded_entries()
+            entry = entries.get(template)
+            if entry is None:
+                return
+            if success:
+                entry["uses"] += 1
+                entry["failures"] = 0
+            else:
+                entry["failures"] += 1
+                if entry["failures"] >= self.max_failures:
+                    del entries[template]
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
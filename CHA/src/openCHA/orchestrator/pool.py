@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.orchestrator import Orchestrator
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+_default_pool: Optional[OrchestratorPool] = None
+_default_pool_lock = threading.Lock()
+
+
+class OrchestratorPool(BaseModel):
+    """
+    **Description:**
+
+        A pool of reusable orchestrators keyed by their task set and all the other initialization arguments. The
+        orchestrators do not keep any per-query state (look at **RunState** and **SessionState**), so one orchestrator
+        can serve many sessions at the same time and the tasks, planner, and LLMs are only initialized once per
+        configuration.
+    """
+
+    orchestrators: Dict[
+        Tuple[Tuple[str, ...], str], Orchestrator
+    ] = {}
+    _arguments: Dict[
+        Tuple[Tuple[str, ...], str], Dict[str, Any]
+    ] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    # held while the orchestrator of a key is initialized, so other keys are not blocked
+    _key_locks: Dict[Tuple[Tuple[str, ...], str], Any] = PrivateAttr(
+        default_factory=dict
+    )
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def default(cls) -> OrchestratorPool:
+        """
+            Return the process wide pool.
+
+        Return:
+            OrchestratorPool: The shared pool.
+
+        """
+        global _default_pool
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = cls()
+        return _default_pool
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return [type(value).__qualname__, value.model_dump()]
+        if isinstance(value, (set, frozenset)):
+            return sorted(value, key=repr)
+        # the pool keeps the arguments of its orchestrators alive, so the id is not reused
+        return f"{type(value).__qualname__}@{id(value)}"
+
+    def _key(
+        self, available_tasks: List[str], **kwargs: Any
+    ) -> Tuple[Tuple[str, ...], str]:
+        # every argument of the initialization, hashed so API keys are not kept in the pool
+        normalized = json.dumps(
+            kwargs, sort_keys=True, default=self._normalize
+        )
+        return (
+            tuple(sorted(set(available_tasks))),
+            hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+        )
+
+    def get(
+        self,
+        available_tasks: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Orchestrator:
+        """
+            Return the orchestrator for the task set and arguments, initializing it on the first call.
+            The arguments are the same as **Orchestrator.initialize**. Concurrent calls for the same key wait for
+            a single initialization, while the other keys are served in the meantime.
+
+        Args:
+            available_tasks (List[str]): List of available task using TaskType.
+            **kwargs (Any): The other arguments of **Orchestrator.initialize**.
+        Return:
+            Orchestrator: The pooled orchestrator.
+
+        """
+        if available_tasks is None:
+            available_tasks = []
+        key = self._key(available_tasks, **kwargs)
+        with self._lock:
+            if key in self.orchestrators:
+                return self.orchestrators[key]
+            key_lock = self._key_locks.setdefault(
+                key, threading.Lock()
+            )
+        with key_lock:
+            with self._lock:
+                if key in self.orchestrators:
+                    return self.orchestrators[key]
+            orchestrator = Orchestrator.initialize(
+                available_tasks=available_tasks, **kwargs
+            )
+            with self._lock:
+                self.orchestrators[key] = orchestrator
+                self._arguments[key] = kwargs
+                self._key_locks.pop(key, None)
+        return orchestrator
+
+    def clear(self):
+        with self._lock:
+            self.orchestrators = {}
+            self._arguments = {}
+            self._key_locks = {}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+
+from openCHA.orchestrator import Action
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class RunState(BaseModel):
+    """
+    **Description:**
+
+        The mutable state of a single **Orchestrator.run** call. A new RunState is created for every query, so the planner
+        prompts of a query only contain the actions of that query, and concurrent runs on the same orchestrator do not
+        share anything.
+
+    Attributes:
+        run_id:                         Unique id of the run.
+        current_actions:                Actions (or initialization errors) of the most recent step attempt.
+        current_actions_inputs:         The python code block of the most recent step attempt.
+        current_failed_actions:         Actions of the failed step attempts.
+        current_failed_actions_inputs:  The python code blocks of the failed step attempts.
+        succeed_actions:                Actions of the successful steps.
+        succeed_inputs:                 The python code blocks of the successful steps.
+        runtime:                        For datapipe keys returned by tasks, whether they were passed to another task.
+        vars:                           Variables assigned by the executed code blocks.
+        strategy:                       The current strategy of the planner.
+    """
+
+    run_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    current_actions: List[Any] = []
+    current_actions_inputs: str = ""
+    current_failed_actions: List[Any] = []
+    current_failed_actions_inputs: List[str] = []
+    succeed_actions: List[Any] = []
+    succeed_inputs: List[str] = []
+    runtime: Dict[str, bool] = {}
+    vars: Dict[str, Any] = {}
+    strategy: str = ""
+
+
+class SessionState(BaseModel):
+    """
+    **Description:**
+
+        The state of a conversation that outlives a single run. Only the successful actions of the finished runs are kept.
+
+    Attributes:
+        session_id:             Unique id of the session.
+        previous_actions:       The successful actions of the finished runs, oldest first.
+        max_previous_actions:   Only the most recent actions are kept, so long conversations do not grow the session.
+    """
+
+    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    previous_actions: List[Action] = []
+    max_previous_actions: int = 100
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+    def new_run(self) -> RunState:
+        """
+            Create the state of a new run in this session.
+
+        Return:
+            RunState: Empty run state.
+
+        """
+        return RunState()
+
+    def finish_run(self, state: RunState):
+        """
+            Keep the successful actions of a finished run, dropping the oldest ones after `max_previous_actions`.
+
+        Args:
+            state (RunState): The state of the finished run.
+        """
+        self.previous_actions.extend(
+            action
+            for action in state.succeed_actions
+            if isinstance(action, Action)
+        )
+        overflow = (
+            len(self.previous_actions) - self.max_previous_actions
+        )
+        if overflow > 0:
+            del self.previous_actions[:overflow]
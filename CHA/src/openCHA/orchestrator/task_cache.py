@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.datapipes import DataPipe
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+_DATAPIPE_KEY = re.compile(r"datapipe:([0-9a-f\-]{36})")
+
+
+class TaskResultCache(BaseModel):
+    """
+    **Description:**
+
+        An in-memory cache of task results used by the **Orchestrator** so the same task with the same inputs is not
+        executed again (for example when the planner re-issues a lookup after a failed step). Only the tasks with
+        `cacheable=True` are cached. Entries expire after the task's `cache_ttl` (or `default_ttl`) seconds and the
+        least recently used entries are evicted when `max_entries` or `max_bytes` is exceeded.
+
+        Inputs referencing the datapipe (`datapipe:<key>`) are keyed by the hash of the stored content, so two
+        different keys holding the same data share the cache entry.
+
+    Attributes:
+        max_entries:    Maximum number of cached results.
+        max_bytes:      Maximum total (approximate) size of the cached results in bytes.
+        default_ttl:    Time to live in seconds of the results of tasks without `cache_ttl`.
+        hits:           Number of lookups that returned a cached result.
+        misses:         Number of lookups that did not find a valid cached result.
+        evictions:      Number of entries removed because of the size limits.
+    """
+
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    default_ttl: float = 600.0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _bytes: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def _normalize(
+        self, value: Any, datapipe: Optional[DataPipe]
+    ) -> Any:
+        if isinstance(value, str):
+            value = value.strip()
+            if datapipe is None:
+                return value
+
+            def content_hash(match):
+                try:
+                    content = datapipe.retrieve(match.group(1))
+                except Exception:
+                    return match.group(0)
+                if not isinstance(content, str):
+                    content = json.dumps(
+                        content, sort_keys=True, default=str
+                    )
+                digest = hashlib.sha256(
+                    content.encode("utf-8")
+                ).hexdigest()
+                return f"datapipe-sha256:{digest}"
+
+            return _DATAPIPE_KEY.sub(content_hash, value)
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(item, datapipe) for item in value]
+        if isinstance(value, dict):
+            return {
+                str(key): self._normalize(item, datapipe)
+                for key, item in value.items()
+            }
+        return value
+
+    def make_key(
+        self,
+        task_name: str,
+        task_inputs: List[Any],
+        datapipe: Optional[DataPipe] = None,
+    ) -> str:
+        """
+            Create the cache key of a task call from the task name and the normalized inputs.
+
+        Args:
+            task_name (str): The name of the task.
+            task_inputs (List[Any]): The inputs provided by the planner.
+            datapipe (DataPipe): The datapipe used to resolve `datapipe:<key>` inputs.
+        Return:
+            str: The cache key.
+
+        """
+        normalized = json.dumps(
+            [task_name, self._normalize(task_inputs, datapipe)],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _size(self, result: Any) -> int:
+        if isinstance(result, str):
+            return len(result.encode("utf-8"))
+        return len(json.dumps(result, default=str).encode("utf-8"))
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+            Look up a cached result.
+
+        Args:
+            key (str): The key created by **make_key**.
+        Return:
+            Tuple[bool, Any]: Whether a valid result was found and the result.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def peek(
+        self, key: str, allow_stale: bool = False
+    ) -> Tuple[bool, Any]:
+        """
+            Look up a cached result without updating the counters or the recency of the entry.
+
+        Args:
+            key (str): The key created by **make_key**.
+            allow_stale (bool): Also return the result if it is expired but not evicted yet.
+        Return:
+            Tuple[bool, Any]: Whether a result was found and the result.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (
+                not allow_stale and entry[1] < time.monotonic()
+            ):
+                return False, None
+            return True, entry[0]
+
+    def put(self, key: str, result: Any, ttl: Optional[float] = None):
+        """
+            Store a task result. Results larger than `max_bytes` are not stored.
+
+        Args:
+            key (str): The key created by **make_key**.
+            result (Any): The result of the task.
+            ttl (float): Time to live in seconds. `default_ttl` is used if it is None.
+
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        if ttl <= 0:
+            return
+        size = self._size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                result,
+                time.monotonic() + ttl,
+                size,
+            )
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all the cached results. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Return the counters and the current size of the cache.
+
+        Return:
+            Dict[str, int]: hits, misses, evictions, entries and bytes.
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -1,7 +1,11 @@
 from openCHA.planners.action import Action
 from openCHA.planners.action import PlanFinish
 from openCHA.planners.planner import BasePlanner
+from openCHA.planners.context_builder import ContextBuilder
+from openCHA.planners.context_builder import ContextSection
 from openCHA.planners.planner_types import PlannerType
+from openCHA.planners.strategy_cache import StrategyCache
+from openCHA.planners.tool_index import ToolIndex
 from openCHA.planners.tree_of_thought import TreeOfThoughtPlanner
 from openCHA.planners.tree_of_thought_1_step import TreeOfThoughtStepPlanner
 from openCHA.planners.types import PLANNER_TO_CLASS
@@ -10,7 +14,11 @@ from openCHA.planners.initialize_planner import initialize_planner
 
 __all__ = [
     "BasePlanner",
+    "ContextBuilder",
+    "ContextSection",
     "PlannerType",
+    "StrategyCache",
+    "ToolIndex",
     "TreeOfThoughtPlanner",
     "TreeOfThoughtStepPlanner",
     "PLANNER_TO_CLASS",
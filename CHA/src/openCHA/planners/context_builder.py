@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from openCHA.journal import record
+from openCHA.llms import llm_priority
+from openCHA.llms import Priority
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+class ContextSection(BaseModel):
+    """
+    **Description:**
+
+        A named list of items (actions, code blocks, ...) that is rendered into a part of a planner prompt.
+        Pinned sections are always rendered verbatim and their tokens are reserved before the other sections.
+    """
+
+    name: str
+    items: List[Any] = []
+    pinned: bool = False
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+
+class ContextBuilder(BaseModel):
+    """
+    **Description:**
+
+        Builds the dynamic sections of the planner prompts within a token budget. As long as the sections fit into
+        `token_budget`, they are rendered verbatim. Otherwise, the newest `keep_recent` items of each section are kept
+        verbatim and the older items are folded into a summary. Summaries are cached by the prefix of the folded items,
+        so each step only summarizes the items that were folded since the previous step. If the sections still do not
+        fit, they are truncated proportionally to their size.
+
+        The number of tokens of each rendered section is available in `last_report` and recorded in the journal.
+
+    Attributes:
+        llm:                    The LLM used for counting tokens and summarizing. If None, 4 characters per token
+                                is assumed and the folded items are truncated instead of summarized.
+        token_budget:           Maximum number of tokens of all the sections together.
+        keep_recent:            Number of newest items of each section that are kept verbatim.
+        summary_tokens:         Maximum number of tokens of the summary of a section.
+        summarize:              If False, the folded items are truncated instead of summarized by the LLM.
+        max_cached_summaries:   Maximum number of cached summaries and token counts.
+        last_report:            The number of tokens of each section in the last built context.
+    """
+
+    llm: Any = None
+    token_budget: int = 6000
+    keep_recent: int = 2
+    summary_tokens: int = 256
+    summarize: bool = True
+    max_cached_summaries: int = 512
+    last_report: Dict[str, int] = {}
+    _summaries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _counts: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+    @property
+    def _summary_prompt(self) -> str:
+        return (
+            "Summarize the following actions of a health assistant agent in at most {max_tokens} tokens. "
+            "Keep the tool names, the inputs, the datapipe keys (datapipe:...), the numbers, and the error "
+            "messages exactly as they are.\n"
+            "Summary so far:\n{summary}\n"
+            "New actions:\n{items}\n"
+            "Summary:"
+        )
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _cache_put(self, cache: OrderedDict, key: str, value: Any):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_cached_summaries:
+                cache.popitem(last=False)
+
+    def count_tokens(self, text: str) -> int:
+        """
+            Count the tokens of a text with the LLM's tokenizer. Counts are cached by the hash of the text.
+
+        Args:
+            text (str): The text.
+        Return:
+            int: The number of tokens.
+
+        """
+        if len(text) == 0:
+            return 0
+        key = self._hash(text)
+        with self._lock:
+            count = self._counts.get(key)
+        if count is None:
+            if self.llm is None:
+                count = (len(text) + 3) // 4
+            else:
+                count = self.llm.count_tokens(text)
+            self._cache_put(self._counts, key, count)
+        return count
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+            Cut a text to about `max_tokens` tokens.
+
+        Args:
+            text (str): The text.
+            max_tokens (int): Maximum number of tokens.
+        Return:
+            str: The text itself if it fits, otherwise its beginning followed by ` ...`.
+
+        """
+        tokens = self.count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+        return text[: int(len(text) * max_tokens / tokens)] + " ..."
+
+    def _digest(self, summary: str, items: List[str]) -> str:
+        parts = [summary] if summary else []
+        parts.extend(items)
+        share = max(self.summary_tokens // len(parts), 1)
+        return "\n".join(self.truncate(part, share) for part in parts)
+
+    def _summarize(self, summary: str, items: List[str]) -> str:
+        if self.llm is None or not self.summarize:
+            return self._digest(summary, items)
+        prompt = (
+            self._summary_prompt.replace(
+                "{max_tokens}", str(self.summary_tokens)
+            )
+            .replace("{summary}", summary or "None")
+            .replace("{items}", "\n".join(items))
+        )
+        try:
+            with llm_priority(Priority.SUMMARY):
+                response = self.llm.generate(
+                    query=prompt, max_tokens=self.summary_tokens
+                )
+        except Exception as e:
+            record(
+                "context_summary_failed",
+                logging.WARNING,
+                error=repr(e),
+            )
+            return self._digest(summary, items)
+        return self.truncate(response.strip(), self.summary_tokens)
+
+    def _fold(self, name: str, items: List[str]) -> str:
+        keys = []
+        key = self._hash(name)
+        for item in items:
+            key = self._hash(key + self._hash(item))
+            keys.append(key)
+        start, summary = 0, ""
+        with self._lock:
+            for index in range(len(keys), 0, -1):
+                if keys[index - 1] in self._summaries:
+                    start = index
+                    summary = self._summaries[keys[index - 1]]
+                    self._summaries.move_to_end(keys[index - 1])
+                    break
+        if start < len(items):
+            summary = self._summarize(summary, items[start:])
+            self._cache_put(self._summaries, keys[-1], summary)
+        return f"Summary of {len(items)} earlier item(s):\n{summary}"
+
+    def build(self, sections: List[ContextSection]) -> Dict[str, str]:
+        """
+            Render the sections within the token budget.
+
+        Args:
+            sections (List[ContextSection]): The sections of the prompt.
+        Return:
+            Dict[str, str]: The rendered text of each section by its name.
+
+        """
+        texts = {
+            section.name: [str(item) for item in section.items]
+            for section in sections
+        }
+        counts = {
+            name: [self.count_tokens(item) for item in items]
+            for name, items in texts.items()
+        }
+        total = sum(sum(section) for section in counts.values())
+        folded_items = 0
+        if total > self.token_budget:
+            available = self.token_budget - sum(
+                sum(counts[section.name])
+                for section in sections
+                if section.pinned
+            )
+            foldable = [
+                section.name
+                for section in sections
+                if not section.pinned
+            ]
+            # keep as many recent items as the budget allows
+            keep = max(self.keep_recent, 1)
+            while keep > 1 and available < sum(
+                sum(counts[name][-keep:])
+                + (
+                    self.summary_tokens
+                    if len(texts[name]) > keep
+                    else 0
+                )
+                for name in foldable
+            ):
+                keep -= 1
+            for name in foldable:
+                if len(texts[name]) > keep:
+                    folded_items += len(texts[name]) - keep
+                    texts[name] = [
+                        self._fold(name, texts[name][:-keep])
+                    ] + texts[name][-keep:]
+            rendered = {
+                name: "\n".join(texts[name]) for name in foldable
+            }
+            used = {
+                name: self.count_tokens(text)
+                for name, text in rendered.items()
+            }
+            if sum(used.values()) > max(available, 0):
+                scale = max(available, 0) / sum(used.values())
+                for name, text in rendered.items():
+                    texts[name] = [
+                        self.truncate(text, int(used[name] * scale))
+                    ]
+
+        context = {
+            name: "\n".join(items) for name, items in texts.items()
+        }
+        report = {
+            name: self.count_tokens(text)
+            for name, text in context.items()
+        }
+        report["total"] = sum(report.values())
+        report["budget"] = self.token_budget
+        report["folded_items"] = folded_items
+        self.last_report = report
+        record("context_tokens", sections=report)
+        return context
+
+    @staticmethod
+    def dedup_attempts(
+        actions: List[Any], inputs: List[str]
+    ) -> Tuple[List[Any], List[str]]:
+        """
+            Remove the repeated failed attempts. Two attempts are the same if they ran the same code and got the same
+            task responses. Only the newest occurrence of an attempt is kept, and its code is annotated with the number
+            of times it failed.
+
+        Args:
+            actions (List[Any]): The actions of each failed attempt.
+            inputs (List[str]): The code block of each failed attempt.
+        Return:
+            Tuple[List[Any], List[str]]: The actions and the code blocks of the distinct attempts.
+
+        """
+
+        def action_key(action: Any) -> str:
+            if isinstance(action, list):
+                return "\n".join(action_key(item) for item in action)
+            if hasattr(action, "task_name"):
+                return (
+                    f"{action.task_name}: {action.task_inputs} "
+                    f"{action.task_response}"
+                )
+            return str(action)
+
+        occurrences: Dict[str, int] = {}
+        keys = []
+        for action, code in zip(actions, inputs):
+            key = f"{str(code).strip()}\n{action_key(action)}"
+            occurrences[key] = occurrences.get(key, 0) + 1
+            keys.append(key)
+        deduped_actions, deduped_inputs = [], []
+        seen = set()
+        for index in range(len(keys) - 1, -1, -1):
+            if keys[index] in seen:
+                continue
+            seen.add(keys[index])
+            code = inputs[index]
+            if occurrences[keys[index]] > 1:
+                code = f"{code}\n(this attempt failed {occurrences[keys[index]]} times)"
+            deduped_actions.insert(0, actions[index])
+            deduped_inputs.insert(0, code)
+        # attempts without a recorded code block are kept as they are
+        deduped_actions.extend(actions[len(inputs) :])
+        deduped_inputs.extend(inputs[len(actions) :])
+        return deduped_actions, deduped_inputs
@@ -2,6 +2,8 @@ from typing import Any
 from typing import List
 
 from openCHA.llms import BaseLLM
+from openCHA.llms import CachedLLM
+from openCHA.llms import initialize_routed_llm
 from openCHA.llms import LLM_TO_CLASS
 from openCHA.llms import LLMType
 from openCHA.planners import BasePlanner
@@ -23,7 +25,9 @@ def initialize_planner(
         tasks (List[BaseTask]): List of tasks to be associated with the planner.
         llm (str): Language model type.
         planner (str): Planner type.
-        **kwargs (Any): Additional keyword arguments.
+        **kwargs (Any): Additional keyword arguments. If `llm_cache` (LLMResponseCache) is provided, the LLM is wrapped
+            with a **CachedLLM** using it. If `llm_routing` (Dict[str, RoutingPolicy]) has a `planner` policy, the LLM
+            is a **RouterLLM** over `llm` and the policy's fallbacks.
     Return:
         BasePlanner: Initialized planner instance.
     Raise:
@@ -56,6 +60,23 @@ def initialize_planner(
         )
 
     planner_cls = PLANNER_TO_CLASS[planner]
-    llm_model = LLM_TO_CLASS[llm]()
+    # shared with the other components and loaded on first use
+    llm_model = initialize_routed_llm(
+        llm, kwargs.get("llm_routing", {}).get("planner")
+    )
+    if kwargs.get("llm_cache") is not None:
+        llm_model = CachedLLM(llm=llm_model, cache=kwargs["llm_cache"])
     planner = planner_cls(llm_model=llm_model, available_tasks=tasks)
+    # settings of the planners that support them
+    for name in (
+        "generation_profiles",
+        "strategy_branches",
+        "strategy_cache",
+        "tool_index",
+    ):
+        if (
+            kwargs.get(name) is not None
+            and name in planner_cls.model_fields
+        ):
+            setattr(planner, name, kwargs[name])
     return planner
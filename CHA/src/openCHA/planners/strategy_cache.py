@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+_TOKEN = re.compile(r"[a-z0-9]+|[^\x00-\x7f\s]")
+_NUMBER = re.compile(r"\d+")
+# words that do not change the intent of a question
+_STOP_WORDS = frozenset(
+    "a about an and are at based be by can could did do does for from give how i in is me my "
+    "of on or please show tell the to was were what whats with would you your".split()
+)
+
+
+class StrategyCache(BaseModel):
+    """
+    **Description:**
+
+        A local similarity index over past queries and the strategies (`Decision:` blocks) the planner chose for
+        them. Most questions are paraphrases of a few intents, so a new query that is similar enough to a past one
+        reuses its strategy instead of calling the planner LLM.
+
+        The queries are compared with the cosine similarity of their TF-IDF vectors (without stop words).
+        Queries mentioning different numbers (days, weeks, values) never match. The index is cleared when the
+        available tasks change, since the strategies refer to the tasks.
+
+        The cache is opt-in (see the `strategy_cache` argument of **Orchestrator.initialize**). It is shared by all
+        the queries of the planner, so with a pooled orchestrator the strategies of one session are reused by the
+        other sessions of the same configuration.
+
+    Attributes:
+        threshold:      Minimum similarity to reuse a strategy.
+        max_entries:    Maximum number of stored strategies. The least recently used ones are removed first.
+        hits:           Number of lookups that returned a strategy.
+        misses:         Number of lookups that did not.
+    """
+
+    threshold: float = 0.8
+    max_entries: int = 512
+    hits: int = 0
+    misses: int = 0
+    _entries: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _document_frequency: Counter = PrivateAttr(
+        default_factory=Counter
+    )
+    _tasks_signature: Optional[str] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def tasks_signature(tasks: List[Any]) -> str:
+        """
+            Compute the signature of the available tasks from their names and descriptions.
+
+        Args:
+            tasks (List[BaseTask]): The available tasks.
+        Return:
+            str: The signature.
+
+        """
+        names = sorted(
+            f"{task.name}\n{task.description}" for task in tasks
+        )
+        return hashlib.sha256(
+            "\n\n".join(names).encode("utf-8")
+        ).hexdigest()
+
+    def _terms(self, query: str) -> Counter:
+        return Counter(
+            word
+            for word in _TOKEN.findall(query.lower().replace("'", ""))
+            if word not in _STOP_WORDS
+        )
+
+    def _vector(self, terms: Counter) -> Dict[str, float]:
+        count = len(self._entries) + 1
+        vector = {
+            term: (1 + math.log(frequency))
+            * (
+                math.log(
+                    (1 + count) / (1 + self._document_frequency[term])
+                )
+                + 1
+            )
+            for term, frequency in terms.items()
+        }
+        norm = math.sqrt(
+            sum(value * value for value in vector.values())
+        )
+        return {term: value / norm for term, value in vector.items()}
+
+    def _check_tasks(self, tasks_signature: str):
+        if tasks_signature != self._tasks_signature:
+            self._entries.clear()
+            self._document_frequency.clear()
+            self._tasks_signature = tasks_signature
+
+    def _remove(self, key: str):
+        terms, _, _ = self._entries.pop(key)
+        self._document_frequency.subtract(terms.keys())
+
+    def lookup(
+        self, query: str, tasks_signature: str
+    ) -> Optional[Tuple[str, float]]:
+        """
+            Find the strategy of the most similar past query.
+
+        Args:
+            query (str): The user query.
+            tasks_signature (str): The signature of the available tasks (see **tasks_signature**).
+        Return:
+            Optional[Tuple[str, float]]: The strategy and the similarity, or None if no past query is similar enough.
+
+        """
+        terms = self._terms(query)
+        with self._lock:
+            self._check_tasks(tasks_signature)
+            if len(terms) == 0 or len(self._entries) == 0:
+                self.misses += 1
+                return None
+            vector = self._vector(terms)
+            numbers = set(_NUMBER.findall(query))
+            best_key, best_similarity = None, 0.0
+            for key, (
+                entry_terms,
+                _,
+                entry_numbers,
+            ) in self._entries.items():
+                if entry_numbers != numbers:
+                    continue
+                entry_vector = self._vector(entry_terms)
+                similarity = sum(
+                    value * entry_vector.get(term, 0.0)
+                    for term, value in vector.items()
+                )
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+            if best_key is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][1], best_similarity
+
+    def add(self, query: str, strategy: str, tasks_signature: str):
+        """
+            Store the strategy chosen for a query.
+
+        Args:
+            query (str): The user query.
+            strategy (str): The strategy returned by the planner.
+            tasks_signature (str): The signature of the available tasks (see **tasks_signature**).
+
+        """
+        terms = self._terms(query)
+        if len(terms) == 0:
+            return
+        key = " ".join(query.lower().split())
+        with self._lock:
+            self._check_tasks(tasks_signature)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                terms,
+                strategy,
+                set(_NUMBER.findall(query)),
+            )
+            self._document_frequency.update(terms.keys())
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """
+        Remove all the stored strategies. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._document_frequency.clear()
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from openCHA.planners.strategy_cache import _STOP_WORDS
+from openCHA.planners.strategy_cache import _TOKEN
+from pydantic import BaseModel
+from pydantic import PrivateAttr
+
+
+# words of most tool descriptions
+_TOOL_STOP_WORDS = _STOP_WORDS | frozenset(
+    "it its that these this those tool tools use used uses".split()
+)
+_SUFFIXES = (
+    "ations",
+    "ation",
+    "ators",
+    "ator",
+    "ings",
+    "ing",
+    "ions",
+    "ion",
+    "ers",
+    "er",
+    "ors",
+    "or",
+    "ies",
+    "es",
+    "ed",
+    "s",
+    "e",
+)
+
+
+def _stem(word: str) -> str:
+    # translate, translation and translator share translat
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+class ToolIndex(BaseModel):
+    """
+    **Description:**
+
+        A local BM25 index over the names, descriptions, outputs, and `using_example` of the available tasks.
+        The planner prompts include only the tasks most relevant to the query, the tasks named in the strategy,
+        and their dependencies, instead of all the tasks. The rendered description of each task is cached too.
+        The index is rebuilt, and the rendered descriptions are dropped, when the names of the available tasks change.
+
+    Attributes:
+        top_k:          Number of tasks selected by relevance. With this many tasks or fewer, all of them are used.
+        min_score:      Minimum score of a selected task relative to the best one.
+        always_include: Names of the tasks that are always in the prompts.
+        k1:             BM25 term frequency saturation.
+        b:              BM25 document length normalization.
+        max_rendered:   Maximum number of cached task descriptions.
+    """
+
+    top_k: int = 6
+    min_score: float = 0.3
+    always_include: List[str] = []
+    k1: float = 1.5
+    b: float = 0.75
+    max_rendered: int = 256
+    _tasks_key: Optional[Tuple[str, ...]] = PrivateAttr(default=None)
+    _documents: List[Counter] = PrivateAttr(default_factory=list)
+    _lengths: List[int] = PrivateAttr(default_factory=list)
+    _document_frequency: Counter = PrivateAttr(
+        default_factory=Counter
+    )
+    _rendered: Dict[Tuple, str] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @staticmethod
+    def _terms(text: str) -> List[str]:
+        return [
+            _stem(word)
+            for word in _TOKEN.findall(text.lower().replace("'", ""))
+            if word not in _TOOL_STOP_WORDS
+        ]
+
+    def _document(self, task: Any) -> str:
+        return "\n".join(
+            [
+                task.name,
+                # chat names are CamelCase
+                " ".join(
+                    "".join(
+                        f" {c}" if c.isupper() else c
+                        for c in getattr(task, "chat_name", "")
+                    ).split()
+                ),
+                task.description,
+                "\n".join(task.outputs),
+                getattr(task, "using_example", ""),
+            ]
+        )
+
+    def _build(self, tasks: List[Any]):
+        key = tuple(task.name for task in tasks)
+        if key == self._tasks_key:
+            return
+        self._documents = [
+            Counter(self._terms(self._document(task)))
+            for task in tasks
+        ]
+        self._lengths = [
+            sum(document.values()) for document in self._documents
+        ]
+        self._document_frequency = Counter()
+        for document in self._documents:
+            self._document_frequency.update(document.keys())
+        self._tasks_key = key
+        self._rendered = {}
+
+    def _scores(self, query: str) -> List[float]:
+        count = len(self._documents)
+        average = sum(self._lengths) / max(count, 1)
+        scores = []
+        for document, length in zip(self._documents, self._lengths):
+            score = 0.0
+            for term in set(self._terms(query)):
+                frequency = document.get(term, 0)
+                if frequency == 0:
+                    continue
+                df = self._document_frequency[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                score += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (
+                        frequency
+                        + self.k1
+                        * (
+                            1
+                            - self.b
+                            + self.b * length / max(average, 1)
+                        )
+                    )
+                )
+            scores.append(score)
+        return scores
+
+    def select(
+        self, query: str, tasks: List[Any], strategy: str = ""
+    ) -> List[Any]:
+        """
+            Select the tasks of the prompts of a query.
+
+        Args:
+            query (str): The user query.
+            tasks (List[BaseTask]): The available tasks.
+            strategy (str): The strategy of the planner. The tasks named in it are selected too.
+        Return:
+            List[BaseTask]: The selected tasks in the order of `tasks`.
+
+        """
+        if len(tasks) <= self.top_k:
+            return list(tasks)
+        with self._lock:
+            self._build(tasks)
+            scores = self._scores(query)
+        best = max(scores, default=0.0)
+        ranked = sorted(
+            (
+                index
+                for index, score in enumerate(scores)
+                if score > 0 and score >= self.min_score * best
+            ),
+            key=lambda index: -scores[index],
+        )
+        if len(ranked) == 0:
+            # nothing to go by
+            return list(tasks)
+        names = {tasks[index].name for index in ranked[: self.top_k]}
+        names.update(self.always_include)
+        names.update(
+            task.name for task in tasks if task.name in strategy
+        )
+        by_name = {task.name: task for task in tasks}
+        pending = list(names)
+        while len(pending) > 0:
+            task = by_name.get(pending.pop())
+            if task is None:
+                continue
+            dependencies = task.dependencies
+            # tasks that do not declare the field get the property of BaseTask
+            if not isinstance(dependencies, list):
+                dependencies = []
+            for dependency in dependencies:
+                if dependency not in names:
+                    names.add(dependency)
+                    pending.append(dependency)
+        return [task for task in tasks if task.name in names]
+
+    def render(
+        self, tasks: List[Any], render_task: Callable[[Any], str]
+    ) -> str:
+        """
+            Render the descriptions of tasks with the cached rendering of each task.
+
+        Args:
+            tasks (List[BaseTask]): The tasks.
+            render_task (Callable): Renders the description of one task.
+        Return:
+            str: The descriptions of the tasks.
+
+        """
+        with self._lock:
+            rendered = []
+            for task in tasks:
+                key = (
+                    task.name,
+                    task.description,
+                    tuple(task.outputs),
+                    task.output_type,
+                )
+                if key not in self._rendered:
+                    if len(self._rendered) >= self.max_rendered:
+                        self._rendered = {}
+                    self._rendered[key] = render_task(task)
+                rendered.append(self._rendered[key])
+        return "".join(rendered)
@@ -5,6 +5,9 @@ import re
 from typing import Any
 from typing import List
 
+from openCHA.llms import llm_priority
+from openCHA.llms import Priority
+from openCHA.llms.llm import cut_at_stop
 from openCHA.planners import Action
 from openCHA.planners import BasePlanner
 from openCHA.planners import PlanFinish
@@ -152,10 +155,12 @@ Question: {input}
         Return:
             chunks(List): List of string variables
         """
-        # 1 token ~= 4 chars in English
+        # size the chunks with the measured characters per token of the text
+        tokens = max(self._planner_model.count_tokens(input_text), 1)
+        size = max(int(max_tokens * len(input_text) / tokens), 1)
         chunks = [
-            input_text[i : i + max_tokens * 4]
-            for i in range(0, len(input_text), max_tokens * 4)
+            input_text[i : i + size]
+            for i in range(0, len(input_text), size)
         ]
         return chunks
 
@@ -173,7 +178,8 @@ Question: {input}
         # agent_scratchpad
         if (
             self.summarize_prompt
-            and len(agent_scratchpad) / 4 > self.max_tokens_allowed
+            and self._planner_model.count_tokens(agent_scratchpad)
+            > self.max_tokens_allowed
         ):
             # Shorten agent_scratchpad
             chunks = self.divide_text_into_chunks(
@@ -188,11 +194,12 @@ Question: {input}
                 prompt = self._shorten_prompt.replace(
                     "{chunk}", chunk
                 )
-                chunk_summary = (
-                    self._response_generator_model.generate(
-                        query=prompt, **kwargs
+                with llm_priority(Priority.SUMMARY):
+                    chunk_summary = (
+                        self._response_generator_model.generate(
+                            query=prompt, **kwargs
+                        )
                     )
-                )
                 agent_scratchpad += chunk_summary + " "
 
     def plan(
@@ -260,8 +267,7 @@ Question: {input}
             query=prompt, **kwargs
         )
 
-        index = min([response.find(text) for text in self._stop])
-        response = response[0:index]
+        response = "".join(cut_at_stop([response], self._stop))
         actions = self.parse(response)
         print("actions", actions)
         return actions
@@ -1,13 +1,31 @@
 """
 Heavily borrowed from langchain: https://github.com/langchain-ai/langchain/
 """
+import asyncio
+import logging
 import re
 from typing import Any
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 
+from openCHA.journal import record
+from openCHA.llms import BaseLLM
+from openCHA.llms import GenerationProfiles
+from openCHA.llms import llm_priority
+from openCHA.llms import Priority
+from openCHA.llms.llm import cut_at_stop
 from openCHA.planners import Action
 from openCHA.planners import BasePlanner
+from openCHA.planners import ContextBuilder
+from openCHA.planners import ContextSection
 from openCHA.planners import PlanFinish
+from openCHA.planners import StrategyCache
+from openCHA.planners import ToolIndex
+from openCHA.tasks import BaseTask
+from openCHA.tracing import current_span
+from openCHA.utils import run_sync
 
 
 class TreeOfThoughtStepPlanner(BasePlanner):
@@ -27,6 +45,21 @@ class TreeOfThoughtStepPlanner(BasePlanner):
 
     summarize_prompt: bool = True
     max_tokens_allowed: int = 10000
+    # token budget of the previous, failed, and current actions in the evaluation prompt
+    context_token_budget: int = 6000
+    context_builder: Optional[ContextBuilder] = None
+    # strategies of past similar queries, reused instead of calling the LLM. None disables it
+    strategy_cache: Optional[StrategyCache] = None
+    # models and settings of the strategy, evaluation, and summarization calls. None uses the planner LLM as is
+    generation_profiles: Optional[GenerationProfiles] = None
+    # selects the tasks described in the prompts of each query. None describes all the tasks
+    tool_index: Optional[ToolIndex] = None
+    # number of strategies generated and scored concurrently. 1 asks one completion for three strategies
+    strategy_branches: int = 1
+    # sampling temperature of the strategy branches, so they differ
+    branch_temperature: float = 0.9
+    # score (0-10) of a branch that is kept right away, cancelling the other branches
+    branch_early_stop_score: float = 9.0
 
     class Config:
         """Configuration for this pydantic object."""
@@ -156,23 +189,103 @@ CHA:
 """,
         ]
 
-    def task_descriptions(self):
+    @property
+    def _branch_prompts(self):
+        # [one strategy branch, scoring of a branch]
+        return [
+            """As a knowledgeable and empathetic health assistant, your primary objective is to provide the user with precise and valuable \
+information regarding their health and well-being. Utilize the available tools effectively to answer health-related queries. \
+Here are the tools at your disposal:
+{tool_names}
+
+The following is the format of the information provided:
+MetaData: this contains the name of data files of different types like image, audio, video, and text. You can pass these files to tools when needed.
+History: the history of previous chats happened. Review the history for any previous responses relevant to the current query
+PreviousActions: the list of already performed actions. You should start planning knowing that these actions are performed.
+Question: the input question you must answer.
+
+Considering previously actions and their results, use the tools and provided information to suggest ONE creative \
+strategy consisting of a sequence of tools to properly answer the user query. Prefer {branch_hint}. \
+Make sure the strategy is comprehensive enough and uses proper tools. The tools constraints should be always satisfied. \
+Do not discuss alternatives. Start with 'Decision:' and write the detailed tool executions step by step.
+
+Begin!
+
+MetaData:
+{meta}
+=========================
+{previous_actions}
+=========================
+{history}
+=========================
+USER: {input} \n CHA:
+""",
+            """Tools:
+{tool_names}
+=========================
+Question: {input}
+=========================
+Proposed strategy:
+{strategy}
+=========================
+Rate from 0 to 10 how likely this strategy answers the question correctly, using only the tools above, \
+satisfying their constraints, and with as few steps as possible. Reply only with 'Score: <number>'.
+""",
+        ]
+
+    @property
+    def _branch_hints(self) -> List[str]:
+        return [
+            "the most direct approach",
+            "an approach that gathers all the relevant data first",
+            "an approach that verifies the intermediate results",
+            "an approach with different tools than the obvious ones",
+        ]
+
+    @staticmethod
+    def _task_description(task: BaseTask) -> str:
+        return (
+            "\n-----------------------------------\n"
+            f"**{task.name}**: {task.description}"
+            "\nThis tool have the following outputs:\n"
+            + "\n".join(task.outputs)
+            + (
+                "\n- The result of this tool will be stored in the datapipe."
+                if task.output_type
+                else ""
+            )
+            + "\n-----------------------------------\n"
+        )
+
+    def task_descriptions(self, tasks: Optional[List[BaseTask]] = None):
+        if tasks is None:
+            tasks = self.available_tasks
+        if self.tool_index is None:
+            return "".join(self._task_description(task) for task in tasks)
+        return self.tool_index.render(tasks, self._task_description)
+
+    def _prompt_tasks(
+        self, query: str, strategy: Any = ""
+    ) -> List[BaseTask]:
+        """
+        The tasks described in the prompts of a query: all of them, or the relevant ones if **tool_index** is set.
+        """
+        if self.tool_index is None:
+            return self.available_tasks
+        tasks = self.tool_index.select(
+            query, self.available_tasks, self._safe_join(strategy)
+        )
+        span = current_span()
+        if span is not None:
+            span.set_attribute("prompt_tasks", len(tasks))
+        return tasks
+
+    @staticmethod
+    def _task_examples(tasks: List[BaseTask]) -> str:
         return "".join(
-            [
-                (
-                    "\n-----------------------------------\n"
-                    f"**{task.name}**: {task.description}"
-                    "\nThis tool have the following outputs:\n"
-                    + "\n".join(task.outputs)
-                    + (
-                        "\n- The result of this tool will be stored in the datapipe."
-                        if task.output_type
-                        else ""
-                    )
-                    + "\n-----------------------------------\n"
-                )
-                for task in self.available_tasks
-            ]
+            task.using_example + "\n"
+            for task in tasks
+            if hasattr(task, "using_example")
         )
 
     def divide_text_into_chunks(
@@ -189,10 +302,12 @@ CHA:
         Return:
             chunks(List): List of string variables
         """
-        # 1 token ~= 4 chars in English
+        # size the chunks with the measured characters per token of the text
+        tokens = max(self._planner_model.count_tokens(input_text), 1)
+        size = max(int(max_tokens * len(input_text) / tokens), 1)
         chunks = [
-            input_text[i : i + max_tokens * 4]
-            for i in range(0, len(input_text), max_tokens * 4)
+            input_text[i : i + size]
+            for i in range(0, len(input_text), size)
         ]
         return chunks
 
@@ -210,7 +325,8 @@ CHA:
         # agent_scratchpad
         if (
             self.summarize_prompt
-            and len(agent_scratchpad) / 4 > self.max_tokens_allowed
+            and self._planner_model.count_tokens(agent_scratchpad)
+            > self.max_tokens_allowed
         ):
             # Shorten agent_scratchpad
             chunks = self.divide_text_into_chunks(
@@ -225,11 +341,15 @@ CHA:
                 prompt = self._shorten_prompt.replace(
                     "{chunk}", chunk
                 )
-                chunk_summary = (
-                    self._response_generator_model.generate(
-                        query=prompt, **kwargs
-                    )
+                llm, profile_kwargs = self._profiled(
+                    "summarization",
+                    self._response_generator_model,
+                    kwargs,
                 )
+                with llm_priority(Priority.SUMMARY):
+                    chunk_summary = llm.generate(
+                        query=prompt, **profile_kwargs
+                    )
                 agent_scratchpad += chunk_summary + " "
 
     def plan(
@@ -297,25 +417,22 @@ CHA:
             query=prompt, **kwargs
         )
 
-        index = min([response.find(text) for text in self._stop])
-        response = response[0:index]
+        response = self._cut_at_stop(response)
         actions = self.parse(response)
-        print("actions", actions)
+        record("planner_actions", logging.DEBUG, actions=actions)
         return actions
-    
-    
-    def plan_strategy(  # get only strategy
+
+
+    def _strategy_prompt(
         self,
         query: str,
         history: str = "",
         meta: str = "",
         previous_actions: List[str] = None,
         use_history: bool = False,
+        template: Optional[str] = None,
         **kwargs: Any,
     ) -> str:
-        """
-        get the strategy 
-        """
         if previous_actions is None:
             previous_actions = []
 
@@ -323,86 +440,552 @@ CHA:
         if len(previous_actions) > 0 and self.use_previous_action:
             previous_actions_prompt = f"Previoius Actions:\n{self.generate_scratch_pad(previous_actions, **kwargs)}"
 
+        if template is None:
+            template = self._planner_prompt[0]
         prompt = (
-            self._planner_prompt[0]
+            template
             .replace("{input}", query)
             .replace("{meta}", ", ".join(meta))
             .replace(
                 "{history}", history if use_history else "No History"
             )
             .replace("{previous_actions}", previous_actions_prompt)
-            .replace("{tool_names}", self.task_descriptions())
+            .replace(
+                "{tool_names}",
+                self.task_descriptions(self._prompt_tasks(query)),
+            )
         )
-        with open("./log/logger.txt", mode="w", encoding="utf-8") as f:
-            f.write("\n==========================================first prompt start================================================\n")
-            f.write(prompt)
-            f.write("\n==========================================first prompt end================================================\n")
-        kwargs["stop"] = self._stop
-        kwargs['repetition_penalty'] = 1.2
-        response = self._planner_model.generate(
-            query=prompt, **kwargs
+        record("planner_strategy_prompt", logging.DEBUG, prompt=prompt)
+        return prompt
+
+    def _strategy_cache_usable(
+        self,
+        meta: str,
+        history: str,
+        previous_actions: Optional[List[str]],
+        use_history: bool,
+    ) -> bool:
+        # the strategy also depends on the files, the history, and the previous actions in the prompt
+        return (
+            self.strategy_cache is not None
+            and not meta
+            and not (use_history and history)
+            and not (previous_actions and self.use_previous_action)
         )
-        index = min([response.find(text) for text in self._stop])
-        response = response[0:index]
-        
-        return "Decision:\n" + response.split("Decision:")[-1]
-    
-    
-    def plan_evaluation(
+
+    def _cached_strategy(self, query: str) -> Optional[str]:
+        found = self.strategy_cache.lookup(
+            query, StrategyCache.tasks_signature(self.available_tasks)
+        )
+        span = current_span()
+        if span is not None:
+            span.set_attribute("cache_hit", found is not None)
+        if found is None:
+            return None
+        strategy, similarity = found
+        record("strategy_cache_hit", similarity=similarity)
+        return strategy
+
+    def _cache_strategy(self, query: str, strategy: str):
+        self.strategy_cache.add(
+            query,
+            strategy,
+            StrategyCache.tasks_signature(self.available_tasks),
+        )
+
+    def _cut_at_stop(self, response: str) -> str:
+        # the LLMs usually stop before the stop sequence already
+        return "".join(cut_at_stop([response], self._stop))
+
+    @staticmethod
+    def _branch_score(response: str) -> float:
+        match = re.search(
+            r"score\s*[:=]?\s*(\d+(?:\.\d+)?)", response, re.IGNORECASE
+        ) or re.search(r"\d+(?:\.\d+)?", response)
+        if match is None:
+            return 0.0
+        return min(float(match.group(match.lastindex or 0)), 10.0)
+
+    async def _abranch(
         self,
-        query, 
-        strategy, 
-        current_action, 
-        current_action_input, 
-        current_failed_actions, 
-        current_failed_actions_inputs, 
-        previous_inputs, 
+        index: int,
+        query: str,
+        prompt: str,
+        tool_names: str,
+        kwargs: Dict[str, Any],
+    ) -> Tuple[str, float]:
+        """
+        Generate and score one strategy branch.
+        """
+        hints = self._branch_hints
+        branch_kwargs = dict(kwargs)
+        branch_kwargs["stop"] = self._stop
+        branch_kwargs.setdefault("temperature", self.branch_temperature)
+        llm, branch_kwargs = self._profiled(
+            "strategy_branch", self._planner_model, branch_kwargs
+        )
+        response = await llm.agenerate(
+            query=prompt.replace("{branch_hint}", hints[index % len(hints)]),
+            **branch_kwargs,
+        )
+        strategy = (
+            "Decision:\n"
+            + self._cut_at_stop(response).split("Decision:")[-1]
+        )
+        llm, score_kwargs = self._profiled(
+            "branch_scoring", self._planner_model, {}
+        )
+        response = await llm.agenerate(
+            query=self._branch_prompts[1]
+            .replace("{tool_names}", tool_names)
+            .replace("{input}", query)
+            .replace("{strategy}", strategy),
+            **score_kwargs,
+        )
+        return strategy, self._branch_score(response)
+
+    async def _abranch_strategy(
+        self,
+        query: str,
+        history: str = "",
+        meta: str = "",
         previous_actions: List[str] = None,
-        **kwargs: Any
-    ): 
+        use_history: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Generate **strategy_branches** strategies concurrently with shorter calls, score them with a cheap
+        evaluation, and keep the best one. The other branches are cancelled as soon as one scores at least
+        **branch_early_stop_score**.
+        """
+        prompt = await asyncio.to_thread(
+            self._strategy_prompt,
+            query,
+            history,
+            meta,
+            previous_actions,
+            use_history,
+            self._branch_prompts[0],
+            **kwargs,
+        )
+        tool_names = self.task_descriptions(self._prompt_tasks(query))
+        branches = [
+            asyncio.ensure_future(
+                self._abranch(index, query, prompt, tool_names, kwargs)
+            )
+            for index in range(self.strategy_branches)
+        ]
+        best, best_score, scores = None, -1.0, []
+        error, early_stop = None, False
+        try:
+            for branch in asyncio.as_completed(branches):
+                try:
+                    strategy, score = await branch
+                except Exception as e:
+                    error = e
+                    record(
+                        "strategy_branch_failed",
+                        logging.WARNING,
+                        error=repr(e),
+                    )
+                    continue
+                scores.append(score)
+                if score > best_score:
+                    best, best_score = strategy, score
+                if score >= self.branch_early_stop_score:
+                    early_stop = True
+                    break
+        finally:
+            for branch in branches:
+                branch.cancel()
+            await asyncio.gather(*branches, return_exceptions=True)
+        if best is None:
+            raise error
+        record(
+            "strategy_branches",
+            branches=self.strategy_branches,
+            scores=scores,
+            best_score=best_score,
+            early_stop=early_stop,
+        )
+        span = current_span()
+        if span is not None:
+            span.set_attribute("strategy_branches", len(scores))
+            span.set_attribute("strategy_score", best_score)
+        return best
+
+    def plan_strategy(  # get only strategy
+        self,
+        query: str,
+        history: str = "",
+        meta: str = "",
+        previous_actions: List[str] = None,
+        use_history: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        """
+        get the strategy. The strategy of a similar past query is reused if it is in **strategy_cache**.
+        """
+        cacheable = self._strategy_cache_usable(
+            meta, history, previous_actions, use_history
+        )
+        if cacheable:
+            strategy = self._cached_strategy(query)
+            if strategy is not None:
+                return strategy
+        if self.strategy_branches > 1:
+            strategy = run_sync(self._abranch_strategy(
+                query, history, meta, previous_actions, use_history, **kwargs
+            ))
+        else:
+            prompt = self._strategy_prompt(
+                query, history, meta, previous_actions, use_history, **kwargs
+            )
+            kwargs["stop"] = self._stop
+            kwargs['repetition_penalty'] = 1.2
+            llm, kwargs = self._profiled(
+                "strategy", self._planner_model, kwargs
+            )
+            response = llm.generate(query=prompt, **kwargs)
+            response = self._cut_at_stop(response)
+
+            strategy = "Decision:\n" + response.split("Decision:")[-1]
+        if cacheable:
+            self._cache_strategy(query, strategy)
+        return strategy
+
+    async def aplan_strategy(
+        self,
+        query: str,
+        history: str = "",
+        meta: str = "",
+        previous_actions: List[str] = None,
+        use_history: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Async version of **plan_strategy**.
+        """
+        cacheable = self._strategy_cache_usable(
+            meta, history, previous_actions, use_history
+        )
+        if cacheable:
+            strategy = self._cached_strategy(query)
+            if strategy is not None:
+                return strategy
+        if self.strategy_branches > 1:
+            strategy = await self._abranch_strategy(
+                query, history, meta, previous_actions, use_history, **kwargs
+            )
+        else:
+            prompt = self._strategy_prompt(
+                query, history, meta, previous_actions, use_history, **kwargs
+            )
+            kwargs["stop"] = self._stop
+            kwargs['repetition_penalty'] = 1.2
+            llm, kwargs = self._profiled(
+                "strategy", self._planner_model, kwargs
+            )
+            response = await llm.agenerate(query=prompt, **kwargs)
+            response = self._cut_at_stop(response)
+
+            strategy = "Decision:\n" + response.split("Decision:")[-1]
+        if cacheable:
+            self._cache_strategy(query, strategy)
+        return strategy
+
+    def _evaluation_template(self, static_first: bool = False) -> str:
+        """
+        The template of the evaluation prompt. With `static_first` the tools and fixed instructions are moved before
+        the strategy and the actions, so they form a prefix that is the same in every iteration.
+        """
+        template = self._planner_prompt[1]
+        if not static_first:
+            return template
+        start = template.index("Tools:")
+        end = template.index("\nQuestion: {input}")
+        return template[start:end] + template[:start] + template[end:]
+
+    def _evaluation_prefix(self, query: str, strategy: Any) -> str:
+        """
+        The static beginning of the evaluation prompt with `static_first` (tools and fixed instructions). It is
+        passed as `static_prefix` to the LLMs that reuse the key/value states of prompt prefixes.
+        """
+        tasks = self._prompt_tasks(query, strategy)
+        return (
+            self._evaluation_template(static_first=True)
+            .split("{strategy}")[0]
+            .replace("{tool_names}", self.task_descriptions(tasks))
+            .replace("{TASK_EXAMPLES}", self._task_examples(tasks))
+        )
+
+    def _static_prefix_kwargs(
+        self,
+        static_first: bool,
+        query: str,
+        strategy: Any,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        if not static_first:
+            return kwargs
+        return {
+            **kwargs,
+            "static_prefix": self._evaluation_prefix(query, strategy),
+        }
+
+    def _evaluation_prompt(
+        self,
+        query,
+        strategy,
+        current_action,
+        current_action_input,
+        current_failed_actions,
+        current_failed_actions_inputs,
+        previous_inputs,
+        previous_actions: List[str] = None,
+        static_first: bool = False,
+    ) -> str:
+        current_failed_actions, current_failed_actions_inputs = (
+            ContextBuilder.dedup_attempts(
+                self._as_items(current_failed_actions),
+                self._as_items(current_failed_actions_inputs),
+            )
+        )
+        context = self._get_context_builder().build(
+            [
+                ContextSection(
+                    name="previous_actions",
+                    items=self._as_items(previous_actions),
+                ),
+                ContextSection(
+                    name="previous_inputs",
+                    items=self._as_items(previous_inputs),
+                ),
+                ContextSection(
+                    name="failed_actions", items=current_failed_actions
+                ),
+                ContextSection(
+                    name="failed_inputs",
+                    items=current_failed_actions_inputs,
+                ),
+                ContextSection(
+                    name="current_action",
+                    items=self._as_items(current_action),
+                    pinned=True,
+                ),
+                ContextSection(
+                    name="current_input",
+                    items=self._as_items(current_action_input),
+                    pinned=True,
+                ),
+            ]
+        )
+        tasks = self._prompt_tasks(query, strategy)
         prompt = (
-            self._planner_prompt[1]
+            self._evaluation_template(static_first)
             .replace("{input}", query)
             .replace(
                 "{strategy}",
                 "Decision:\n" + self._safe_join(strategy),
             ).replace(
-                "{previous_actions}", self._safe_join(previous_actions) + '\n' + "previous inputs: \n" + self._safe_join(previous_inputs)
+                "{previous_actions}", context["previous_actions"] + '\n' + "previous inputs: \n" + context["previous_inputs"]
             ).replace(
-                "{current_attempt_result}", self._safe_join(current_action) + '\n' + "current input: \n" + self._safe_join(current_action_input)
+                "{current_attempt_result}", context["current_action"] + '\n' + "current input: \n" + context["current_input"]
             ).replace(
-                "{previous_step_failed_actions}", self._safe_join(current_failed_actions) + '\n' + "failed inputs: \n" + self._safe_join(current_failed_actions_inputs)
+                "{previous_step_failed_actions}", context["failed_actions"] + '\n' + "failed inputs: \n" + context["failed_inputs"]
             ).replace(
-                "{tool_names}", self.task_descriptions()
+                "{tool_names}", self.task_descriptions(tasks)
             ).replace(
-                "{TASK_EXAMPLES}", "".join(
-                    task.using_example + "\n"
-                    for task in self.available_tasks if hasattr(task, 'using_example')
-                )
+                "{TASK_EXAMPLES}", self._task_examples(tasks)
             )
         )
-        # print("prompt2\n\n", prompt)
-        with open("./log/logger.txt", mode="a", encoding="utf-8") as f:
-            f.write("\n====================prompt start===========================\n")
-            f.write(prompt)
-            f.write("\n====================prompt end===========================\n")
-            
-        kwargs["stop"] = self._stop
-        response = self._planner_model.generate(
-            query=prompt, **kwargs
+        record("planner_evaluation_prompt", logging.DEBUG, prompt=prompt)
+        return prompt
+
+    def _evaluation_response(self, response: str) -> str:
+        response = self._cut_at_stop(response)
+        record(
+            "planner_evaluation_response", logging.DEBUG, response=response
+        )
+        return response
+
+    def _profiled(
+        self, name: str, llm: BaseLLM, kwargs: Dict[str, Any]
+    ) -> Tuple[BaseLLM, Dict[str, Any]]:
+        if self.generation_profiles is None:
+            return llm, kwargs
+        return self.generation_profiles.resolve(name, llm, kwargs)
+
+    def _evaluation_problem(self, response: str) -> Optional[str]:
+        """
+        Check an evaluation response the way the orchestrator parses it.
+
+        Return:
+            Optional[str]: Why the response cannot be used or is not trusted, or None if it is fine.
+        """
+        cleaned = re.sub(
+            r"\[(STRATEGY_CHANGE|STEP_SUCCESS|CONTENT)]\s*[-:]\s*",
+            lambda m: f"[{m.group(1)}] ",
+            response,
+            flags=re.IGNORECASE,
         )
+        flags = {}
+        for tag in ("STRATEGY_CHANGE", "STEP_SUCCESS"):
+            match = re.search(
+                rf"\[{tag}]\s*(\S*)", cleaned, re.IGNORECASE
+            )
+            if match is None:
+                return "missing_tag"
+            value = match.group(1).lower()
+            if value not in ("yes", "no"):
+                return "not_yes_no"
+            flags[tag] = value == "yes"
+        # the step cannot succeed with a strategy change
+        if flags["STRATEGY_CHANGE"] and flags["STEP_SUCCESS"]:
+            return "contradiction"
+        if flags["STRATEGY_CHANGE"] or flags["STEP_SUCCESS"]:
+            # the content is a new strategy or empty
+            return None
+        # the step continues with the code of the next calls
+        content = re.search(r"\[CONTENT]", cleaned, re.IGNORECASE)
+        if content is None or not re.search(
+            r"```python", cleaned[content.end() :], re.IGNORECASE
+        ):
+            return "missing_code"
+        return None
 
-        index = min([response.find(text) for text in self._stop])
-        response = response[0:index]
-        with open("./log/logger.txt", mode="a", encoding="utf-8") as f:
-            f.write("\n====================response start===========================\n")
-            f.write(response)
-            f.write("\n====================response end===========================\n")
+    def _evaluation_escalation(
+        self, profile: str, response: str
+    ) -> Optional[str]:
+        """
+        Return the profile to evaluate again with when the response of `profile` cannot be used, or None.
+        """
+        if self.generation_profiles is None:
+            return None
+        current = self.generation_profiles.get(profile)
+        if current is None or current.escalate_to is None:
+            return None
+        problem = self._evaluation_problem(response)
+        if problem is None:
+            return None
+        record(
+            "evaluation_escalated",
+            profile=profile,
+            escalate_to=current.escalate_to,
+            problem=problem,
+        )
+        span = current_span()
+        if span is not None:
+            span.set_attribute("evaluation_escalated", problem)
+        return current.escalate_to
+
+    def plan_evaluation(
+        self,
+        query,
+        strategy,
+        current_action,
+        current_action_input,
+        current_failed_actions,
+        current_failed_actions_inputs,
+        previous_inputs,
+        previous_actions: List[str] = None,
+        **kwargs: Any
+    ):
+        arguments = (
+            query,
+            strategy,
+            current_action,
+            current_action_input,
+            current_failed_actions,
+            current_failed_actions_inputs,
+            previous_inputs,
+            previous_actions,
+        )
+        kwargs["stop"] = self._stop
+        # the prompt of each order, built when an LLM needs it
+        prompts = {}
+        profile = "evaluation"
+        tried = set()
+        while profile is not None and profile not in tried:
+            tried.add(profile)
+            llm, profile_kwargs = self._profiled(
+                profile, self._planner_model, kwargs
+            )
+            static_first = llm.supports_static_prefix()
+            if static_first not in prompts:
+                prompts[static_first] = self._evaluation_prompt(
+                    *arguments, static_first=static_first
+                )
+            response = self._evaluation_response(
+                llm.generate(
+                    query=prompts[static_first],
+                    **self._static_prefix_kwargs(
+                        static_first, query, strategy, profile_kwargs
+                    ),
+                )
+            )
+            profile = self._evaluation_escalation(profile, response)
         return response
         # actions = self.parse(response)  # parse if good
         # print("actions", actions)
         # return actions
-        
+
+    async def aplan_evaluation(
+        self,
+        query,
+        strategy,
+        current_action,
+        current_action_input,
+        current_failed_actions,
+        current_failed_actions_inputs,
+        previous_inputs,
+        previous_actions: List[str] = None,
+        **kwargs: Any
+    ):
+        """
+        Async version of **plan_evaluation**.
+        """
+        arguments = (
+            query,
+            strategy,
+            current_action,
+            current_action_input,
+            current_failed_actions,
+            current_failed_actions_inputs,
+            previous_inputs,
+            previous_actions,
+        )
+        kwargs["stop"] = self._stop
+        prompts = {}
+        profile = "evaluation"
+        tried = set()
+        while profile is not None and profile not in tried:
+            tried.add(profile)
+            llm, profile_kwargs = self._profiled(
+                profile, self._planner_model, kwargs
+            )
+            # a lazy LLM is loaded to tell
+            static_first = await asyncio.to_thread(
+                llm.supports_static_prefix
+            )
+            if static_first not in prompts:
+                # older actions may be summarized by the LLM while building the prompt
+                prompts[static_first] = await asyncio.to_thread(
+                    self._evaluation_prompt,
+                    *arguments,
+                    static_first=static_first,
+                )
+            response = self._evaluation_response(
+                await llm.agenerate(
+                    query=prompts[static_first],
+                    **self._static_prefix_kwargs(
+                        static_first, query, strategy, profile_kwargs
+                    ),
+                )
+            )
+            profile = self._evaluation_escalation(profile, response)
+        return response
+
 
     def parse(
         self,
@@ -462,6 +1045,21 @@ CHA:
     #     return code_line
 
 
+    def _as_items(self, data: Any) -> List[Any]:
+        if data is None:
+            return []
+        if isinstance(data, list):
+            return data
+        return [data]
+
+    def _get_context_builder(self) -> ContextBuilder:
+        if self.context_builder is None:
+            self.context_builder = ContextBuilder(
+                llm=self._planner_model,
+                token_budget=self.context_token_budget,
+            )
+        return self.context_builder
+
     def _safe_join(self, data: Any) -> str:
         """Safely joins elements into a string, handling None, lists, and other types."""
         if data is None:
@@ -1,6 +1,8 @@
 from typing import Any
 
 from openCHA.llms import BaseLLM
+from openCHA.llms import CachedLLM
+from openCHA.llms import initialize_routed_llm
 from openCHA.llms import LLM_TO_CLASS
 from openCHA.llms import LLMType
 from openCHA.response_generators import (
@@ -26,7 +28,9 @@ def initialize_response_generator(
         llm (str): Type of language model type to be used.
         response_generator (str): Type of response generator to be initialized.
         prefix (str): Prefix to be added to generated responses.
-        **kwargs (Any): Additional keyword arguments.
+        **kwargs (Any): Additional keyword arguments. If `llm_cache` (LLMResponseCache) is provided, the LLM is wrapped
+            with a **CachedLLM** using it. If `llm_routing` (Dict[str, RoutingPolicy]) has a `response_generator` policy, the LLM
+            is a **RouterLLM** over `llm` and the policy's fallbacks.
     Return:
         BaseResponseGenerator: Initialized instance of the response generator.
 
@@ -56,8 +60,15 @@ def initialize_response_generator(
     response_generator_cls = RESPONSE_GENERATOR_TO_CLASS[
         response_generator
     ]
-    llm_model = LLM_TO_CLASS[llm]()
+    # shared with the other components and loaded on first use
+    llm_model = initialize_routed_llm(
+        llm, kwargs.get("llm_routing", {}).get("response_generator")
+    )
+    if kwargs.get("llm_cache") is not None:
+        llm_model = CachedLLM(llm=llm_model, cache=kwargs["llm_cache"])
     response_generator = response_generator_cls(
-        llm_model=llm_model, prefix=prefix
+        llm_model=llm_model,
+        prefix=prefix,
+        generation_profiles=kwargs.get("generation_profiles"),
     )
     return response_generator
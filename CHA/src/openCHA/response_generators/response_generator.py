@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any
+from typing import AsyncIterator
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 
 from openCHA.llms import BaseLLM
+from openCHA.llms import GenerationProfiles
+from openCHA.llms import llm_priority
+from openCHA.llms import Priority
 from pydantic import BaseModel
 
 
@@ -19,6 +27,8 @@ class BaseResponseGenerator(BaseModel):
     prefix: str = ""
     summarize_prompt: bool = True
     max_tokens_allowed: int = 10000
+    # models and settings of the final answer and summarization calls. None uses the LLM as is
+    generation_profiles: Optional[GenerationProfiles] = None
 
     class Config:
         """Configuration for this pydantic object."""
@@ -33,6 +43,15 @@ class BaseResponseGenerator(BaseModel):
     def _response_generator_model(self):
         return self.llm_model
 
+    def _profiled(
+        self, name: str, kwargs: Dict[str, Any]
+    ) -> Tuple[BaseLLM, Dict[str, Any]]:
+        if self.generation_profiles is None:
+            return self._response_generator_model, kwargs
+        return self.generation_profiles.resolve(
+            name, self._response_generator_model, kwargs
+        )
+
     @property
     def _generator_prompt(self):
         return (
@@ -73,10 +92,14 @@ class BaseResponseGenerator(BaseModel):
         Return:
             chunks(List): List of string variables
         """
-        # 1 token ~= 4 chars in English
+        # size the chunks with the measured characters per token of the text
+        tokens = max(
+            self._response_generator_model.count_tokens(input_text), 1
+        )
+        size = max(int(max_tokens * len(input_text) / tokens), 1)
         chunks = [
-            input_text[i : i + max_tokens * 4]
-            for i in range(0, len(input_text), max_tokens * 4)
+            input_text[i : i + size]
+            for i in range(0, len(input_text), size)
         ]
         return chunks
 
@@ -88,14 +111,55 @@ class BaseResponseGenerator(BaseModel):
         kwargs["max_tokens"] = min(
             2000, int(self.max_tokens_allowed / len(chunks))
         )
+        llm, kwargs = self._profiled("summarization", kwargs)
         for chunk in chunks:
             prompt = self._shorten_prompt.replace("{chunk}", chunk)
-            chunk_summary = self._response_generator_model.generate(
-                query=prompt, **kwargs
-            )
+            with llm_priority(Priority.SUMMARY):
+                chunk_summary = llm.generate(query=prompt, **kwargs)
             thinker += chunk_summary + " "
         return thinker
 
+    async def asummarize_thinker_response(self, thinker, **kwargs):
+        chunks = self.divide_text_into_chunks(
+            input_text=thinker, max_tokens=self.max_tokens_allowed
+        )
+        kwargs["max_tokens"] = min(
+            2000, int(self.max_tokens_allowed / len(chunks))
+        )
+        llm, kwargs = self._profiled("summarization", kwargs)
+        with llm_priority(Priority.SUMMARY):
+            # the gathered tasks copy the priority when they are created
+            chunk_summaries = await asyncio.gather(
+                *[
+                    llm.agenerate(
+                        query=self._shorten_prompt.replace("{chunk}", chunk),
+                        **kwargs,
+                    )
+                    for chunk in chunks
+                ]
+            )
+        return "".join(summary + " " for summary in chunk_summaries)
+
+    def _prepare_prompt(
+        self, prefix: str = "", query: str = "", thinker: str = ""
+    ) -> str:
+        return (
+            self._generator_prompt.replace("{query}", query)
+            .replace("{thinker}", thinker)
+            .replace("{prefix}", prefix)
+        )
+
+    async def _aprepare_prompt(
+        self, prefix: str = "", query: str = "", thinker: str = ""
+    ) -> str:
+        if (
+            self.summarize_prompt
+            and self._response_generator_model.count_tokens(thinker)
+            > self.max_tokens_allowed
+        ):
+            thinker = await self.asummarize_thinker_response(thinker)
+        return self._prepare_prompt(prefix, query, thinker)
+
     def generate(
         self,
         prefix: str = "",
@@ -127,17 +191,72 @@ class BaseResponseGenerator(BaseModel):
 
         if (
             self.summarize_prompt
-            and len(thinker) / 4 > self.max_tokens_allowed
+            and self._response_generator_model.count_tokens(thinker)
+            > self.max_tokens_allowed
         ):
             thinker = self.summarize_thinker_response(thinker)
 
-        prompt = (
-            self._generator_prompt.replace("{query}", query)
-            .replace("{thinker}", thinker)
-            .replace("{prefix}", prefix)
-        )
+        prompt = self._prepare_prompt(prefix, query, thinker)
         kwargs["max_tokens"] = 2000
-        response = self._response_generator_model.generate(
-            query=prompt, **kwargs
-        )
+        llm, kwargs = self._profiled("final_answer", kwargs)
+        with llm_priority(Priority.FINAL_ANSWER):
+            response = llm.generate(
+                query=prompt, **kwargs
+            )
+        return response
+
+    async def agenerate(
+        self,
+        prefix: str = "",
+        query: str = "",
+        thinker: str = "",
+        **kwargs: Any,
+    ) -> str:
+        """
+        Async version of **generate**. The chunk summaries of a long thinker are generated concurrently.
+
+        Args:
+            prefix (str): Prefix to be added to the response.
+            query (str): User's input query.
+            thinker (str): Thinker's (Task Planner) generated answer.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            str: Generated response.
+        """
+
+        prompt = await self._aprepare_prompt(prefix, query, thinker)
+        kwargs["max_tokens"] = 2000
+        llm, kwargs = self._profiled("final_answer", kwargs)
+        with llm_priority(Priority.FINAL_ANSWER):
+            response = await llm.agenerate(
+                query=prompt, **kwargs
+            )
         return response
+
+    async def agenerate_stream(
+        self,
+        prefix: str = "",
+        query: str = "",
+        thinker: str = "",
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming version of **agenerate**. The chunks of the response are yielded as soon as the LLM generates them.
+
+        Args:
+            prefix (str): Prefix to be added to the response.
+            query (str): User's input query.
+            thinker (str): Thinker's (Task Planner) generated answer.
+            **kwargs (Any): Additional keyword arguments.
+        Return:
+            AsyncIterator[str]: The chunks of the generated response.
+        """
+
+        prompt = await self._aprepare_prompt(prefix, query, thinker)
+        kwargs["max_tokens"] = 2000
+        llm, kwargs = self._profiled("final_answer", kwargs)
+        with llm_priority(Priority.FINAL_ANSWER):
+            async for chunk in llm.agenerate_stream(
+                query=prompt, **kwargs
+            ):
+                yield chunk
@@ -4,6 +4,7 @@ Affect - Get physical activity data
 import os
 from typing import Any
 from typing import List
+from typing import Optional
 
 from openCHA.tasks.affect import Affect
 from openCHA.utils import get_from_env
@@ -41,6 +42,9 @@ class ActivityGet(Affect):
     # False if the output should directly passed back to the planner.
     # True if it should be stored in datapipe
     output_type: bool = True
+    cacheable: bool = True
+    cache_ttl: Optional[float] = 60 * 60
+    speculative: bool = True
     #
     file_name: str = "activity.csv"
     device_name: str = "oura"
@@ -1,6 +1,7 @@
 import os
 from typing import Any
 from typing import List
+from typing import Optional
 
 from openCHA.tasks.affect import Affect
 from openCHA.utils import get_from_env
@@ -37,6 +38,9 @@ class PPGGet(Affect):
     # False if the output should directly passed back to the planner.
     # True if it should be stored in datapipe
     output_type: bool = True
+    cacheable: bool = True
+    cache_ttl: Optional[float] = 60 * 60
+    speculative: bool = True
     #
     file_name: str = "ppg.csv"
     device_name: str = "samsung"
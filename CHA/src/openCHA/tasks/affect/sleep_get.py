@@ -1,6 +1,7 @@
 import os
 from typing import Any
 from typing import List
+from typing import Optional
 
 from openCHA.tasks.affect import Affect
 from openCHA.utils import get_from_env
@@ -49,6 +50,9 @@ class SleepGet(Affect):
     # False if the output should directly passed back to the planner.
     # True if it should be stored in datapipe
     output_type: bool = True
+    cacheable: bool = True
+    cache_ttl: Optional[float] = 60 * 60
+    speculative: bool = True
     #
     file_name: str = "sleep.csv"
     device_name: str = "oura"
@@ -23,6 +23,7 @@ class AskUser(BaseTask):
     outputs: List[str] = []
     output_type: bool = False
     return_direct: bool = True
+    cacheable: bool = False
 
     def _execute(
         self,
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import os
 from openCHA.tasks import BaseTask
@@ -30,6 +30,9 @@ class ParticipantInfoLookup(BaseTask):
     using_example: str = (
         "result = self.execute_task('participant_information_lookup', ['001'])"
     )
+    cacheable: bool = True
+    cache_ttl: Optional[float] = 24 * 60 * 60
+    speculative: bool = True
 
     # ---- Internal attributes ----------------------------------------------------------
     csv_path: str = "/home/foodagent/code/Agent4Health/data/participant_information.csv"
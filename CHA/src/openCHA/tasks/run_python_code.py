@@ -3,8 +3,10 @@ import traceback
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 
 from openCHA.llms import BaseLLM
+from openCHA.llms import GenerationProfiles
 from openCHA.llms import initialize_llm
 from openCHA.llms import LLMType
 from openCHA.tasks import BaseTask
@@ -36,6 +38,8 @@ class RunPythonCode(BaseTask):
     output_type: bool = False
     llm_model: BaseLLM = None
     max_retrie: int = 3
+    # the `codegen` profile is used for the code generation if set
+    generation_profiles: Optional[GenerationProfiles] = None
 
     @model_validator(mode="before")
     def validate_environment(cls, values: Dict) -> Dict:
@@ -51,7 +55,7 @@ class RunPythonCode(BaseTask):
 
         """
 
-        values["llm_model"] = initialize_llm(LLMType.OPENAI)
+        values["llm_model"] = initialize_llm(LLMType.OPENAI, lazy=True)
         return values
 
     def _generate_prompt(self, previous_attempts, inputs):
@@ -95,8 +99,12 @@ class RunPythonCode(BaseTask):
                     previous_attempts, inputs
                 )
 
-                kwargs = {"max_tokens": 1000}
-                code = self.llm_model.generate(prompt, **kwargs)
+                llm, kwargs = self.llm_model, {"max_tokens": 1000}
+                if self.generation_profiles is not None:
+                    llm, kwargs = self.generation_profiles.resolve(
+                        "codegen", llm, kwargs
+                    )
+                code = llm.generate(prompt, **kwargs)
                 previous_attempts = f"\n{code}"
                 pattern = r"```python\n(.*?)```"
                 code = re.search(pattern, code, re.DOTALL).group(1)
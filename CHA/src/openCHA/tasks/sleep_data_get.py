@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import os
 
 from openCHA.tasks import BaseTask
@@ -30,6 +30,9 @@ class SleepDataLookup(BaseTask):
     using_example: str = (
         "result = self.execute_task('sleep_data_lookup', ['001'])"
     )
+    cacheable: bool = True
+    cache_ttl: Optional[float] = 60 * 60
+    speculative: bool = True
 
     # ---------------------------------------------------------------------
     # Configuration & public fields
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 from abc import abstractmethod
 from typing import Any
 from typing import List
+from typing import Optional
 
 from openCHA.datapipes import DataPipe
 from pydantic import BaseModel
@@ -37,6 +39,10 @@ class BaseTask(BaseModel):
         return_direct:  This indicates if this task should completely interrupt the planning process or not.
                         This is needed in cases like when you want to ask a question from user and no further
                         planning is needed until the user gives the proper answer (look at ask_user task)
+        cacheable:      This indicates if the task result can be cached by the **Orchestrator** and reused for the same inputs.
+        cache_ttl:      Time to live in seconds of the cached result. If None, the default of the task cache is used.
+        speculative:    This indicates if the orchestrator can speculate the result of this task from the task cache.
+                        Only short, deterministic and cacheable tasks (like CSV lookups) should set it.
     """
 
     name: str
@@ -52,6 +58,14 @@ class BaseTask(BaseModel):
     # False if planner should continue. True if after this task the planning should be
     # on pause or stop. examples are when you have a task that asks user to provide more information
     return_direct: bool = False
+    # True if the result only depends on the inputs and can be reused by the orchestrator's task cache.
+    # Tasks with side effects or that interact with the user should stay False.
+    cacheable: bool = False
+    # Time to live of the cached result in seconds. None uses the default of the task cache.
+    cache_ttl: Optional[float] = None
+    # True if the task is short and deterministic, so the orchestrator can start evaluating the next step with
+    # its previously cached result while the task is running (see Orchestrator.speculative).
+    speculative: bool = False
 
     class Config:
         """Configuration for this pydantic object."""
@@ -199,6 +213,19 @@ class BaseTask(BaseModel):
         result = self._execute(inputs)
         return self._post_execute(result)
 
+    async def aexecute(self, input_args: List[str]) -> str:
+        """
+            The async version of **execute** called by **Orchestrator.arun**. By default it runs **execute** in a worker thread
+            so the tasks do not block the event loop. Tasks that call async services can override it.
+
+        Args:
+            input_args (str): Input string provided by planner.
+        Return:
+            str: The final result of the task execution.
+
+        """
+        return await asyncio.to_thread(self.execute, input_args)
+
     def get_dict(self) -> str:
         """
             Generate a dictionary-like representation of the task.
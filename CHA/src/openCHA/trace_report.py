@@ -0,0 +1,132 @@
+"""
+Summarize the latency of the traced stages (see :mod:`openCHA.tracing`) across many runs::
+
+    python -m openCHA.trace_report ./log/traces.jsonl [--group-by model]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+
+def _read_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "resourceSpans" not in entry:
+                spans.append(entry)
+                continue
+            for resource in entry["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for otlp_span in scope.get("spans", []):
+                        spans.append(
+                            {
+                                "name": otlp_span["name"],
+                                "duration": (
+                                    int(otlp_span["endTimeUnixNano"])
+                                    - int(
+                                        otlp_span["startTimeUnixNano"]
+                                    )
+                                )
+                                / 1e9,
+                                "attributes": {
+                                    attribute["key"]: next(
+                                        iter(
+                                            attribute[
+                                                "value"
+                                            ].values()
+                                        )
+                                    )
+                                    for attribute in otlp_span.get(
+                                        "attributes", []
+                                    )
+                                },
+                            }
+                        )
+    return spans
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(
+    paths: Iterable[str], group_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+        Compute the latency statistics of each stage from exported span files.
+
+    Args:
+        paths (Iterable[str]): The span files (flat or OTLP JSON lines).
+        group_by (str): Optional attribute added to the stage name, e.g. `model` or `task`.
+    Return:
+        List[Dict[str, Any]]: count, p50, p95, mean, and total seconds of each stage, the slowest total first.
+
+    """
+    durations: Dict[str, List[float]] = {}
+    for path in paths:
+        for entry in _read_spans(path):
+            stage = entry["name"]
+            if group_by is not None:
+                value = entry.get("attributes", {}).get(group_by)
+                if value is not None:
+                    stage = f"{stage}[{value}]"
+            durations.setdefault(stage, []).append(entry["duration"])
+    rows = [
+        {
+            "stage": stage,
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "mean": sum(values) / len(values),
+            "total": sum(values),
+        }
+        for stage, values in durations.items()
+    ]
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m openCHA.trace_report",
+        description="Summarize the latency of the traced stages across runs.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["./log/traces.jsonl"],
+        help="Exported span files (flat or OTLP JSON lines).",
+    )
+    parser.add_argument(
+        "--group-by",
+        default=None,
+        help="Span attribute added to the stage name, e.g. model or task.",
+    )
+    args = parser.parse_args(argv)
+    paths = [path for path in args.paths if os.path.exists(path)]
+    rows = summarize(paths, args.group_by)
+    width = max([len(row["stage"]) for row in rows] + [5])
+    print(
+        f"{'stage':<{width}} {'count':>7} {'p50 (s)':>9} {'p95 (s)':>9} {'mean (s)':>9} {'total (s)':>10}"
+    )
+    for row in rows:
+        print(
+            f"{row['stage']:<{width}} {row['count']:>7} {row['p50']:>9.3f} {row['p95']:>9.3f} "
+            f"{row['mean']:>9.3f} {row['total']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
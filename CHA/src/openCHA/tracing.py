@@ -0,0 +1,321 @@
+"""
+Lightweight tracing of the time spent in the stages of a run.
+
+Spans are nested through a context variable, so the spans opened by the planner, the tasks, the LLMs, and the
+datapipe inside a run are children of the run's span (also across `asyncio.gather` and `asyncio.to_thread`).
+Finished spans are exported as JSON lines, either in a flat format or in the OTLP/JSON format
+(one `ExportTraceServiceRequest` per line).
+
+The stages of many runs can be summarized with::
+
+    python -m openCHA.trace_report ./log/traces.jsonl
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import contextlib
+import functools
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+from openCHA.journal import current_ids
+from openCHA.journal import Journal
+from pydantic import BaseModel
+from pydantic import Field
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "tracing_current_span", default=None
+)
+
+
+class Span(BaseModel):
+    """
+    **Description:**
+
+        A timed stage of a run. Times are in nanoseconds since the epoch.
+    """
+
+    name: str
+    trace_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    span_id: str = Field(
+        default_factory=lambda: uuid.uuid4().hex[:16]
+    )
+    parent_id: Optional[str] = None
+    start_time: int = Field(default_factory=time.time_ns)
+    end_time: Optional[int] = None
+    attributes: Dict[str, Any] = {}
+    status: str = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """The duration of the span in seconds."""
+        end_time = self.end_time or time.time_ns()
+        return (end_time - self.start_time) / 1e9
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter(BaseModel):
+    """
+    **Description:**
+
+        Writes the finished spans to a JSON lines file through the background writer of a **Journal**, so exporting
+        does not block the traced code.
+
+    Attributes:
+        path:   Path of the JSON lines file.
+        format: `jsonl` for one flat span per line, or `otlp` for the OTLP/JSON format.
+    """
+
+    path: str = "./log/traces.jsonl"
+    format: str = "jsonl"
+    writer: Optional[Journal] = None
+
+    class Config:
+        """Configuration for this pydantic object."""
+
+        arbitrary_types_allowed = True
+
+    def _writer(self) -> Journal:
+        if self.writer is None:
+            self.writer = Journal(path=self.path)
+        return self.writer
+
+    def to_otlp(self, span: Span) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "openCHA"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "openCHA.tracing"},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id
+                                    or "",
+                                    "name": span.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(
+                                        span.start_time
+                                    ),
+                                    "endTimeUnixNano": str(
+                                        span.end_time
+                                    ),
+                                    "attributes": [
+                                        {
+                                            "key": key,
+                                            "value": _otlp_value(
+                                                value
+                                            ),
+                                        }
+                                        for key, value in span.attributes.items()
+                                    ],
+                                    "status": {
+                                        "code": 2
+                                        if span.status == "error"
+                                        else 1
+                                    },
+                                }
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, span: Span):
+        if self.format == "otlp":
+            self._writer().write(self.to_otlp(span))
+        else:
+            entry = span.model_dump()
+            entry["duration"] = span.duration
+            self._writer().write(entry)
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+
+class Tracer(BaseModel):
+    """
+    **Description:**
+
+        Creates the spans and passes the finished ones to the exporter. If `enabled` is False, **span** still yields
+        a span (so the instrumented code does not need to check) but nothing is exported.
+    """
+
+    enabled: bool = True
+    exporter: SpanExporter = Field(default_factory=SpanExporter)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+            Time the code inside the context as a child of the current span.
+
+        Args:
+            name (str): The name of the stage, e.g. `planner.plan_evaluation`.
+            **attributes (Any): Attributes of the span like the model name or the task name.
+        Return:
+            Iterator[Span]: The span. More attributes can be added with **Span.set_attribute**.
+
+        """
+        parent = _current_span.get()
+        span = Span(name=name, attributes=attributes)
+        if parent is not None:
+            span.trace_id = parent.trace_id
+            span.parent_id = parent.span_id
+        else:
+            session_id, run_id = current_ids()
+            if run_id is not None:
+                span.trace_id = run_id.replace("-", "")
+            if session_id is not None:
+                span.set_attribute("session_id", session_id)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = time.time_ns()
+            if self.enabled:
+                self.exporter.export(span)
+
+
+_tracer = Tracer()
+atexit.register(lambda: _tracer.exporter.flush())
+
+
+def get_tracer() -> Tracer:
+    """
+    Return the tracer used by openCHA.
+    """
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """
+        Replace the tracer used by openCHA, e.g. to change the exporter or disable tracing.
+
+    Args:
+        tracer (Tracer): The new tracer.
+
+    """
+    global _tracer
+    _tracer.exporter.flush()
+    _tracer = tracer
+
+
+def span(name: str, **attributes: Any):
+    """
+    Open a span with the current tracer. See **Tracer.span**.
+    """
+    return _tracer.span(name, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    """
+    Return the innermost open span of the current context.
+    """
+    return _current_span.get()
+
+
+def traced(name: str, attributes=None):
+    """
+        Decorate a sync or async method to run it inside a span.
+
+    Args:
+        name (str): The name of the span.
+        attributes (Callable): Optional function receiving the arguments of the method and returning
+            the attributes of the span.
+
+    """
+
+    def decorator(method):
+        if getattr(method, "__traced__", False):
+            return method
+
+        def span_attributes(args, kwargs):
+            if attributes is None:
+                return {}
+            try:
+                return attributes(*args, **kwargs)
+            except Exception:
+                return {}
+
+        if asyncio.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **span_attributes(args, kwargs)):
+                    return await method(*args, **kwargs)
+
+            async_wrapper.__traced__ = True
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with span(name, **span_attributes(args, kwargs)):
+                return method(*args, **kwargs)
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def trace_methods(
+    cls, prefix: str, names: Iterable[str], attributes=None
+):
+    """
+        Wrap the methods that a class defines itself with **traced**. Used by the base classes (LLMs and datapipes)
+        to trace every implementation.
+
+    Args:
+        cls (type): The class.
+        prefix (str): Prefix of the span names, e.g. `llm`.
+        names (Iterable[str]): The names of the methods.
+        attributes (Callable): See **traced**.
+
+    """
+    for method_name in names:
+        method = cls.__dict__.get(method_name)
+        if method is None or getattr(
+            method, "__isabstractmethod__", False
+        ):
+            continue
+        setattr(
+            cls,
+            method_name,
+            traced(f"{prefix}.{method_name}", attributes)(method),
+        )
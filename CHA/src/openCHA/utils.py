@@ -1,10 +1,21 @@
+import asyncio
 import os
 import re
+import threading
 from typing import Any
+from typing import AsyncIterable
+from typing import Awaitable
 from typing import Dict
+from typing import Iterator
 from typing import Optional
 
 
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+_end_of_iteration = object()
+
+
 def get_from_dict_or_env(
     data: Dict[str, Any],
     key: str,
@@ -41,3 +52,62 @@ def parse_addresses(input_string: str):
         for match in re.finditer(pattern, input_string)
     ]
     return matches
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the background event loop used to run the async code paths from sync code.
+    The loop is started lazily in a daemon thread and shared by the whole process, so
+    async clients (connection pools) created on it stay valid between calls.
+    """
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="openCHA-event-loop",
+                daemon=True,
+            )
+            _loop_thread.start()
+    return _loop
+
+
+def run_sync(awaitable: Awaitable) -> Any:
+    """Run an awaitable on the background event loop and wait for its result."""
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError(
+            "run_sync can not be called from the openCHA event loop, await the async method instead."
+        )
+    return asyncio.run_coroutine_threadsafe(awaitable, loop).result()
+
+
+def iterate_sync(iterable: AsyncIterable) -> Iterator:
+    """Iterate an async iterable (e.g. a stream of tokens) on the background event loop from sync code."""
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError(
+            "iterate_sync can not be called from the openCHA event loop, iterate the async iterable instead."
+        )
+    iterator = iterable.__aiter__()
+
+    async def next_item():
+        try:
+            return await iterator.__anext__()
+        except StopAsyncIteration:
+            return _end_of_iteration
+
+    try:
+        while True:
+            item = asyncio.run_coroutine_threadsafe(
+                next_item(), loop
+            ).result()
+            if item is _end_of_iteration:
+                return
+            yield item
+    finally:
+        if hasattr(iterator, "aclose"):
+            asyncio.run_coroutine_threadsafe(
+                iterator.aclose(), loop
+            ).result()
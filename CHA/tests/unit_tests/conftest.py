@@ -1,6 +1,29 @@
 import os
 
 import pytest
+from openCHA.journal import get_journal
+from openCHA.journal import Journal
+from openCHA.journal import set_journal
+from openCHA.tracing import get_tracer
+from openCHA.tracing import set_tracer
+from openCHA.tracing import SpanExporter
+from openCHA.tracing import Tracer
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_to_tmp_path(tmp_path_factory):
+    # the runs of the tests do not write to ./log
+    directory = tmp_path_factory.mktemp("log")
+    journal, tracer = get_journal(), get_tracer()
+    set_journal(Journal(path=str(directory / "journal.jsonl")))
+    set_tracer(
+        Tracer(
+            exporter=SpanExporter(path=str(directory / "traces.jsonl"))
+        )
+    )
+    yield directory
+    set_journal(journal)
+    set_tracer(tracer)
 
 
 @pytest.fixture
@@ -0,0 +1,61 @@
+import pytest
+from llms import BaseLLM
+from llms import CachedLLM
+from llms import LLMResponseCache
+
+
+class EchoLLM(BaseLLM):
+    calls: int = 0
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        self.calls += 1
+        return f"{query} {self.calls}"
+
+
+def test_read_write_and_normalization(tmp_path):
+    backend = EchoLLM()
+    llm = CachedLLM(
+        llm=backend,
+        cache=LLMResponseCache(path=str(tmp_path / "c.db")),
+    )
+    assert llm.generate("hi", max_tokens=5) == "hi 1"
+    assert llm.generate("hi  \r\n", max_tokens=5) == "hi 1"
+    assert llm.generate("hi", max_tokens=6) == "hi 2"
+    assert backend.calls == 2
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "c.db")
+    backend = EchoLLM()
+    recorder = CachedLLM(
+        llm=backend, cache=LLMResponseCache(path=path, mode="record")
+    )
+    recorder.generate("hi")
+    assert recorder.generate("hi") == "hi 2"
+    recorder.cache.close()
+    replay = CachedLLM(
+        llm=backend, cache=LLMResponseCache(path=path, mode="replay")
+    )
+    assert replay.generate("hi") == "hi 2"
+    with pytest.raises(ValueError):
+        replay.generate("other")
+    assert backend.calls == 2
+
+
+def test_lru_eviction(tmp_path):
+    cache = LLMResponseCache(
+        path=str(tmp_path / "c.db"), max_bytes=10
+    )
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.get("a")
+    cache.put("c", "1")
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345"
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,41 @@
+from llms import BaseLLM
+from llms import cut_at_stop
+
+
+class ChunkLLM(BaseLLM):
+    chunks: list = []
+    closed: bool = False
+    consumed: int = 0
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        return "".join(self.chunks)
+
+    async def agenerate_stream(self, query, **kwargs):
+        try:
+            for chunk in self.chunks:
+                self.consumed += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def test_cut_at_stop_across_chunks():
+    chunks = ["Action: a\nWa", "it, more", " text"]
+    assert "".join(cut_at_stop(chunks, ["Wait"])) == "Action: a\n"
+    assert "".join(cut_at_stop(chunks, [])) == "".join(chunks)
+    assert "".join(cut_at_stop(["abc", "de"], ["xyz"])) == "abcde"
+
+
+def test_generate_stream_cancels_at_stop():
+    llm = ChunkLLM(chunks=["one ", "two ", "Wait", " three", " four"])
+    assert (
+        "".join(llm.generate_stream("q", stop=["Wait"])) == "one two "
+    )
+    assert llm.consumed == 3
+    assert llm.closed
@@ -0,0 +1,75 @@
+import asyncio
+
+import httpx
+from llms import AsyncRetryTransport
+from llms import configure_http_clients
+from llms import get_async_openai_client
+from llms import get_http_stats
+from llms import get_openai_client
+from llms import HTTPClientConfig
+from llms import RetryTransport
+
+
+def flaky(statuses):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return httpx.Response(status, headers={"Retry-After": "0"})
+
+    return handler, calls
+
+
+def test_retries_until_success():
+    configure_http_clients(HTTPClientConfig(base_delay=0))
+    handler, calls = flaky([429, 503, 200])
+    before = get_http_stats()["retries"]
+    client = httpx.Client(
+        transport=RetryTransport(httpx.MockTransport(handler))
+    )
+    assert client.get("https://example.com").status_code == 200
+    assert len(calls) == 3
+    stats = get_http_stats()
+    assert stats["retries"] - before == 2
+    assert stats["by_status"]["429"] >= 1
+
+
+def test_gives_up_after_max_retries():
+    configure_http_clients(
+        HTTPClientConfig(base_delay=0, max_retries=2)
+    )
+    handler, calls = flaky([500])
+
+    async def request():
+        async with httpx.AsyncClient(
+            transport=AsyncRetryTransport(
+                httpx.MockTransport(handler)
+            )
+        ) as client:
+            return await client.get("https://example.com")
+
+    assert asyncio.run(request()).status_code == 500
+    assert len(calls) == 3
+
+
+def test_retry_after_is_honored():
+    config = HTTPClientConfig(max_delay=5)
+    response = httpx.Response(429, headers={"Retry-After": "3"})
+    assert config.retry_delay(0, response) == 3
+    response = httpx.Response(429, headers={"Retry-After": "120"})
+    assert config.retry_delay(0, response) == 5
+
+
+def test_clients_are_shared():
+    configure_http_clients(HTTPClientConfig())
+    assert get_openai_client("key") is get_openai_client("key")
+    assert get_openai_client("key") is not get_openai_client("other")
+
+    async def clients():
+        return get_async_openai_client(
+            "key"
+        ), get_async_openai_client("key")
+
+    first, second = asyncio.run(clients())
+    assert first is second
@@ -1,10 +1,14 @@
 import os
+from typing import ClassVar
 from unittest.mock import MagicMock
 
 import pytest
+from llms import BaseLLM
+from llms import clear_llm_registry
 from llms import initialize_llm
 from llms import LLM_TO_CLASS
 from llms import LLMType
+from llms import prewarm_llms
 
 
 def test_initialize_llm_valid_type():
@@ -36,3 +40,47 @@ def test_initialize_llm_with_mock():
                 {"unknown_type": mocked_llm_class},
             )
             initialize_llm(llm=llm_type)
+
+
+class CountingLLM(BaseLLM):
+    created: ClassVar[int] = 0
+    name: str = ""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        CountingLLM.created += 1
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        return f"{self.name}: {query}"
+
+
+def test_initialize_llm_shares_and_loads_lazily(monkeypatch):
+    monkeypatch.setitem(LLM_TO_CLASS, "counting", CountingLLM)
+    clear_llm_registry()
+    CountingLLM.created = 0
+    planner_llm = initialize_llm("counting", lazy=True, name="a")
+    generator_llm = initialize_llm("counting", lazy=True, name="a")
+    assert planner_llm is generator_llm
+    assert CountingLLM.created == 0
+    assert planner_llm.generate("hi") == "a: hi"
+    assert planner_llm.name == "a"
+    assert initialize_llm("counting", name="a") is planner_llm.load()
+    initialize_llm("counting", name="b")
+    assert CountingLLM.created == 2
+    clear_llm_registry()
+
+
+def test_prewarm_llms(monkeypatch):
+    monkeypatch.setitem(LLM_TO_CLASS, "counting", CountingLLM)
+    clear_llm_registry()
+    llm = initialize_llm("counting", lazy=True)
+    for thread in prewarm_llms():
+        thread.join()
+    assert llm.loaded
+    clear_llm_registry()
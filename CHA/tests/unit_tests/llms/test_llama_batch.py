@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace
+
+from llms import LlamaBatchScheduler
+
+
+class RecordingScheduler(LlamaBatchScheduler):
+    batches: list = []
+
+    def _generate(self, batch):
+        self.batches.append([request.prompt for request in batch])
+        return [request.prompt.upper() for request in batch], len(
+            batch
+        )
+
+
+def test_concurrent_requests_share_a_batch():
+    scheduler = RecordingScheduler(
+        model=None, tokenizer=None, batch_window=0.2, batches=[]
+    )
+    gate = threading.Event()
+    futures = []
+
+    def submit(prompt):
+        gate.wait()
+        futures.append(scheduler.submit(prompt, max_new_tokens=4))
+
+    threads = [
+        threading.Thread(target=submit, args=(prompt,))
+        for prompt in ("a", "b", "c")
+    ]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    results = sorted(future.result(timeout=5) for future in futures)
+    assert results == ["A", "B", "C"]
+    assert len(scheduler.batches) == 1
+
+
+def test_sampling_parameters_are_not_mixed():
+    scheduler = RecordingScheduler(
+        model=None, tokenizer=None, batch_window=0.2, batches=[]
+    )
+    first = scheduler.submit("a", max_new_tokens=4, temperature=0.7)
+    second = scheduler.submit("b", max_new_tokens=4, temperature=0.0)
+    third = scheduler.submit("c", max_new_tokens=8, temperature=0.7)
+    assert first.result(timeout=5) == "A"
+    assert second.result(timeout=5) == "B"
+    assert third.result(timeout=5) == "C"
+    assert sorted(scheduler.batches) == [["a", "c"], ["b"]]
+
+
+class CharTokenizer:
+    def decode(self, tokens, skip_special_tokens=True):
+        return "".join(chr(token) for token in tokens)
+
+
+def test_rows_stop_at_their_own_stop_sequences():
+    scheduler = LlamaBatchScheduler(
+        model=None, tokenizer=CharTokenizer()
+    )
+    batch = [
+        SimpleNamespace(max_new_tokens=length, stop=stop)
+        for length, stop in (
+            (100, ["Wait"]),
+            (100, []),
+            (3, ["Wait"]),
+        )
+    ]
+    tails = [
+        [ord(c) for c in text] for text in ("xWait", "xWait", "yy")
+    ]
+    assert scheduler._finished(batch, 5, tails) == [True, False, True]
+    tails = [[ord(c) for c in "Wai"]] * 3
+    assert scheduler._finished(batch, 2, tails) == [
+        False,
+        False,
+        False,
+    ]
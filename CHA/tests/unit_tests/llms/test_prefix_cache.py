@@ -0,0 +1,32 @@
+from llms import PrefixCache
+
+
+def test_hit_requires_matching_prefix_tokens():
+    cache = PrefixCache()
+    key = PrefixCache.make_key("model", "static")
+    cache.put(key, [1, 2, 3], "states", 10)
+    assert cache.get(key, [1, 2, 3, 4, 5]) == "states"
+    assert cache.get(key, [1, 2, 9, 4]) is None
+    assert cache.get(key, [1, 2, 3]) is None
+    assert (
+        cache.get(PrefixCache.make_key("other", "static"), [1])
+        is None
+    )
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "saved_tokens": 3,
+        "entries": 1,
+        "bytes": 10,
+    }
+
+
+def test_lru_eviction_under_memory_cap():
+    cache = PrefixCache(max_bytes=25)
+    cache.put("a", [1], "a", 10)
+    cache.put("b", [2], "b", 10)
+    assert cache.get("a", [1, 0]) == "a"
+    cache.put("c", [3], "c", 10)
+    assert cache.get("b", [2, 0]) is None
+    assert cache.get("a", [1, 0]) == "a"
+    assert cache.stats()["bytes"] == 20
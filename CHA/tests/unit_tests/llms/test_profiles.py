@@ -0,0 +1,89 @@
+from llms import BaseLLM
+from llms import GenerationProfile
+from llms import GenerationProfiles
+from planners import TreeOfThoughtStepPlanner
+
+VALID = (
+    "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] no\n[CONTENT]\n"
+    "```python\nprint(1)\n```"
+)
+
+
+class ModelEchoLLM(BaseLLM):
+    answers: dict = {}
+    calls: list = []
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        self.calls.append(kwargs)
+        return self.answers[kwargs.get("model_name")]
+
+
+def _planner(answers):
+    return TreeOfThoughtStepPlanner(
+        llm_model=ModelEchoLLM(answers=answers, calls=[]),
+        generation_profiles=GenerationProfiles(),
+    )
+
+
+def test_profile_overrides_only_set_values():
+    kwargs = GenerationProfile(max_tokens=10).apply(
+        {"model_name": "gpt-4o", "stop": ["x"]}
+    )
+    assert kwargs["model_name"] == "gpt-4o"
+    assert kwargs["max_tokens"] == 10
+    assert kwargs["stop"] == ["x"]
+
+
+def test_evaluation_uses_small_model_when_valid():
+    planner = _planner({"gpt-4o-mini": VALID, "gpt-4o": "big"})
+    response = planner.plan_evaluation("q", "s", "a", "i", [], [], [])
+    assert response == VALID
+    assert len(planner.llm_model.calls) == 1
+
+
+def test_evaluation_escalates_on_bad_format():
+    planner = _planner(
+        {"gpt-4o-mini": "[STEP_SUCCESS] maybe", "gpt-4o": VALID}
+    )
+    response = planner.plan_evaluation("q", "s", "a", "i", [], [], [])
+    assert response == VALID
+    assert [c["model_name"] for c in planner.llm_model.calls] == [
+        "gpt-4o-mini",
+        "gpt-4o",
+    ]
+
+
+def test_evaluation_success_and_strategy_change_do_not_escalate():
+    for answer in (
+        "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] yes\n[CONTENT]\n",
+        (
+            "[STRATEGY_CHANGE] yes\n[STEP_SUCCESS] no\n[CONTENT]\n"
+            "Use the sleep analysis first."
+        ),
+    ):
+        planner = _planner({"gpt-4o-mini": answer, "gpt-4o": VALID})
+        response = planner.plan_evaluation(
+            "q", "s", "a", "i", [], [], []
+        )
+        assert response == answer
+        assert len(planner.llm_model.calls) == 1
+
+
+def test_evaluation_escalates_on_next_step_without_code():
+    planner = _planner(
+        {
+            "gpt-4o-mini": "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] no\n"
+            "[CONTENT]\nCall the next tool.",
+            "gpt-4o": VALID,
+        }
+    )
+    assert (
+        planner.plan_evaluation("q", "s", "a", "i", [], [], [])
+        == VALID
+    )
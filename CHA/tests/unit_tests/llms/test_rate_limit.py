@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+from llms import llm_priority
+from llms import Priority
+from llms import RateLimit
+from llms import RateLimiter
+
+
+def test_unlimited_models_do_not_wait():
+    limiter = RateLimiter(
+        limits={"gpt-4o": RateLimit(tokens_per_minute=60)}
+    )
+    assert limiter.acquire("other", 10**6) == 0.0
+    assert limiter.acquire("gpt-4o", 60) < 0.1
+    assert limiter.stats()["granted"] == {"gpt-4o:interactive": 1}
+
+
+def test_higher_priority_is_served_first():
+    limiter = RateLimiter(
+        limits={"*": RateLimit(tokens_per_minute=600)}
+    )
+    limiter.acquire("m", 600)
+    order = []
+
+    def call(priority):
+        with llm_priority(priority):
+            limiter.acquire("m", 5)
+        order.append(priority)
+
+    background = threading.Thread(
+        target=call, args=(Priority.BACKGROUND,)
+    )
+    background.start()
+    time.sleep(0.05)
+    final = threading.Thread(
+        target=call, args=(Priority.FINAL_ANSWER,)
+    )
+    final.start()
+    time.sleep(0.05)
+    assert limiter.stats()["queue_depth"] == {
+        "m": {"final_answer": 1, "background": 1}
+    }
+    background.join()
+    final.join()
+    assert order == [Priority.FINAL_ANSWER, Priority.BACKGROUND]
+
+
+def test_async_calls_wait_on_the_event_loop():
+    limiter = RateLimiter(
+        limits={"*": RateLimit(tokens_per_minute=600)}
+    )
+    limiter.acquire("m", 600)
+    order = []
+
+    async def call(priority):
+        await limiter.aacquire("m", 5, priority)
+        order.append(priority)
+
+    async def main():
+        background = asyncio.ensure_future(call(Priority.BACKGROUND))
+        await asyncio.sleep(0.05)
+        final = asyncio.ensure_future(call(Priority.FINAL_ANSWER))
+        await asyncio.sleep(0.05)
+        # no worker thread is held by the waiting calls
+        assert threading.active_count() == threads
+        await asyncio.gather(background, final)
+
+    threads = threading.active_count()
+    asyncio.run(main())
+    assert order == [Priority.FINAL_ANSWER, Priority.BACKGROUND]
+
+
+def test_cancelled_async_calls_leave_the_queue():
+    limiter = RateLimiter(
+        limits={"*": RateLimit(tokens_per_minute=60)}
+    )
+    limiter.acquire("m", 60)
+
+    async def main():
+        waiter = asyncio.ensure_future(limiter.aacquire("m", 60))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(main())
+    assert limiter.stats()["queue_depth"] == {"m": {}}
+    assert limiter._wakeups == {}
+
+
+def test_threads_wake_async_calls():
+    limiter = RateLimiter(
+        limits={"*": RateLimit(tokens_per_minute=600)}
+    )
+    limiter.acquire("m", 600)
+    order = []
+
+    def thread_call():
+        limiter.acquire("m", 5, Priority.FINAL_ANSWER)
+        order.append("thread")
+
+    async def main():
+        waiter = asyncio.ensure_future(
+            limiter.aacquire("m", 5, Priority.BACKGROUND)
+        )
+        await asyncio.sleep(0.05)
+        thread = threading.Thread(target=thread_call)
+        thread.start()
+        await waiter
+        order.append("async")
+        thread.join()
+
+    started = time.monotonic()
+    asyncio.run(main())
+    assert order == ["thread", "async"]
+    # 10 tokens refill in one second
+    assert time.monotonic() - started < 1.5
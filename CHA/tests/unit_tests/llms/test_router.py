@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from llms import BaseLLM
+from llms import RouterLLM
+from llms import RoutingPolicy
+
+
+class SleepyLLM(BaseLLM):
+    delay: float = 0.0
+    fail: bool = False
+    answer: str = ""
+    cancelled: int = 0
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        return self.answer
+
+    async def agenerate(self, query, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ValueError("backend down")
+        return self.answer
+
+
+def test_hedges_slow_primary_and_cancels_it():
+    primary = SleepyLLM(delay=0.01, answer="primary")
+    secondary = SleepyLLM(delay=0.01, answer="secondary")
+    router = RouterLLM(
+        backends=[primary, secondary],
+        policy=RoutingPolicy(min_samples=3),
+    )
+
+    async def run():
+        for _ in range(3):
+            assert await router.agenerate("q") == "primary"
+        primary.delay = 5
+        return await router.agenerate("q")
+
+    assert asyncio.run(run()) == "secondary"
+    assert primary.cancelled == 1
+    assert router.latencies()["0:SleepyLLM"]["response"] < 1
+
+
+def test_falls_back_on_error():
+    router = RouterLLM(
+        backends=[
+            SleepyLLM(fail=True),
+            SleepyLLM(answer="fallback"),
+        ]
+    )
+    assert asyncio.run(router.agenerate("q")) == "fallback"
+    router.policy = RoutingPolicy(fallback=False)
+    with pytest.raises(ValueError):
+        asyncio.run(router.agenerate("q"))
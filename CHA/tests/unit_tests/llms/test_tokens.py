@@ -0,0 +1,36 @@
+from llms import TokenCounter
+from llms.tokens import encoding_name
+
+
+def test_encoding_names():
+    assert encoding_name("gpt-4o-mini") == "o200k_base"
+    assert encoding_name("gpt-4-0613") == "cl100k_base"
+    assert encoding_name("gpt-3.5-turbo") == "cl100k_base"
+    assert encoding_name("text-davinci-003") == "p50k_base"
+    assert encoding_name("davinci") == "r50k_base"
+
+
+def test_counts_are_memoized():
+    calls = []
+
+    def encode(text):
+        calls.append(text)
+        return text.split()
+
+    counter = TokenCounter(max_entries=2)
+    assert counter.count("a b c", "local", encode=encode) == 3
+    assert counter.count("a b c", "local", encode=encode) == 3
+    assert len(calls) == 1
+    counter.count("d", "local", encode=encode)
+    counter.count("e", "local", encode=encode)
+    counter.count("a b c", "local", encode=encode)
+    assert len(calls) == 4
+    assert counter.count_segments(["", "tool descriptions"]) > 0
+
+
+def test_memo_does_not_keep_the_texts():
+    counter = TokenCounter()
+    prompt = "the tool descriptions " * 100
+    counter.count(prompt, "local", encode=str.split)
+    assert counter.count(prompt, "local", encode=len) == 300
+    assert prompt not in repr(counter._counts)
@@ -0,0 +1,129 @@
+import asyncio
+from typing import Any
+from typing import AsyncIterator
+from typing import List
+
+import pytest
+from datapipes import Memory
+from llms import BaseLLM
+from orchestrator import Orchestrator
+from planners import BasePlanner
+from response_generators import BaseResponseGenerator
+from tasks import BaseTask
+
+SUCCESS = "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] yes"
+
+
+def code_reply(block: str) -> str:
+    return (
+        "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] no\n[CONTENT]\n"
+        f"```python\n{block}\n```"
+    )
+
+
+class LookupTask(BaseTask):
+    chat_name: str = "Lookup"
+    description: str = "returns its input"
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+
+    def _execute(self, inputs: List[Any]) -> str:
+        return ""
+
+    async def aexecute(self, input_args: List[Any]) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError(f"{self.name} failed")
+        return f"{self.name}({', '.join(map(str, input_args))})"
+
+
+class ScriptedPlanner(BasePlanner):
+    """
+    Returns the scripted evaluations in order, then a successful one, and records the task responses each
+    evaluation was asked about.
+    """
+
+    evaluations: List[str] = []
+    evaluated: List[List[Any]] = []
+    strategies: int = 0
+    delay: float = 0.0
+
+    def plan(self, query, history, meta, **kwargs):
+        raise NotImplementedError
+
+    def parse(self, query: str, **kwargs: Any):
+        raise NotImplementedError
+
+    async def aplan_strategy(self, query: str, **kwargs: Any) -> str:
+        self.strategies += 1
+        return "Decision: look up the data"
+
+    async def aplan_evaluation(
+        self, query: str, current_action: List[Any], **kwargs: Any
+    ) -> str:
+        # plans that fail to compile are recorded as an error message
+        evaluated = [
+            getattr(action, "task_response", action)
+            for action in current_action
+        ]
+        await asyncio.sleep(self.delay)
+        self.evaluated.append(evaluated)
+        if len(self.evaluations) == 0:
+            return SUCCESS
+        return self.evaluations.pop(0)
+
+
+class ChunkLLM(BaseLLM):
+    chunks: List[str] = ["The ", "final ", "answer."]
+    delay: float = 0.0
+    streamed: int = 0
+    queries: List[str] = []
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query: str, **kwargs: Any) -> str:
+        self.queries.append(query)
+        return "".join(self.chunks)
+
+    async def agenerate_stream(
+        self, query: str, **kwargs: Any
+    ) -> AsyncIterator[str]:
+        self.queries.append(query)
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            self.streamed += 1
+            yield chunk
+
+
+@pytest.fixture
+def make_orchestrator():
+    """
+    Build an orchestrator with stub tasks, a scripted planner that executes the code `blocks` one after the
+    other, and a response generator streaming a fixed answer.
+    """
+
+    def make(blocks=(), tasks=("lookup",), **kwargs):
+        datapipe = Memory(data={})
+        available_tasks = {
+            name: LookupTask(name=name, datapipe=datapipe)
+            for name in tasks
+        }
+        return Orchestrator(
+            planner=ScriptedPlanner(
+                evaluations=[code_reply(block) for block in blocks]
+            ),
+            response_generator=BaseResponseGenerator(
+                llm_model=ChunkLLM()
+            ),
+            available_tasks=available_tasks,
+            datapipe=datapipe,
+            **kwargs,
+        )
+
+    return make
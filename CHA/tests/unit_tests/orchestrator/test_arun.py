@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from orchestrator import SessionState
+
+
+def test_arun_executes_the_plan_and_answers(make_orchestrator):
+    orchestrator = make_orchestrator(
+        ["a = self.execute_task('lookup', ['1'])"]
+    )
+    answer = asyncio.run(orchestrator.arun("what is 1?"))
+    assert answer == "The final answer."
+    # the first evaluation has no actions, the second one sees the result
+    assert orchestrator.planner.evaluated == [[], ["lookup(1)"]]
+    llm = orchestrator.response_generator.llm_model
+    assert "lookup(1)" in llm.queries[0]
+    assert (
+        orchestrator.session.previous_actions[0].task_name == "lookup"
+    )
+
+
+def test_concurrent_runs_share_the_event_loop(make_orchestrator):
+    orchestrator = make_orchestrator(
+        ["a = self.execute_task('lookup', ['1'])"]
+    )
+    orchestrator.available_tasks["lookup"].delay = 0.2
+    orchestrator.planner.evaluations *= 3
+
+    async def serve():
+        return await asyncio.gather(
+            *[
+                orchestrator.arun(
+                    "what is 1?", session=SessionState()
+                )
+                for _ in range(3)
+            ]
+        )
+
+    started = time.monotonic()
+    answers = asyncio.run(serve())
+    assert time.monotonic() - started < 0.5
+    assert answers == ["The final answer."] * 3
+    assert orchestrator.available_tasks["lookup"].calls == 3
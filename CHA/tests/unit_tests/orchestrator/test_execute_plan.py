@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Any
+from typing import List
+
+from datapipes import Memory
+from orchestrator import Orchestrator
+from orchestrator import RunState
+from tasks import BaseTask
+
+
+class SleepTask(BaseTask):
+    chat_name: str = "SleepTask"
+    description: str = "sleeps, then returns its input"
+    delay: float = 0.2
+    running: int = 0
+    peak: int = 0
+
+    def _execute(self, inputs: List[Any]) -> str:
+        return ""
+
+    async def aexecute(self, input_args: List[Any]) -> str:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return f"{self.name}({', '.join(map(str, input_args))})"
+
+
+def make_orchestrator(names, **kwargs):
+    return Orchestrator(
+        available_tasks={
+            name: SleepTask(name=name) for name in names
+        },
+        datapipe=Memory(data={}),
+        task_cache=None,
+        **kwargs,
+    )
+
+
+PLAN = """
+a = self.execute_task('first', ['1'])
+b = self.execute_task('second', ['2'])
+c = self.execute_task('third', [a, b])
+"""
+
+
+def test_independent_calls_run_concurrently_in_code_order():
+    orchestrator = make_orchestrator(["first", "second", "third"])
+    state = RunState()
+    started = time.monotonic()
+    orchestrator.execute_plan(PLAN, state)
+    # two waves of 0.2 seconds instead of three sequential calls
+    assert time.monotonic() - started < 0.55
+    assert [action.task_name for action in state.current_actions] == [
+        "first",
+        "second",
+        "third",
+    ]
+    assert state.vars["c"] == "third(first(1), second(2))"
+
+
+def test_parallel_calls_are_capped():
+    orchestrator = make_orchestrator(
+        ["first", "second", "third"], max_parallel_tasks=2
+    )
+    plan = "\n".join(
+        f"r{i} = self.execute_task('first', ['{i}'])"
+        for i in range(5)
+    )
+    state = RunState()
+    orchestrator.execute_plan(plan, state)
+    assert orchestrator.available_tasks["first"].peak == 2
+    assert [state.vars[f"r{i}"] for i in range(5)] == [
+        f"first({i})" for i in range(5)
+    ]
+
+
+def test_input_errors_keep_the_other_calls_of_the_wave():
+    orchestrator = make_orchestrator(["first", "second"])
+    plan = """
+a = self.execute_task('first', ['1'])
+b = self.execute_task('second', [{['unhashable']: 1}])
+"""
+    state = RunState()
+    orchestrator.execute_plan(plan, state)
+    first, second = state.current_actions
+    assert first.task_response == "first(1)"
+    assert state.vars["a"] == "first(1)"
+    assert second.task_name == "second"
+    assert isinstance(second.task_response, TypeError)
@@ -0,0 +1,68 @@
+import pytest
+from orchestrator import PlanInterpreter
+
+
+@pytest.fixture
+def interpreter():
+    return PlanInterpreter()
+
+
+def test_compile_independent_calls(interpreter):
+    content = (
+        "result = self.execute_task('participant_information_lookup', ['001'])\n"
+        "result = self.execute_task('sleep_data_lookup', ['001'])\n"
+    )
+    plan = interpreter.compile(content)
+    assert plan.task_names() == [
+        "participant_information_lookup",
+        "sleep_data_lookup",
+    ]
+    assert plan.waves() == [[0, 1]]
+
+
+def test_compile_dependent_calls(interpreter):
+    content = (
+        "info = self.execute_task('participant_information_lookup', ['001'])\n"
+        "result = self.execute_task('run_python_code', [info, 'age'])\n"
+    )
+    plan = interpreter.compile(content)
+    assert plan.waves() == [[0], [1]]
+    assert plan.calls[1].depends_on == {"info": 0}
+    assert interpreter.evaluate_inputs(
+        plan.calls[1], {"info": "datapipe:key"}
+    ) == ["datapipe:key", "age"]
+
+
+def test_compile_is_cached(interpreter):
+    content = "result = self.execute_task('ask_user', ['hi'])"
+    assert interpreter.compile(content) is interpreter.compile(
+        f"\n    {content}\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "import os",
+        "for i in range(2):\n    self.execute_task('ask_user', ['hi'])",
+        "result = self.execute_task('ask_user', [open('x').read()])",
+        "result = self.execute_task(name, ['hi'])",
+        "result = self.execute_task('ask_user', 'hi')",
+        "result = os.system('ls')",
+        "result = self.execute_task('ask_user', ['hi'",
+    ],
+)
+def test_compile_rejects_other_code(interpreter, content):
+    with pytest.raises(ValueError):
+        interpreter.compile(content)
+
+
+def test_validate(interpreter):
+    plan = interpreter.compile(
+        "result = self.execute_task('ask_user', [previous])"
+    )
+    interpreter.validate(plan, ["ask_user"], {"previous": "value"})
+    with pytest.raises(ValueError):
+        interpreter.validate(plan, ["serpapi"], {"previous": "value"})
+    with pytest.raises(ValueError):
+        interpreter.validate(plan, ["ask_user"], {})
@@ -0,0 +1,71 @@
+import datetime
+
+from orchestrator import PlanInterpreter
+from orchestrator import PlanLibrary
+
+BLOCKS = [
+    "info = self.execute_task('participant_information_lookup', ['A4F_12345'])",
+    "unused = self.execute_task('google_search', ['weather'])",
+    "risk = self.execute_task('calculate_food_risk_factor', [info, '2024-05-01'])",
+]
+
+
+def test_intent_replaces_slots():
+    template, slots = PlanLibrary.intent(
+        "Risk factor for participant A4F_12345 today?",
+        today=datetime.date(2024, 5, 1),
+    )
+    assert (
+        template
+        == "risk factor for participant <participant_id> today"
+    )
+    assert slots == [
+        ("participant_id", "A4F_12345"),
+        ("date", "2024-05-01"),
+    ]
+
+
+def test_replays_with_new_slot_values(tmp_path):
+    path = str(tmp_path / "plans.json")
+    library = PlanLibrary(path=path)
+    query = "Risk factor for participant A4F_12345 on 2024-05-01"
+    assert library.add(query, BLOCKS, PlanInterpreter()) is None
+    program = PlanLibrary(path=path).lookup(
+        "risk factor for participant B7Q_99999 on 2024-06-02"
+    )
+    assert program == (
+        "info = self.execute_task('participant_information_lookup', ['B7Q_99999'])\n"
+        "risk = self.execute_task('calculate_food_risk_factor', [info, '2024-06-02'])"
+    )
+    assert library.lookup("what is the weather") is None
+
+
+def test_unfilled_dates_and_failures():
+    library = PlanLibrary(max_failures=1)
+    query = "Risk factor for participant A4F_12345"
+    assert (
+        library.add(query, BLOCKS, PlanInterpreter())
+        == "unfilled_literals"
+    )
+    assert library.add(query, BLOCKS[:1], PlanInterpreter()) is None
+    library.report(query, False)
+    assert library.lookup(query) is None
+
+
+def test_slots_missing_from_the_plan_are_not_stored():
+    library = PlanLibrary()
+    blocks = [
+        "sleep = self.execute_task('sleep_get', ['par_1', 'last week'])"
+    ]
+    assert (
+        library.add(
+            "average sleep of par_1 over the last 7 days",
+            blocks,
+            PlanInterpreter(),
+        )
+        == "unbound_slots"
+    )
+    assert (
+        library.lookup("average sleep of par_2 over the last 30 days")
+        is None
+    )
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from datapipes import Memory
+from llms import GenerationProfiles
+from orchestrator import Orchestrator
+from orchestrator import OrchestratorPool
+
+
+def test_key_covers_all_arguments():
+    pool = OrchestratorPool()
+    key = pool._key(
+        ["b", "a"], planner_llm="openai", openai_api_key="1"
+    )
+    assert key == pool._key(
+        ["a", "b"], openai_api_key="1", planner_llm="openai"
+    )
+    assert key != pool._key(
+        ["a", "b"], planner_llm="openai", openai_api_key="2"
+    )
+    assert pool._key(["a"], strategy_branches=1) != pool._key(
+        ["a"], strategy_branches=3
+    )
+
+
+def test_key_compares_models_by_value():
+    pool = OrchestratorPool()
+    profiles = GenerationProfiles()
+    key = pool._key([], generation_profiles=profiles)
+    assert key == pool._key(
+        [], generation_profiles=GenerationProfiles()
+    )
+    profiles.profiles.pop("codegen")
+    assert key != pool._key([], generation_profiles=profiles)
+
+
+def test_keys_are_initialized_concurrently(monkeypatch):
+    calls = []
+
+    def initialize(available_tasks, **kwargs):
+        calls.append(available_tasks)
+        time.sleep(0.2)
+        return Orchestrator(datapipe=Memory(data={}))
+
+    monkeypatch.setattr(Orchestrator, "initialize", initialize)
+    pool = OrchestratorPool()
+    results = {}
+
+    def get(name, tasks):
+        results[name] = pool.get(tasks)
+
+    threads = [
+        threading.Thread(target=get, args=(name, tasks))
+        for name, tasks in [("a", ["a"]), ("b", ["b"]), ("c", ["a"])]
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # the two keys do not wait for each other
+    assert time.monotonic() - started < 0.35
+    assert sorted(calls) == [["a"], ["b"]]
+    assert results["a"] is results["c"]
+    assert results["a"] is not results["b"]
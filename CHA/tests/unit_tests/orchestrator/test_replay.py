@@ -0,0 +1,41 @@
+import asyncio
+
+from orchestrator import PlanLibrary
+
+PLAN = "info = self.execute_task('lookup', ['A4F_12345'])"
+
+
+def test_successful_plans_are_replayed(make_orchestrator):
+    orchestrator = make_orchestrator(
+        [PLAN], plan_library=PlanLibrary()
+    )
+    llm = orchestrator.response_generator.llm_model
+    asyncio.run(orchestrator.arun("Sleep of participant A4F_12345"))
+    asyncio.run(orchestrator.arun("Sleep of participant B7Q_99999"))
+    # the second query is answered without the planner
+    assert orchestrator.planner.strategies == 1
+    assert orchestrator.planner.evaluated == [
+        [],
+        ["lookup(A4F_12345)"],
+    ]
+    assert orchestrator.available_tasks["lookup"].calls == 2
+    assert "lookup(B7Q_99999)" in llm.queries[1]
+
+
+def test_failed_replays_fall_back_to_the_planner(make_orchestrator):
+    library = PlanLibrary()
+    orchestrator = make_orchestrator([PLAN], plan_library=library)
+    asyncio.run(orchestrator.arun("Sleep of participant A4F_12345"))
+    orchestrator.available_tasks["lookup"].fail = True
+    asyncio.run(orchestrator.arun("Sleep of participant B7Q_99999"))
+    assert orchestrator.planner.strategies == 2
+    # the replay ran the task once before the planner took over
+    assert orchestrator.available_tasks["lookup"].calls == 2
+
+
+def test_failed_runs_are_not_stored(make_orchestrator):
+    library = PlanLibrary()
+    orchestrator = make_orchestrator([PLAN], plan_library=library)
+    orchestrator.available_tasks["lookup"].fail = True
+    asyncio.run(orchestrator.arun("Sleep of participant A4F_12345"))
+    assert library.lookup("Sleep of participant B7Q_99999") is None
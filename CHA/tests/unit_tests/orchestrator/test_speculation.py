@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+PLAN = "a = self.execute_task('lookup', ['1'])"
+
+
+def make_speculative(make_orchestrator, cached):
+    orchestrator = make_orchestrator([PLAN], speculative=True)
+    task = orchestrator.available_tasks["lookup"]
+    task.cacheable = True
+    task.speculative = True
+    task.delay = 0.2
+    cache = orchestrator.task_cache
+    # an expired result is still used for the prediction
+    cache.put(
+        cache.make_key("lookup", ["1"], orchestrator.datapipe),
+        cached,
+        ttl=0.001,
+    )
+    time.sleep(0.01)
+    return orchestrator
+
+
+def test_matching_speculation_is_committed(make_orchestrator):
+    orchestrator = make_speculative(make_orchestrator, "lookup(1)")
+    orchestrator.planner.delay = 0.2
+    started = time.monotonic()
+    answer = asyncio.run(orchestrator.arun("what is 1?"))
+    # the second evaluation overlaps the task instead of following it
+    assert time.monotonic() - started < 0.55
+    assert answer == "The final answer."
+    assert orchestrator.available_tasks["lookup"].calls == 1
+    assert orchestrator.planner.evaluated == [[], ["lookup(1)"]]
+
+
+def test_wrong_speculation_is_discarded(make_orchestrator):
+    orchestrator = make_speculative(make_orchestrator, "stale")
+    asyncio.run(orchestrator.arun("what is 1?"))
+    # the guess is evaluated, then evaluated again with the real result
+    assert orchestrator.planner.evaluated == [
+        [],
+        ["stale"],
+        ["lookup(1)"],
+    ]
+    assert orchestrator.session.previous_actions[0].task_response == (
+        "lookup(1)"
+    )
+
+
+def test_no_speculation_without_cached_results(make_orchestrator):
+    orchestrator = make_orchestrator([PLAN], speculative=True)
+    task = orchestrator.available_tasks["lookup"]
+    task.cacheable = True
+    task.speculative = True
+    asyncio.run(orchestrator.arun("what is 1?"))
+    assert orchestrator.planner.evaluated == [[], ["lookup(1)"]]
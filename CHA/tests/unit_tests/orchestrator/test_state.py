@@ -0,0 +1,37 @@
+from orchestrator import Action
+from orchestrator import SessionState
+
+
+def test_new_run_is_empty():
+    session = SessionState()
+    state = session.new_run()
+    state.current_actions.append("action")
+    state.vars["result"] = "value"
+    other = session.new_run()
+    assert other.current_actions == []
+    assert other.vars == {}
+    assert other.run_id != state.run_id
+
+
+def test_finish_run_keeps_succeed_actions():
+    session = SessionState()
+    state = session.new_run()
+    action = Action(task_name="ask_user", task_inputs=["hi"])
+    state.succeed_actions.extend(
+        [action, "action initialze failed, error message: error"]
+    )
+    session.finish_run(state)
+    assert session.previous_actions == [action]
+
+
+def test_finish_run_keeps_the_most_recent_actions():
+    session = SessionState(max_previous_actions=3)
+    for i in range(5):
+        state = session.new_run()
+        state.succeed_actions.append(
+            Action(task_name="ask_user", task_inputs=[str(i)])
+        )
+        session.finish_run(state)
+    assert [
+        action.task_inputs[0] for action in session.previous_actions
+    ] == ["2", "3", "4"]
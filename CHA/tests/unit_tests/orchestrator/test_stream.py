@@ -0,0 +1,80 @@
+import asyncio
+
+from openCHA.openCHA import _stream_safe
+from openCHA.openCHA import openCHA
+from orchestrator import Orchestrator
+from orchestrator import OrchestratorPool
+
+PLAN = "a = self.execute_task('lookup', ['1'])"
+
+
+class StubPool(OrchestratorPool):
+    orchestrator: Orchestrator
+
+    def get(self, available_tasks=None, **kwargs):
+        return self.orchestrator
+
+
+def test_astream_yields_the_chunks(make_orchestrator):
+    orchestrator = make_orchestrator([PLAN])
+
+    async def consume():
+        return [chunk async for chunk in orchestrator.astream("q")]
+
+    assert asyncio.run(consume()) == ["The ", "final ", "answer."]
+    assert orchestrator.planner.evaluated == [[], ["lookup(1)"]]
+
+
+def test_astream_cancels_the_run_when_the_consumer_stops(
+    make_orchestrator,
+):
+    orchestrator = make_orchestrator([PLAN])
+    llm = orchestrator.response_generator.llm_model
+    llm.delay = 0.1
+
+    async def consume():
+        stream = orchestrator.astream("q")
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.3)
+        return first
+
+    assert asyncio.run(consume()) == "The "
+    assert llm.streamed == 1
+
+
+def test_stream_safe_holds_back_incomplete_addresses():
+    assert _stream_safe("See address:plot") == "See "
+    assert _stream_safe("See addr") == "See "
+    assert _stream_safe("See address:plot.png now") == (
+        "See address:plot.png now"
+    )
+    assert _stream_safe("Done.") == "Done."
+
+
+def test_arespond_stream_updates_the_chat(
+    make_orchestrator, monkeypatch
+):
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    monkeypatch.setenv("SEPR_API_KEY", "")
+    orchestrator = make_orchestrator([PLAN])
+    llm = orchestrator.response_generator.llm_model
+    llm.chunks = ["See ", "address:", "plot", ".png", " now."]
+    cha = openCHA(
+        orchestrator_pool=StubPool(orchestrator=orchestrator)
+    )
+
+    async def consume():
+        return [
+            history
+            async for _, history in cha.arespond_stream(
+                "q", "", "", [], False, []
+            )
+        ]
+
+    updates = asyncio.run(consume())
+    for history in updates[:4]:
+        assert history == [("q", "See ")]
+    assert updates[-1] == [("q", "See "), ("", "plot.png")]
+    # the pooled orchestrator is not kept on the shared instance
+    assert cha.orchestrator is None
@@ -0,0 +1,105 @@
+import time
+
+from datapipes import Memory
+from orchestrator import RunState
+from orchestrator import TaskResultCache
+
+
+def test_get_put_and_counters():
+    cache = TaskResultCache()
+    key = cache.make_key("sleep_data_lookup", ["001"])
+    assert cache.get(key) == (False, None)
+    cache.put(key, "result")
+    assert cache.get(key) == (True, "result")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_key_normalizes_inputs():
+    cache = TaskResultCache()
+    assert cache.make_key("task", [" 001 "]) == cache.make_key(
+        "task", ["001"]
+    )
+    assert cache.make_key("task", ["001"]) != cache.make_key(
+        "other_task", ["001"]
+    )
+
+
+def test_datapipe_keys_are_resolved_to_content():
+    datapipe = Memory(data={})
+    first = datapipe.store("same data")
+    second = datapipe.store("same data")
+    third = datapipe.store("other data")
+    cache = TaskResultCache()
+    assert cache.make_key(
+        "task", [f"datapipe:{first}"], datapipe
+    ) == cache.make_key("task", [f"datapipe:{second}"], datapipe)
+    assert cache.make_key(
+        "task", [f"datapipe:{first}"], datapipe
+    ) != cache.make_key("task", [f"datapipe:{third}"], datapipe)
+
+
+def test_ttl_expires():
+    cache = TaskResultCache()
+    cache.put("key", "result", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("key") == (False, None)
+
+
+def test_lru_eviction():
+    cache = TaskResultCache(max_entries=2, max_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.get("a")
+    cache.put("c", "1")
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "12345")
+    assert cache.get("c") == (True, "1")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_peek_returns_stale_results():
+    cache = TaskResultCache()
+    cache.put("key", "result", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.peek("key") == (False, None)
+    assert cache.peek("key", allow_stale=True) == (True, "result")
+    assert cache.stats()["hits"] == 0
+
+
+PLAN = "a = self.execute_task('lookup', ['1'])"
+
+
+def test_orchestrator_reuses_cached_results(make_orchestrator):
+    orchestrator = make_orchestrator()
+    task = orchestrator.available_tasks["lookup"]
+    task.cacheable = True
+    first, second = RunState(), RunState()
+    orchestrator.execute_plan(PLAN, first)
+    orchestrator.execute_plan(PLAN, second)
+    assert task.calls == 1
+    assert second.vars["a"] == first.vars["a"] == "lookup(1)"
+    assert second.current_actions[0].task_response == "lookup(1)"
+    assert orchestrator.task_cache.stats()["hits"] == 1
+
+
+def test_orchestrator_does_not_cache_errors(make_orchestrator):
+    orchestrator = make_orchestrator()
+    task = orchestrator.available_tasks["lookup"]
+    task.cacheable = True
+    task.fail = True
+    for _ in range(2):
+        state = RunState()
+        orchestrator.execute_plan(PLAN, state)
+        assert isinstance(
+            state.current_actions[0].task_response, ValueError
+        )
+    assert task.calls == 2
+    assert orchestrator.task_cache.stats()["entries"] == 0
+
+
+def test_uncacheable_tasks_always_run(make_orchestrator):
+    orchestrator = make_orchestrator()
+    for _ in range(2):
+        orchestrator.execute_plan(PLAN, RunState())
+    assert orchestrator.available_tasks["lookup"].calls == 2
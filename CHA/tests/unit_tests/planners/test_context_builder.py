@@ -0,0 +1,67 @@
+from planners import ContextBuilder
+from planners import ContextSection
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def generate(self, query, **kwargs):
+        self.calls += 1
+        return f"summary {self.calls}"
+
+
+def sections(count):
+    return [
+        ContextSection(
+            name="previous_actions",
+            items=[
+                f"action {i} " + "word " * 20 for i in range(count)
+            ],
+        ),
+        ContextSection(
+            name="current_action", items=["now"], pinned=True
+        ),
+    ]
+
+
+def test_fits_into_budget_verbatim():
+    builder = ContextBuilder(llm=FakeLLM(), token_budget=1000)
+    context = builder.build(sections(3))
+    assert context["previous_actions"].count("action") == 3
+    assert context["current_action"] == "now"
+    assert builder.last_report["folded_items"] == 0
+    assert builder.last_report["total"] == 3 * 22 + 1
+
+
+def test_folds_older_items_and_caches_summaries():
+    llm = FakeLLM()
+    builder = ContextBuilder(
+        llm=llm, token_budget=60, keep_recent=1, summary_tokens=5
+    )
+    context = builder.build(sections(4))
+    assert context["previous_actions"].startswith(
+        "Summary of 3 earlier item(s):\nsummary 1"
+    )
+    assert "action 3" in context["previous_actions"]
+    assert builder.last_report["folded_items"] == 3
+    builder.build(sections(4))
+    assert llm.calls == 1
+    builder.build(sections(5))
+    assert llm.calls == 2
+    assert builder.last_report["total"] <= 60
+
+
+def test_dedup_attempts():
+    actions, inputs = ContextBuilder.dedup_attempts(
+        [["error"], ["other error"], ["error"]],
+        ["code", "other code", "code"],
+    )
+    assert actions == [["other error"], ["error"]]
+    assert inputs == [
+        "other code",
+        "code\n(this attempt failed 2 times)",
+    ]
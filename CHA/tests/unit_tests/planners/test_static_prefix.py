@@ -0,0 +1,56 @@
+import asyncio
+
+from llms import BaseLLM
+from planners import TreeOfThoughtStepPlanner
+
+
+class RecordingLLM(BaseLLM):
+    static_prefix: bool = False
+    calls: list = []
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def supports_static_prefix(self):
+        return self.static_prefix
+
+    def generate(self, query, **kwargs):
+        self.calls.append((query, kwargs))
+        return "[STRATEGY_CHANGE] no\n[STEP_SUCCESS] yes"
+
+
+def evaluate(static_prefix):
+    llm = RecordingLLM(static_prefix=static_prefix, calls=[])
+    planner = TreeOfThoughtStepPlanner(llm_model=llm)
+    arguments = (
+        "How did I sleep?",
+        "Decision: look up",
+        [],
+        "",
+        [],
+        [],
+        [],
+        [],
+    )
+    planner.plan_evaluation(*arguments)
+    asyncio.run(planner.aplan_evaluation(*arguments))
+    return llm.calls
+
+
+def test_other_llms_get_the_strategy_first_without_static_prefix():
+    for prompt, kwargs in evaluate(False):
+        assert prompt.startswith("\nDecision:")
+        assert "static_prefix" not in kwargs
+
+
+def test_prefix_caching_llms_get_the_static_block_first():
+    calls = evaluate(True)
+    assert len(calls) == 2
+    for prompt, kwargs in calls:
+        assert prompt.startswith("Tools:")
+        assert prompt.startswith(kwargs["static_prefix"])
+        assert "Decision:" not in kwargs["static_prefix"]
+        assert prompt.index("Decision:") < prompt.index("Question:")
@@ -0,0 +1,65 @@
+import asyncio
+
+from llms import BaseLLM
+from planners import TreeOfThoughtStepPlanner
+
+
+class BranchLLM(BaseLLM):
+    scores: dict = {}
+    delays: dict = {}
+    cancelled: list = []
+
+    def _parse_response(self, response):
+        return response
+
+    def _prepare_prompt(self, prompt):
+        return prompt
+
+    def generate(self, query, **kwargs):
+        raise NotImplementedError
+
+    async def agenerate(self, query, **kwargs):
+        if query.startswith("Tools:"):
+            for hint, score in self.scores.items():
+                if hint in query:
+                    return f"Score: {score}"
+            return "no idea"
+        hint = next(h for h in self.scores if h in query)
+        try:
+            await asyncio.sleep(self.delays.get(hint, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(hint)
+            raise
+        return f"Decision:\n{hint}"
+
+
+def _planner(scores, delays=None, early_stop=9.0):
+    return TreeOfThoughtStepPlanner(
+        llm_model=BranchLLM(
+            scores=scores, delays=delays or {}, cancelled=[]
+        ),
+        strategy_branches=3,
+        branch_early_stop_score=early_stop,
+        strategy_cache=None,
+    )
+
+
+def test_keeps_best_scored_branch():
+    planner = _planner(
+        {"most direct": 4, "gathers all": 8, "verifies": 6},
+    )
+    strategy = planner.plan_strategy("How did I sleep?")
+    assert strategy == "Decision:\n\ngathers all"
+
+
+def test_cancels_other_branches_once_one_wins():
+    planner = _planner(
+        {"most direct": 10, "gathers all": 1, "verifies": 1},
+        delays={"gathers all": 5, "verifies": 5},
+    )
+    strategy = planner.plan_strategy("How did I sleep?")
+    assert strategy == "Decision:\n\nmost direct"
+    assert sorted(planner.llm_model.cancelled) == [
+        "gathers all",
+        "verifies",
+    ]
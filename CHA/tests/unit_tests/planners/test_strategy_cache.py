@@ -0,0 +1,57 @@
+from planners import StrategyCache
+from planners import TreeOfThoughtStepPlanner
+
+
+class Task:
+    def __init__(self, name):
+        self.name = name
+        self.description = f"{name} description"
+
+
+def test_paraphrase_reuses_strategy():
+    cache = StrategyCache()
+    signature = StrategyCache.tasks_signature([Task("sleep")])
+    cache.add(
+        "Summarize my sleep last week", "Decision: sleep", signature
+    )
+    cache.add("What is my diabetes risk", "Decision: risk", signature)
+    strategy, similarity = cache.lookup(
+        "summarize my sleep last week please", signature
+    )
+    assert strategy == "Decision: sleep"
+    assert similarity >= cache.threshold
+    assert (
+        cache.lookup("what is the weather today", signature) is None
+    )
+    assert (
+        cache.lookup("summarize my steps last week", signature)
+        is None
+    )
+
+
+def test_different_numbers_do_not_match():
+    cache = StrategyCache()
+    signature = StrategyCache.tasks_signature([Task("sleep")])
+    cache.add("my sleep in the last 7 days", "Decision: 7", signature)
+    assert (
+        cache.lookup("my sleep in the last 30 days", signature)
+        is None
+    )
+
+
+def test_changed_tasks_invalidate():
+    cache = StrategyCache()
+    cache.add(
+        "summarize my sleep",
+        "Decision: sleep",
+        StrategyCache.tasks_signature([Task("sleep")]),
+    )
+    signature = StrategyCache.tasks_signature(
+        [Task("sleep"), Task("steps")]
+    )
+    assert cache.lookup("summarize my sleep", signature) is None
+
+
+def test_planner_cache_is_opt_in():
+    field = TreeOfThoughtStepPlanner.model_fields["strategy_cache"]
+    assert field.default is None
@@ -0,0 +1,71 @@
+from planners import ToolIndex
+
+
+class Task:
+    def __init__(self, name, description, dependencies=()):
+        self.name = name
+        self.description = description
+        self.dependencies = list(dependencies)
+        self.outputs = []
+        self.output_type = False
+
+
+TASKS = [
+    Task("sleep_get", "Get the sleep data of the user"),
+    Task(
+        "sleep_analysis",
+        "Analyze the sleep quality and sleep stages",
+        ["sleep_get"],
+    ),
+    Task("translator", "Translate text to another language"),
+    Task("google_search", "Search the internet for a query"),
+    Task("ask_user", "Ask the user a question"),
+]
+
+
+def test_selects_relevant_tasks_and_dependencies():
+    index = ToolIndex(top_k=1)
+    selected = index.select("Analyze my sleep stages", TASKS)
+    assert [task.name for task in selected] == [
+        "sleep_get",
+        "sleep_analysis",
+    ]
+    selected = index.select(
+        "Translation to Spanish", TASKS, "call google_search"
+    )
+    assert [task.name for task in selected] == [
+        "translator",
+        "google_search",
+    ]
+
+
+def test_unmatched_query_keeps_all_tasks():
+    index = ToolIndex(top_k=1)
+    assert index.select("hello there", TASKS) == TASKS
+
+
+def test_render_is_cached():
+    index = ToolIndex()
+    calls = []
+
+    def render(task):
+        calls.append(task.name)
+        return task.name + ";"
+
+    assert (
+        index.render(TASKS[:2], render) == "sleep_get;sleep_analysis;"
+    )
+    assert (
+        index.render(TASKS[:2], render) == "sleep_get;sleep_analysis;"
+    )
+    assert calls == ["sleep_get", "sleep_analysis"]
+
+
+def test_rendered_descriptions_are_dropped_on_rebuild():
+    index = ToolIndex(top_k=1)
+    index.render(TASKS[:1], lambda task: task.name)
+    index.select("sleep", TASKS)
+    assert len(index._rendered) == 0
+    index.render(TASKS[:1], lambda task: task.name)
+    index.select("sleep", list(TASKS))
+    assert len(index._rendered) == 1
@@ -96,3 +96,8 @@ def test_validate_inputs(sample_task):
 
     inputs = ["input 1", "input 2"]
     assert sample_task._validate_inputs(inputs)
+
+
+@pytest.mark.asyncio
+async def test_aexecute(sample_task):
+    assert await sample_task.aexecute([]) == sample_task.execute([])
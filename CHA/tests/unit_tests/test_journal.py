@@ -0,0 +1,49 @@
+import json
+import logging
+
+from journal import Journal
+from journal import journal_context
+
+
+def read_events(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_is_tagged_with_context(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path=path)
+    with journal_context(session_id="session", run_id="run"):
+        journal.record("attempt", attempt=1)
+    journal.record("outside")
+    journal.flush()
+    events = read_events(path)
+    assert events[0]["event"] == "attempt"
+    assert events[0]["attempt"] == 1
+    assert events[0]["session_id"] == "session"
+    assert events[0]["run_id"] == "run"
+    assert events[1]["run_id"] is None
+
+
+def test_level_filters_events(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path=path, level=logging.INFO)
+    assert (
+        journal.record("prompt", logging.DEBUG, prompt="p") is False
+    )
+    assert journal.record("error", logging.ERROR) is True
+    journal.flush()
+    assert [event["event"] for event in read_events(path)] == [
+        "error"
+    ]
+
+
+def test_rotation(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path=path, max_bytes=10, backup_count=2)
+    for i in range(3):
+        journal.record("event", index=i)
+        journal.flush()
+    assert read_events(path)[0]["index"] == 2
+    assert read_events(path + ".1")[0]["index"] == 1
+    assert read_events(path + ".2")[0]["index"] == 0
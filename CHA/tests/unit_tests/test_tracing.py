@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from trace_report import summarize
+from tracing import SpanExporter
+from tracing import Tracer
+
+
+def test_spans_are_nested(tmp_path):
+    tracer = Tracer(
+        exporter=SpanExporter(path=str(tmp_path / "t.jsonl"))
+    )
+
+    async def task(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+
+    async def run():
+        with tracer.span("run") as root:
+            await asyncio.gather(task("a"), task("b"))
+        return root
+
+    root = asyncio.run(run())
+    tracer.exporter.flush()
+    with open(tmp_path / "t.jsonl", encoding="utf-8") as f:
+        spans = {span["name"]: span for span in map(json.loads, f)}
+    assert root.parent_id is None
+    assert spans["a"]["parent_id"] == root.span_id
+    assert spans["b"]["parent_id"] == root.span_id
+    assert spans["a"]["trace_id"] == root.trace_id
+    rows = summarize([str(tmp_path / "t.jsonl")])
+    assert sorted(row["stage"] for row in rows) == ["a", "b", "run"]
+
+
+def test_error_status_and_otlp(tmp_path):
+    path = str(tmp_path / "t.jsonl")
+    tracer = Tracer(exporter=SpanExporter(path=path, format="otlp"))
+    try:
+        with tracer.span("task.fail", task="fail"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    tracer.exporter.flush()
+    rows = summarize([path], group_by="task")
+    assert rows[0]["stage"] == "task.fail[fail]"
+    assert rows[0]["count"] == 1